@@ -56,23 +56,71 @@
 from datetime import datetime, timedelta, timezone
 from jose import jwt
 from passlib.context import CryptContext
+from typing import Optional, Tuple
 import os
 
+from backend.utils.process_pool import BoundedThreadPool
+
 # Load env or default
 SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkey")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 60))
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing. Hashes made with another cost are rehashed at the next
+# successful login, so BCRYPT_ROUNDS can be raised (or lowered) at any time.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+# bcrypt runs on its own small thread pool (it releases the GIL), so a login
+# burst queues there instead of filling the request threadpool. Past
+# PASSWORD_POOL_MAX_PENDING jobs callers get 503 + Retry-After; keep it well
+# below the request threadpool size (40). 0 workers hashes inline.
+PASSWORD_POOL_WORKERS = int(os.getenv("PASSWORD_POOL_WORKERS", 4))
+PASSWORD_POOL_MAX_PENDING = int(os.getenv("PASSWORD_POOL_MAX_PENDING", 16))
+PASSWORD_JOB_TIMEOUT = float(os.getenv("PASSWORD_JOB_TIMEOUT", 5))
+
+password_pool = BoundedThreadPool(
+    "password_pool",
+    workers=PASSWORD_POOL_WORKERS,
+    max_pending=PASSWORD_POOL_MAX_PENDING,
+    timeout=PASSWORD_JOB_TIMEOUT,
+    retry_after=1,
+)
+
+# Stored for accounts that sign in with Google only: not a bcrypt hash, so
+# no password ever matches it
+UNUSABLE_PASSWORD = "!"
+
+
+def _secret(password: str) -> bytes:
+    # bcrypt only looks at the first 72 bytes
+    return password.encode("utf-8")[:72]
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(_secret(password))
+
+
+def _verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    if not pwd_context.identify(hashed_password):
+        return False, None
+    return pwd_context.verify_and_update(_secret(plain_password), hashed_password)
+
 
 def hash_password(password: str) -> str:
     """Hash password safely (truncate to 72 bytes)."""
-    return pwd_context.hash(password.encode("utf-8")[:72])
+    return password_pool.run(_hash, password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plaintext password against the hashed password."""
-    return pwd_context.verify(plain_password.encode("utf-8")[:72], hashed_password)
+    return verify_and_update_password(plain_password, hashed_password)[0]
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    (matches, new_hash): new_hash is set when the password matched but the
+    stored hash uses another cost than BCRYPT_ROUNDS and should be replaced.
+    """
+    return password_pool.run(_verify_and_update, plain_password, hashed_password)
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
     """Generate JWT token with expiration."""
@@ -0,0 +1,119 @@
+"""
+Google ID token verification with cached signing certificates.
+
+id_token.verify_oauth2_token downloads Google's certificates on every
+call. Here they are fetched once and kept for as long as the response's
+Cache-Control max-age allows (Google sends several hours), so a login
+verifies the token signature locally. A token signed with a key id we do
+not know triggers one early refresh (key rotation), at most every
+GOOGLE_CERTS_MIN_REFRESH seconds so unknown-kid garbage cannot turn into a
+fetch per request.
+
+Everything here is blocking; call it off the event loop.
+
+    GOOGLE_CERTS_URL=https://www.googleapis.com/oauth2/v1/certs
+    GOOGLE_CERTS_DEFAULT_TTL=3600   when the response carries no max-age
+    GOOGLE_CERTS_MIN_REFRESH=60
+    GOOGLE_CERTS_TIMEOUT=5          seconds per fetch
+
+Metrics: google_certs_fetch_total{outcome=ok|error},
+google_token_verify_total{outcome=ok|invalid}.
+"""
+
+from google.auth import exceptions, jwt
+from google.auth.transport import requests as google_requests
+from typing import Any, Dict, Mapping, Optional
+import json
+import re
+import threading
+import time
+import os
+
+from backend.utils.metrics import metrics
+from backend.utils.logger import logger
+
+GOOGLE_CERTS_URL = os.getenv("GOOGLE_CERTS_URL", "https://www.googleapis.com/oauth2/v1/certs")
+GOOGLE_CERTS_DEFAULT_TTL = int(os.getenv("GOOGLE_CERTS_DEFAULT_TTL", 3600))
+GOOGLE_CERTS_MIN_REFRESH = int(os.getenv("GOOGLE_CERTS_MIN_REFRESH", 60))
+GOOGLE_CERTS_TIMEOUT = float(os.getenv("GOOGLE_CERTS_TIMEOUT", 5))
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+CLOCK_SKEW_SECONDS = 10
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+class CertCache:
+    def __init__(self, url: str):
+        self.url = url
+        self._request = google_requests.Request()  # one pooled session
+        self._lock = threading.Lock()
+        self._certs: Optional[Dict[str, str]] = None
+        self._expires = 0.0
+        self._fetched = 0.0
+
+    def _fetch(self) -> None:
+        try:
+            response = self._request(self.url, method="GET", timeout=GOOGLE_CERTS_TIMEOUT)
+            if response.status != 200:
+                raise exceptions.TransportError(f"HTTP {response.status}")
+            certs = json.loads(response.data.decode("utf-8"))
+        except Exception as e:
+            metrics.inc("google_certs_fetch_total", outcome="error")
+            raise exceptions.TransportError(f"Could not fetch Google certificates: {e}")
+
+        match = _MAX_AGE.search(response.headers.get("cache-control", ""))
+        ttl = int(match.group(1)) if match else GOOGLE_CERTS_DEFAULT_TTL
+        now = time.time()
+        self._certs, self._expires, self._fetched = certs, now + ttl, now
+        metrics.inc("google_certs_fetch_total", outcome="ok")
+        logger.info(f"Fetched {len(certs)} Google certificates, cached for {ttl}s")
+
+    def get(self) -> Dict[str, str]:
+        with self._lock:
+            if self._certs is None or time.time() >= self._expires:
+                self._fetch()
+            return self._certs
+
+    def refresh(self) -> bool:
+        """Fetch again unless that happened recently; whether it did."""
+        with self._lock:
+            if time.time() - self._fetched < GOOGLE_CERTS_MIN_REFRESH:
+                return False
+            self._fetch()
+            return True
+
+
+google_certs = CertCache(GOOGLE_CERTS_URL)
+
+
+def _decode(credential: str, client_id: str) -> Mapping[str, Any]:
+    return jwt.decode(
+        credential,
+        certs=google_certs.get(),
+        audience=client_id,
+        clock_skew_in_seconds=CLOCK_SKEW_SECONDS,
+    )
+
+
+def verify_google_token(credential: str, client_id: str) -> Mapping[str, Any]:
+    """
+    Claims of a valid Google ID token for `client_id`.
+    Raises ValueError for an invalid token, TransportError when the
+    certificates cannot be fetched.
+    """
+    try:
+        try:
+            idinfo = _decode(credential, client_id)
+        except ValueError as e:
+            if "Certificate for key id" not in str(e) or not google_certs.refresh():
+                raise
+            idinfo = _decode(credential, client_id)
+
+        if idinfo.get("iss") not in GOOGLE_ISSUERS:
+            raise ValueError(f"Wrong issuer: {idinfo.get('iss')}")
+    except ValueError:
+        metrics.inc("google_token_verify_total", outcome="invalid")
+        raise
+
+    metrics.inc("google_token_verify_total", outcome="ok")
+    return idinfo
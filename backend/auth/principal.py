@@ -0,0 +1,142 @@
+"""
+Verified principals, cached by token.
+
+get_current_user used to decode the JWT and load the User row on every
+request. A verified token now maps to a Principal (id, email, username:
+all handlers need) in a bounded in-process TTL cache, so a repeat request
+costs a hash and a dict lookup: no JWT decode, no database. With Redis up,
+other workers' principals are found there before falling back to the DB.
+
+Entries expire after PRINCIPAL_CACHE_TTL seconds or at the token's own
+expiry, whichever comes first. Any update or delete of a User row
+(disabling, renaming, ...) invalidates that user's entries in this
+process and in Redis; other processes drop theirs within the TTL.
+
+    PRINCIPAL_CACHE_TTL=60  PRINCIPAL_CACHE_SIZE=10000
+"""
+
+from collections import OrderedDict
+from sqlalchemy import event
+from typing import Dict, Optional, Set, Tuple
+import hashlib
+import threading
+import time
+import os
+
+from backend.auth.models import User
+from backend.utils.cache import Cache, redis_client
+from backend.utils.metrics import metrics
+from backend.utils.logger import logger
+
+PRINCIPAL_CACHE_TTL = int(os.getenv("PRINCIPAL_CACHE_TTL", 60))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", 10000))
+
+
+class Principal:
+    """The authenticated user as handlers see it: plain values, no ORM state."""
+
+    __slots__ = ("id", "email", "username")
+
+    def __init__(self, id: str, email: str, username: str):
+        self.id = id
+        self.email = email
+        self.username = username
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(user.id, user.email, user.username)
+
+    def __repr__(self) -> str:
+        return f"Principal(id={self.id!r}, email={self.email!r})"
+
+
+def token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class PrincipalCache:
+    def __init__(self, ttl: int, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, Principal]]" = OrderedDict()  # hash -> (expires, p)
+        self._by_user: Dict[str, Set[str]] = {}
+
+    def _drop(self, key: str) -> None:
+        _, principal = self._entries.pop(key)
+        hashes = self._by_user.get(principal.id)
+        if hashes:
+            hashes.discard(key)
+            if not hashes:
+                del self._by_user[principal.id]
+
+    def get(self, token: str) -> Optional[Principal]:
+        key = token_hash(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                metrics.inc("principal_cache_requests_total", result="hit")
+                return entry[1]
+            if entry:
+                self._drop(key)
+
+        stored = Cache.get(f"principal:{key}")
+        if stored and stored["expires"] > now:
+            principal = Principal(stored["id"], stored["email"], stored["username"])
+            self._remember(key, principal, stored["expires"])
+            metrics.inc("principal_cache_requests_total", result="redis_hit")
+            return principal
+
+        metrics.inc("principal_cache_requests_total", result="miss")
+        return None
+
+    def _remember(self, key: str, principal: Principal, expires: float) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (expires, principal)
+            self._by_user.setdefault(principal.id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def put(self, token: str, principal: Principal, token_expires: Optional[float]) -> None:
+        key = token_hash(token)
+        expires = time.time() + self.ttl
+        if token_expires:
+            expires = min(expires, token_expires)
+        self._remember(key, principal, expires)
+
+        ttl = int(expires - time.time())
+        if ttl > 0 and Cache.set(f"principal:{key}", {
+            "id": principal.id, "email": principal.email, "username": principal.username, "expires": expires,
+        }, ttl=ttl) and redis_client:
+            try:
+                redis_client.sadd(f"principal_tokens:{principal.id}", key)
+                redis_client.expire(f"principal_tokens:{principal.id}", self.ttl)
+            except Exception as e:
+                logger.error(f"Principal index error for {principal.id}: {e}")
+
+    def invalidate_user(self, user_id: str) -> None:
+        with self._lock:
+            for key in list(self._by_user.get(user_id, ())):
+                self._drop(key)
+
+        if redis_client:
+            try:
+                keys = redis_client.smembers(f"principal_tokens:{user_id}")
+                if keys:
+                    redis_client.delete(*(f"principal:{k}" for k in keys))
+                redis_client.delete(f"principal_tokens:{user_id}")
+            except Exception as e:
+                logger.error(f"Principal invalidation error for {user_id}: {e}")
+
+
+principal_cache = PrincipalCache(PRINCIPAL_CACHE_TTL, PRINCIPAL_CACHE_SIZE)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_changed(mapper, connection, target) -> None:
+    principal_cache.invalidate_user(target.id)
@@ -385,14 +385,19 @@ from backend.auth.models import User
 from backend.auth.schemas import UserCreate, UserOut, Token
 from backend.auth.auth_utils import (
     hash_password,
-    verify_password,
+    verify_and_update_password,
     create_access_token,
+    UNUSABLE_PASSWORD,
 )
 from backend.dependencies import get_current_user
+from backend.auth.principal import Principal
 from backend.database.db import get_db
+from backend.auth.google_tokens import verify_google_token
 from backend.utils.logger import logger
-from google.oauth2 import id_token
-from google.auth.transport import requests
+from backend.utils.rate_limit import RateLimit
+from fastapi.concurrency import run_in_threadpool
+from google.auth.exceptions import TransportError
+from sqlalchemy.exc import IntegrityError
 import uuid
 import os
 from datetime import timedelta
@@ -401,9 +406,14 @@ load_dotenv()
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
+# Checked before any hashing or DB work; RATE_LIMIT_<ROUTE>_<SCOPE> overrides
+login_limit = RateLimit("login", ip="20/60", account="5/60")
+signup_limit = RateLimit("signup", ip="5/300")
+google_limit = RateLimit("google", ip="30/60")
+
 
 # ------------------------- NORMAL SIGNUP ------------------------- #
-@router.post("/signup", response_model=UserOut)
+@router.post("/signup", response_model=UserOut, dependencies=[Depends(signup_limit)])
 def signup(user: UserCreate, db: Session = Depends(get_db)):
     logger.info(f"Signup attempt: {user.email}")
 
@@ -430,18 +440,29 @@ def signup(user: UserCreate, db: Session = Depends(get_db)):
 
 
 # -------------------------- NORMAL LOGIN ------------------------- #
-@router.post("/login", response_model=Token)
+@router.post("/login", response_model=Token, dependencies=[Depends(login_limit)])
 def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db),
 ):
     logger.info(f"Login attempt: {form_data.username}")
+    login_limit.check_account(form_data.username)
 
     user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    valid, new_hash = (
+        verify_and_update_password(form_data.password, user.hashed_password)
+        if user else (False, None)
+    )
+    if not valid:
         logger.warning(f"Login failed: Incorrect credentials for {form_data.username}")
         raise HTTPException(status_code=400, detail="Incorrect email or password")
 
+    if new_hash:
+        # Stored hash used an older bcrypt cost
+        user.hashed_password = new_hash
+        db.commit()
+        logger.info(f"Password rehashed for {user.email}")
+
     access_token = create_access_token(
         data={"sub": user.id},
         expires_delta=timedelta(hours=24),
@@ -456,17 +477,46 @@ def login(
 
 
 # ----------------------- GOOGLE LOGIN ---------------------------- #
-@router.post("/google", response_model=Token)
+def _google_user_id(db: Session, email: str, first_name: str) -> str:
+    """Id of the user with this email, created as a Google-only account if new."""
+    user = db.query(User).filter(User.email == email).first()
+    if user:
+        logger.info(f"✅ EXISTING USER logged in via Google: {email} (ID: {user.id})")
+        return user.id
+
+    user_id = str(uuid.uuid4())
+    user = User(
+        id=user_id,
+        username=first_name,  # Use first name only
+        email=email,
+        # Google-only account: no password to hash
+        hashed_password=UNUSABLE_PASSWORD,
+    )
+    db.add(user)
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent login created this user first
+        db.rollback()
+        return db.query(User.id).filter(User.email == email).scalar()
+    except Exception as commit_error:
+        logger.error(f"❌ Database commit failed: {commit_error}")
+        db.rollback()
+        raise HTTPException(status_code=500, detail="Failed to create user")
+
+    logger.info(f"✅ NEW USER CREATED via Google: {email} (ID: {user_id})")
+    return user_id
+
+
+@router.post("/google", response_model=Token, dependencies=[Depends(google_limit)])
 async def google_auth(request: Request, db: Session = Depends(get_db)):
     """
     Accepts Google ID token from frontend (field: `credential`),
     verifies it, creates/fetches user, and returns our JWT.
+    Token verification and database work run in the threadpool.
     """
-    logger.info("🔵 Google OAuth attempt started")
-    
     try:
         body = await request.json()
-        logger.debug(f"Request body received: {list(body.keys())}")
     except Exception as e:
         logger.error(f"❌ Failed to parse JSON request: {e}")
         raise HTTPException(status_code=400, detail=f"Invalid JSON: {str(e)}")
@@ -479,107 +529,49 @@ async def google_auth(request: Request, db: Session = Depends(get_db)):
             status_code=422,
             detail="Missing Google credential",
         )
-    
-    logger.info(f"Credential received (length: {len(credential)})")
 
-    try:
-        client_id = os.getenv("GOOGLE_CLIENT_ID")
-        
-        if not client_id:
-            logger.error("❌ GOOGLE_CLIENT_ID not set in environment")
-            raise HTTPException(
-                status_code=500,
-                detail="Google OAuth not configured",
-            )
-        
-        logger.info(f"Using GOOGLE_CLIENT_ID: {client_id[:20]}...")
-
-        logger.info("Verifying token with Google...")
-        idinfo = id_token.verify_oauth2_token(
-            credential,
-            requests.Request(),
-            client_id,
+    client_id = os.getenv("GOOGLE_CLIENT_ID")
+    if not client_id:
+        logger.error("❌ GOOGLE_CLIENT_ID not set in environment")
+        raise HTTPException(
+            status_code=500,
+            detail="Google OAuth not configured",
         )
-        logger.info("✅ Token verified successfully!")
 
+    try:
+        idinfo = await run_in_threadpool(verify_google_token, credential, client_id)
         email = idinfo["email"]
         full_name = idinfo.get("name", email.split("@")[0])
         # Extract first name from full name, or use email username as fallback
         first_name = full_name.split()[0] if full_name else email.split("@")[0]
-        google_id = idinfo.get("sub")
-        
-        logger.info(f"Google user info - Email: {email}, Full Name: {full_name}, First Name: {first_name}, Google ID: {google_id}")
-
-    except ValueError as ve:
-        logger.error(f"❌ Token verification failed (ValueError): {ve}")
+    except TransportError as te:
+        logger.error(f"❌ Google certificates unavailable: {te}")
         raise HTTPException(
-            status_code=400,
-            detail=f"Invalid Google token: {str(ve)}",
+            status_code=503,
+            detail="Google sign-in temporarily unavailable",
         )
-    except Exception as e:
-        logger.error(f"❌ Token verification failed (General): {e}")
+    except (ValueError, KeyError) as ve:
+        logger.error(f"❌ Token verification failed: {ve}")
         raise HTTPException(
             status_code=400,
-            detail=f"Invalid Google token: {str(e)}",
+            detail=f"Invalid Google token: {str(ve)}",
         )
 
-    # Find or create user
-    logger.info(f"Checking if user exists with email: {email}")
-    user = db.query(User).filter(User.email == email).first()
-
-    if not user:
-        logger.info(f"User not found. Creating new user for {email}...")
-        
-        new_user_id = str(uuid.uuid4())
-        user = User(
-            id=new_user_id,
-            username=first_name,  # Use first name only
-            email=email,
-            # random password, user won't use it for Google login
-            hashed_password=hash_password(uuid.uuid4().hex),
-        )
-        
-        logger.info(f"Adding user to database: ID={new_user_id}, Email={email}, Username={first_name}")
-        db.add(user)
-        
-        try:
-            db.commit()
-            logger.info("✅ Database commit successful")
-        except Exception as commit_error:
-            logger.error(f"❌ Database commit failed: {commit_error}")
-            db.rollback()
-            raise HTTPException(status_code=500, detail="Failed to create user")
-        
-        db.refresh(user)
-        logger.info(f"✅ NEW USER CREATED via Google: {email} (ID: {user.id})")
-        
-        # Verify user was created
-        verify_user = db.query(User).filter(User.email == email).first()
-        if verify_user:
-            logger.info(f"✅ Verification: User found in database after creation")
-        else:
-            logger.error(f"❌ Verification FAILED: User NOT found in database after creation!")
-    else:
-        logger.info(f"✅ EXISTING USER logged in via Google: {email} (ID: {user.id})")
+    user_id = await run_in_threadpool(_google_user_id, db, email, first_name)
 
-    # Generate access token
-    logger.info(f"Generating access token for user: {user.email}")
     access_token = create_access_token(
-        data={"sub": user.id},
+        data={"sub": user_id},
         expires_delta=timedelta(hours=24),
     )
-
-    logger.info(f"✅ Google OAuth completed successfully for {email}")
-    
     return {
         "access_token": access_token,
         "token_type": "bearer",
-        "user_uuid": user.id,
+        "user_uuid": user_id,
     }
 
 
 # -------------------------- CURRENT USER ------------------------- #
 @router.get("/me", response_model=UserOut)
-def read_current_user(current_user: User = Depends(get_current_user)):
+def read_current_user(current_user: Principal = Depends(get_current_user)):
     logger.info(f"Current user fetched: {current_user.email}")
     return current_user
\ No newline at end of file
@@ -0,0 +1,121 @@
+"""
+Rolling-origin backtest of the forecasting models in forecast_service.
+
+    python -m backend.benchmarks.forecast_backtest --series 5000 --months 36 --workers 4
+    python -m backend.benchmarks.forecast_backtest --from-db --months 24
+
+Series are split into chunks scored in a process pool. Each model
+forecasts every series of a chunk at once, from every origin between
+--min-train and the end of the series. Reported per model: MAPE over
+nonzero actuals and the CPU seconds spent inside the model.
+
+--from-db scores every user's per-category expense series (the last
+--months months of users with that much history); no ids leave the DB.
+"""
+
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from backend.finance.forecast_service import FORECAST_MODELS, build_category_matrix
+
+
+def synthetic_series(count: int, months: int, seed: int = 0) -> np.ndarray:
+    """Monthly spending: level, trend, yearly seasonality, noise, idle months."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(months)
+
+    level = rng.lognormal(mean=7.5, sigma=0.8, size=(count, 1))
+    trend = rng.normal(0, 0.01, (count, 1)) * level * t
+    amplitude = rng.uniform(0, 0.4, (count, 1)) * level
+    phase = rng.integers(0, 12, (count, 1))
+    seasonal = amplitude * np.sin(2 * np.pi * (t + phase) / 12)
+    noise = rng.normal(0, 0.15, (count, months)) * level
+
+    Y = np.maximum(level + trend + seasonal + noise, 0.0)
+    Y[rng.random((count, months)) < 0.03] = 0.0
+    return Y
+
+
+def db_series(months: int) -> np.ndarray:
+    import backend.auth  # noqa: F401  (register tables, settle import order)
+    from backend.database.sharding import shard_map
+    from backend.finance.forecast_state import expense_history
+    from backend.finance.models import Transaction, TransactionType
+    from sqlalchemy import select
+
+    rows = []
+    for router in shard_map.routers:
+        with router.Session() as db:
+            user_ids = db.scalars(
+                select(Transaction.user_id)
+                .where(Transaction.type == TransactionType.EXPENSE)
+                .distinct()
+            ).all()
+            for user_id in user_ids:
+                _, _, matrix = build_category_matrix(expense_history(db, user_id))
+                if matrix.shape[1] >= months:
+                    rows.append(matrix[:, -months:])
+
+    return np.vstack(rows) if rows else np.zeros((0, months))
+
+
+def score_chunk(Y: np.ndarray, horizon: int, min_train: int) -> dict:
+    """{model: (sum of abs pct errors, points scored, cpu seconds)} for one chunk."""
+    scores = {}
+    for name, forecaster in FORECAST_MODELS.items():
+        err, points, cpu = 0.0, 0, 0.0
+        for origin in range(min_train, Y.shape[1] - horizon + 1):
+            actual = Y[:, origin:origin + horizon]
+
+            start = time.process_time()
+            pred = forecaster(Y[:, :origin], horizon)
+            cpu += time.process_time() - start
+
+            mask = actual > 0
+            err += float(np.sum(np.abs(pred[mask] - actual[mask]) / actual[mask]))
+            points += int(mask.sum())
+        scores[name] = (err, points, cpu)
+    return scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Forecast model backtest")
+    parser.add_argument("--series", type=int, default=5000)
+    parser.add_argument("--months", type=int, default=36)
+    parser.add_argument("--horizon", type=int, default=3)
+    parser.add_argument("--min-train", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunks", type=int, default=16)
+    parser.add_argument("--from-db", action="store_true", help="score real users' category series")
+    args = parser.parse_args()
+
+    Y = db_series(args.months) if args.from_db else synthetic_series(args.series, args.months)
+    if Y.shape[1] < args.min_train + args.horizon or len(Y) == 0:
+        parser.error("not enough series/months for the requested --min-train and --horizon")
+
+    chunks = [c for c in np.array_split(Y, args.chunks) if len(c)]
+    totals = {name: [0.0, 0, 0.0] for name in FORECAST_MODELS}
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(score_chunk, c, args.horizon, args.min_train) for c in chunks]
+        for future in futures:
+            for name, (err, points, cpu) in future.result().items():
+                totals[name][0] += err
+                totals[name][1] += points
+                totals[name][2] += cpu
+    wall = time.perf_counter() - start
+
+    print(f"{len(Y)} series x {Y.shape[1]} months, horizon {args.horizon}, "
+          f"origins from month {args.min_train}, {len(chunks)} chunks, {wall:.1f}s wall")
+    print(f"{'model':16} {'MAPE %':>9} {'cpu s':>9} {'points':>10}")
+    for name, (err, points, cpu) in sorted(totals.items(), key=lambda kv: kv[1][0] / max(kv[1][1], 1)):
+        mape = 100 * err / points if points else float("nan")
+        print(f"{name:16} {mape:9.2f} {cpu:9.2f} {points:10d}")
+
+
+if __name__ == "__main__":
+    main()
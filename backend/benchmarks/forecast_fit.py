@@ -0,0 +1,58 @@
+"""
+Microbenchmark: per-series sklearn LinearRegression fits against the
+batched closed-form fit in forecast_service.
+
+    python -m backend.benchmarks.forecast_fit --series 10000 --months 24
+
+scikit-learn is only needed to run this comparison, not by the API.
+"""
+
+import argparse
+import time
+
+import numpy as np
+from sklearn.linear_model import LinearRegression
+
+from backend.finance.forecast_service import linear_forecast_batch
+
+
+def sklearn_forecast(Y: np.ndarray, horizon: int) -> np.ndarray:
+    X = np.arange(Y.shape[1]).reshape(-1, 1)
+    future = np.arange(Y.shape[1], Y.shape[1] + horizon).reshape(-1, 1)
+    out = np.empty((Y.shape[0], horizon))
+    for i, y in enumerate(Y):
+        model = LinearRegression()
+        model.fit(X, y)
+        out[i] = np.maximum(model.predict(future), 0.0)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Linear trend fit benchmark")
+    parser.add_argument("--series", type=int, default=10_000)
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--horizon", type=int, default=6)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    trend = rng.normal(0, 50, (args.series, 1)) * np.arange(args.months)
+    Y = np.abs(rng.normal(5000, 1500, (args.series, 1)) + trend
+               + rng.normal(0, 400, (args.series, args.months)))
+
+    start = time.perf_counter()
+    expected = sklearn_forecast(Y, args.horizon)
+    sk_secs = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = linear_forecast_batch(Y, args.horizon)
+    np_secs = time.perf_counter() - start
+
+    max_diff = float(np.max(np.abs(expected - actual)))
+    print(f"{args.series} series x {args.months} months, horizon {args.horizon}")
+    print(f"sklearn per series : {sk_secs * 1000:10.1f} ms")
+    print(f"numpy batched      : {np_secs * 1000:10.1f} ms  ({sk_secs / np_secs:.0f}x)")
+    print(f"max abs difference : {max_diff:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Load test for POST /auth/google against a local stand-in token issuer.
+
+Starts the stub issuer and the app (uvicorn, in a child process) and
+fires `--logins` Google logins, `--concurrency` at a time, for `--users`
+distinct accounts (first logins create them). Meanwhile a probe requests
+`--probe` every 10 ms; the default, /openapi.json, is served on the event
+loop, so its latency shows whether the login spike blocks the loop (a
+sync route such as / also waits for the threadpool). Reports login
+throughput and latency, probe latency and how many times the
+certificates were fetched.
+
+Run it from a scratch directory (the default SQLite database is created
+in the working directory):
+
+    python -m backend.benchmarks.google_auth_bench --logins 500 --concurrency 50 --certs-latency 0.1
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+import numpy as np
+
+from backend.benchmarks.stub_google_issuer import StandInIssuer
+
+
+async def _probe(client, path, stop, latencies):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get(path)
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0.01)
+
+
+async def run(base: str, issuer: StandInIssuer, logins: int, users: int, concurrency: int, probe_path: str):
+    tokens = [issuer.token(f"bench{i}@example.com", f"Bench{i} User") for i in range(users)]
+    latencies, failures, probe = [], 0, []
+    gate = asyncio.Semaphore(concurrency)
+    stop = asyncio.Event()
+
+    async with httpx.AsyncClient(base_url=base, timeout=30) as client:
+        await client.get(probe_path)  # warm up (openapi schema is built once)
+
+        async def one(i):
+            nonlocal failures
+            async with gate:
+                start = time.perf_counter()
+                resp = await client.post("/auth/google", json={"credential": tokens[i % users]})
+                latencies.append(time.perf_counter() - start)
+                failures += resp.status_code != 200
+
+        prober = asyncio.create_task(_probe(client, probe_path, stop, probe))
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(logins)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await prober
+
+    lat, probe = np.array(latencies) * 1000, np.array(probe) * 1000
+    return {
+        "logins/s": logins / elapsed,
+        "p50 ms": float(np.percentile(lat, 50)),
+        "p99 ms": float(np.percentile(lat, 99)),
+        "failed": failures,
+        "probe p50 ms": float(np.percentile(probe, 50)),
+        "probe p99 ms": float(np.percentile(probe, 99)),
+        "probe max ms": float(probe.max()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Google login load test")
+    parser.add_argument("--logins", type=int, default=500)
+    parser.add_argument("--users", type=int, default=100, help="distinct accounts")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--certs-latency", type=float, default=0.1, help="issuer seconds per certificate fetch")
+    parser.add_argument("--probe", default="/openapi.json", help="path requested during the spike")
+    parser.add_argument("--port", type=int, default=8124)
+    args = parser.parse_args()
+
+    issuer = StandInIssuer(latency=args.certs_latency).start()
+    env = {
+        **os.environ,
+        "GOOGLE_CERTS_URL": issuer.certs_url,
+        "GOOGLE_CLIENT_ID": issuer.client_id,
+        "RATE_LIMIT_GOOGLE_IP": "off",  # every login comes from this one IP
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(args.port), "--log-level", "warning"],
+        env=env,
+    )
+    base = f"http://127.0.0.1:{args.port}"
+    for _ in range(200):
+        try:
+            httpx.get(base)
+            break
+        except httpx.HTTPError:
+            time.sleep(0.1)
+
+    try:
+        result = asyncio.run(run(base, issuer, args.logins, args.users, args.concurrency, args.probe))
+    finally:
+        server.terminate()
+        server.wait()
+        issuer.stop()
+
+    for name, value in result.items():
+        print(f"{name:14} {value:10.1f}")
+    print(f"{'cert fetches':14} {issuer.cert_fetches:10d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Hedged-request benchmark against two local stub providers.
+
+The primary (Google shape) is fast but has a slow tail; the fallback
+(OpenAI shape) is slower but steady. Runs the same calls against the
+primary alone and against the hedged chain, and reports latency
+percentiles, failures and how many hedges fired.
+
+    python -m backend.benchmarks.hedge_bench --calls 300 --slow-rate 0.05
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from backend.benchmarks.stub_llm import serve_in_thread
+from backend.finance.llm_providers import Provider, first_answer
+from backend.utils.http_client import http_client
+from backend.utils.metrics import metrics
+
+PROMPT = "Monthly expenses: [120.0, 95.5, 130.2]. Generate 3 insights."
+
+
+async def run(chain, calls: int, concurrency: int):
+    latencies, failures = [], 0
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one():
+        nonlocal failures
+        async with gate:
+            start = time.perf_counter()
+            text, _ = await first_answer(chain, PROMPT)
+            latencies.append(time.perf_counter() - start)
+            failures += not text
+
+    await asyncio.gather(*(one() for _ in range(calls)))
+    await http_client.aclose()  # the pool belongs to this run's event loop
+    lat = np.array(latencies) * 1000
+    return float(np.percentile(lat, 50)), float(np.percentile(lat, 90)), float(np.percentile(lat, 99)), failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Primary-only vs hedged provider chain")
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.1, help="primary seconds per call")
+    parser.add_argument("--slow-rate", type=float, default=0.05, help="primary calls in the slow tail")
+    parser.add_argument("--slow-latency", type=float, default=2.0)
+    parser.add_argument("--fallback-latency", type=float, default=0.15)
+    args = parser.parse_args()
+
+    primary_srv, primary_url = serve_in_thread(
+        latency=args.latency, jitter=args.latency / 5,
+        slow_rate=args.slow_rate, slow_latency=args.slow_latency,
+    )
+    fallback_srv, fallback_url = serve_in_thread(
+        latency=args.fallback_latency, jitter=args.fallback_latency / 5,
+    )
+
+    def chain(hedged: bool):
+        providers = [Provider("primary", f"{primary_url}/v1beta/models/stub:generateContent", "stub")]
+        if hedged:
+            providers.append(Provider("fallback", f"{fallback_url}/v1/chat/completions", "stub"))
+        return providers
+
+    print(f"{'chain':16} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'failed':>7}")
+    for name, hedged in (("primary only", False), ("hedged", True)):
+        p50, p90, p99, failed = asyncio.run(run(chain(hedged), args.calls, args.concurrency))
+        print(f"{name:16} {p50:9.1f} {p90:9.1f} {p99:9.1f} {failed:7d}")
+
+    print(f"hedges fired: {metrics.get('llm_hedges_total', provider='fallback'):g}")
+    primary_srv.shutdown()
+    fallback_srv.shutdown()
+
+
+if __name__ == "__main__":
+    main()
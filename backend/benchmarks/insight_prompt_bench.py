@@ -0,0 +1,84 @@
+"""
+Insight prompt benchmark: the old raw-repr prompt against the compact
+statistical one, over growing history lengths and category counts.
+
+Reports prompt size, build time and end-to-end insight latency (build +
+call) against the local stub provider, whose latency grows with the
+request size (--per-kchar) the way a real model's prefill does.
+
+    python -m backend.benchmarks.insight_prompt_bench --per-kchar 0.05
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from backend.benchmarks.stub_llm import serve_in_thread
+from backend.finance.forecast_service import insight_prompt
+from backend.finance.llm_providers import _call_google_generative
+from backend.utils.http_client import http_client
+
+SHAPES = [(6, 5), (24, 12), (60, 30), (120, 80)]  # (months of trend, categories)
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+
+def legacy_prompt(payload) -> str:
+    """The prompt format before the compact builder."""
+    return (
+        f"Monthly expenses: {payload['trend']}. "
+        f"Predicted next month total: {payload['predicted_total_next_month']}. "
+        f"Category predictions: {payload['category_predictions']}. "
+        "Generate 3 insights (title + explanation) plus one recommended action."
+    )
+
+
+def synthetic_payload(months: int, categories: int, rng) -> dict:
+    labels = [MONTHS[i % 12] for i in range(months)]
+    expenses = rng.gamma(4.0, 250.0, months)
+    preds = {f"Category {i}": float(v) for i, v in enumerate(rng.gamma(2.0, 80.0, categories))}
+    return {
+        "trend": [{"month": m, "expenses": float(v)} for m, v in zip(labels, expenses)],
+        "predicted_total_next_month": sum(preds.values()),
+        "category_predictions": preds,
+    }
+
+
+async def insight_latency(build, payload, endpoint: str, calls: int) -> float:
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        await _call_google_generative(endpoint, "stub", build(payload))
+        latencies.append(time.perf_counter() - start)
+    await http_client.aclose()  # the pool belongs to this run's event loop
+    return float(np.median(latencies)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Legacy vs compact insight prompt")
+    parser.add_argument("--calls", type=int, default=10, help="provider calls per shape and format")
+    parser.add_argument("--latency", type=float, default=0.05, help="stub base seconds per call")
+    parser.add_argument("--per-kchar", type=float, default=0.05, help="stub seconds per 1000 request bytes")
+    args = parser.parse_args()
+
+    server, base = serve_in_thread(latency=args.latency, per_kchar=args.per_kchar)
+    endpoint = f"{base}/v1beta/models/stub:generateContent"
+    rng = np.random.default_rng(0)
+
+    print(f"{'months x cats':14} {'format':8} {'chars':>7} {'build us':>9} {'e2e ms':>8}")
+    for months, categories in SHAPES:
+        payload = synthetic_payload(months, categories, rng)
+        for name, build in (("legacy", legacy_prompt), ("compact", insight_prompt)):
+            start = time.perf_counter()
+            for _ in range(200):
+                prompt = build(payload)
+            build_us = (time.perf_counter() - start) / 200 * 1e6
+            e2e = asyncio.run(insight_latency(build, payload, endpoint, args.calls))
+            print(f"{months:>5} x {categories:<6} {name:8} {len(prompt):7d} {build_us:9.1f} {e2e:8.1f}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+LLM client benchmark against the local stub provider.
+
+Fires `--calls` insight requests, `--concurrency` at a time, once with a
+fresh connection per call (the old requests.post behaviour) and once
+through the shared pooled client, and reports throughput, latency
+percentiles and failures. With --fail-rate the pooled run also shows how
+many 503s the retries absorbed.
+
+    python -m backend.benchmarks.llm_client_bench --calls 400 --concurrency 50 --fail-rate 0.05
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+import numpy as np
+
+from backend.benchmarks.stub_llm import serve_in_thread
+from backend.finance.llm_providers import _call_google_generative
+from backend.utils.http_client import http_client
+from backend.utils.metrics import metrics
+
+PROMPT = "Monthly expenses: [120.0, 95.5, 130.2]. Generate 3 insights."
+
+
+async def _fresh_connection_call(endpoint: str) -> str:
+    async with httpx.AsyncClient(timeout=12) as client:
+        try:
+            resp = await client.post(
+                f"{endpoint}?key=stub", json={"contents": [{"parts": [{"text": PROMPT}]}]}
+            )
+            resp.raise_for_status()
+            return resp.json()["candidates"][0]["content"]["parts"][0]["text"]
+        except httpx.HTTPError:
+            return ""
+
+
+async def _pooled_call(endpoint: str) -> str:
+    return await _call_google_generative(endpoint, "stub", PROMPT)
+
+
+async def run(call, endpoint: str, calls: int, concurrency: int):
+    latencies, failures = [], 0
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one():
+        nonlocal failures
+        async with gate:
+            start = time.perf_counter()
+            text = await call(endpoint)
+            latencies.append(time.perf_counter() - start)
+            failures += not text
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(calls)))
+    elapsed = time.perf_counter() - start
+    await http_client.aclose()  # the pool belongs to this run's event loop
+
+    lat = np.array(latencies) * 1000
+    return calls / elapsed, float(np.percentile(lat, 50)), float(np.percentile(lat, 99)), failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pooled vs per-call LLM client benchmark")
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05, help="stub seconds per call")
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server, base = serve_in_thread(latency=args.latency, jitter=args.latency / 4, fail_rate=args.fail_rate)
+    endpoint = f"{base}/v1beta/models/stub:generateContent"
+
+    print(f"{'client':16} {'calls/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'failed':>7}")
+    for name, call in (("per-call", _fresh_connection_call), ("pooled", _pooled_call)):
+        rps, p50, p99, failed = asyncio.run(run(call, endpoint, args.calls, args.concurrency))
+        print(f"{name:16} {rps:9.1f} {p50:9.1f} {p99:9.1f} {failed:7d}")
+
+    print(f"pooled retries: {metrics.get('http_client_retries_total'):g}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
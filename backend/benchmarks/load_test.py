@@ -0,0 +1,80 @@
+"""
+Throughput benchmark for the read-heavy API routes.
+
+Drives N concurrent clients against a running server for a fixed duration
+and reports requests/sec and latency percentiles per endpoint. Run it once
+against a sync build and once against the async build to compare:
+
+    uvicorn backend.main:app --workers 1 &
+    python -m backend.benchmarks.load_test --token <JWT> --clients 500
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+import numpy as np
+
+DEFAULT_ENDPOINTS = [
+    "/api/transactions/",
+    "/api/categories/summary",
+    "/api/reports/",
+    "/api/budgets/",
+    "/api/dashboard/categories/",
+]
+
+
+async def _client_loop(client, path, deadline, latencies, errors):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            resp = await client.get(path)
+            if resp.status_code >= 400:
+                errors.append(resp.status_code)
+            else:
+                latencies.append(time.perf_counter() - start)
+        except httpx.HTTPError:
+            errors.append(-1)
+
+
+async def run_endpoint(base_url: str, token: str, path: str, clients: int, duration: float):
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async with httpx.AsyncClient(
+        base_url=base_url, headers=headers, limits=limits, timeout=30.0
+    ) as client:
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(
+            *(_client_loop(client, path, deadline, latencies, errors) for _ in range(clients))
+        )
+
+    lat = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        "path": path,
+        "rps": len(latencies) / duration,
+        "p50_ms": float(np.percentile(lat, 50)),
+        "p99_ms": float(np.percentile(lat, 99)),
+        "errors": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-client throughput benchmark")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--token", required=True, help="Bearer token of a seeded user")
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--endpoint", action="append", dest="endpoints")
+    args = parser.parse_args()
+
+    print(f"{'endpoint':32} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for path in args.endpoints or DEFAULT_ENDPOINTS:
+        r = asyncio.run(run_endpoint(args.base_url, args.token, path, args.clients, args.duration))
+        print(f"{r['path']:32} {r['rps']:9.1f} {r['p50_ms']:9.1f} {r['p99_ms']:9.1f} {r['errors']:7d}")
+
+
+if __name__ == "__main__":
+    main()
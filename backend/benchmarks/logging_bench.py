@@ -0,0 +1,99 @@
+"""
+Request-path logging overhead: old basicConfig file logging vs the queue pipeline.
+
+Each simulated request logs what a cached GET /api/transactions/ used to:
+the authenticated user, the fetch and the cache hit. "sync" is the old
+setup (FileHandler on the request thread, f-strings at INFO); "queue-all"
+sends the same three INFO records through backend/utils/logger.py
+(QueueHandler to a listener thread, JSON records); "queue" is the current
+request path (%-style arguments, the fetch line sampled 1/100 and the rest
+at DEBUG). Reports microseconds of logging per request as seen by the
+request threads, with `--threads` threads logging at once.
+
+    python -m backend.benchmarks.logging_bench --requests 20000 --threads 8
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from backend.utils.logger import JsonFormatter, TEXT_FORMAT, build_queue_handler
+
+USER_ID = "3f1c9a2e-7a51-4f0e-9d7c-2b8e3c1d5a60"
+EMAIL = "someone@example.com"
+
+
+def sync_request(log: logging.Logger, i: int) -> None:
+    log.info(f"Authenticated user: {EMAIL}")
+    log.info(f"Fetching transactions for {USER_ID}")
+    log.info("Transactions served from cache")
+
+
+def queue_request(log: logging.Logger, i: int) -> None:
+    log.debug("Authenticated user: %s", EMAIL)
+    log.info("Fetching transactions for %s", USER_ID, extra={"sample": 100})
+    log.debug("Transactions served from cache")
+
+
+def run(request, log: logging.Logger, requests: int, threads: int) -> float:
+    """Mean microseconds of logging per request."""
+    per_thread = requests // threads
+    totals = []
+
+    def worker():
+        start = time.perf_counter()
+        for i in range(per_thread):
+            request(log, i)
+        totals.append(time.perf_counter() - start)
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return sum(totals) / (per_thread * threads) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Logging overhead per request")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="logbench-")
+
+    sync_log = logging.getLogger("bench.sync")
+    sync_log.propagate = False
+    sync_log.setLevel(logging.INFO)
+    handler = logging.FileHandler(os.path.join(workdir, "sync.log"))
+    handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    sync_log.addHandler(handler)
+
+    queue_log = logging.getLogger("bench.queue")
+    queue_log.propagate = False
+    queue_log.setLevel(logging.INFO)
+    target = logging.FileHandler(os.path.join(workdir, "queue.log"))
+    target.setFormatter(JsonFormatter())
+    queue_handler, listener = build_queue_handler(target, size=100000)
+    queue_log.addHandler(queue_handler)
+    listener.start()
+
+    print(f"{'pipeline':10} {'us/request':>11}")
+    for name, request, log in (
+        ("sync", sync_request, sync_log),
+        ("queue-all", sync_request, queue_log),
+        ("queue", queue_request, queue_log),
+    ):
+        print(f"{name:10} {run(request, log, args.requests, args.threads):11.2f}")
+
+    listener.stop()
+    for name in ("sync", "queue"):
+        with open(os.path.join(workdir, f"{name}.log")) as f:
+            print(f"{name}.log lines: {sum(1 for _ in f)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Local stand-in for Google's ID token issuer.
+
+Holds an RSA key, serves its certificate in the shape of
+https://www.googleapis.com/oauth2/v1/certs (with Cache-Control max-age and
+an optional latency) and mints ID tokens signed with it, so /auth/google
+can be exercised without Google:
+
+    GOOGLE_CERTS_URL=<issuer.certs_url> GOOGLE_CLIENT_ID=<issuer.client_id>
+"""
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from datetime import datetime, timedelta, timezone
+from google.auth import crypt, jwt
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+
+KEY_ID = "stub-key-1"
+
+
+def _key_and_cert():
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "stub-issuer")])
+    now = datetime.now(timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - timedelta(days=1))
+        .not_valid_after(now + timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    key_pem = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    return key_pem, cert.public_bytes(serialization.Encoding.PEM).decode("ascii")
+
+
+class StandInIssuer:
+    def __init__(self, client_id: str = "bench-client", max_age: int = 3600, latency: float = 0.0):
+        key_pem, self.cert_pem = _key_and_cert()
+        self.signer = crypt.RSASigner.from_string(key_pem, key_id=KEY_ID)
+        self.client_id = client_id
+        self.max_age = max_age
+        self.latency = latency
+        self.cert_fetches = 0
+        self.server = None
+        self.certs_url = None
+
+    def start(self) -> "StandInIssuer":
+        """Serve the certificates on 127.0.0.1 in a daemon thread."""
+        issuer = self
+
+        class CertsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                issuer.cert_fetches += 1
+                time.sleep(issuer.latency)
+                body = json.dumps({KEY_ID: issuer.cert_pem}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Cache-Control", f"public, max-age={issuer.max_age}")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), CertsHandler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="stub-issuer", daemon=True).start()
+        self.certs_url = f"http://127.0.0.1:{self.server.server_address[1]}/oauth2/v1/certs"
+        return self
+
+    def token(self, email: str, name: str = "Bench User", lifetime: int = 3600) -> str:
+        now = int(time.time())
+        return jwt.encode(self.signer, {
+            "iss": "https://accounts.google.com",
+            "aud": self.client_id,
+            "sub": email,
+            "email": email,
+            "name": name,
+            "iat": now,
+            "exp": now + lifetime,
+        }).decode("ascii")
+
+    def stop(self) -> None:
+        if self.server:
+            self.server.shutdown()
@@ -0,0 +1,139 @@
+"""
+Local stand-in for the LLM provider.
+
+Answers POSTs in the Google shape (paths ending in ":generateContent", or
+":streamGenerateContent" for SSE) or the OpenAI chat shape (anything else,
+streamed when the body asks for it), after a configurable latency with
+an optional slow tail, and fails a fraction of calls (or the first
+`fail_first` ones) with 503 to exercise client retries and hedging. The
+handler class counts the requests it received in `received`.
+
+    python -m backend.benchmarks.stub_llm --port 8799 --latency 0.2 --fail-rate 0.1
+    GEMINI_API_KEY=stub \
+    GEMINI_ENDPOINT=http://127.0.0.1:8799/v1beta/models/stub:generateContent \
+        uvicorn backend.main:app
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+import argparse
+import json
+import random
+import threading
+import time
+
+STUB_TEXT = "Spending is stable. Food & Dining leads next month. Set a weekly grocery cap."
+TOKEN_DELAY = 0.02  # seconds between streamed words
+
+
+def make_handler(
+    latency: float,
+    jitter: float,
+    fail_rate: float,
+    slow_rate: float = 0.0,
+    slow_latency: float = 0.0,
+    per_kchar: float = 0.0,
+    fail_first: int = 0,
+):
+    lock = threading.Lock()
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real provider
+        received = 0
+
+        def do_POST(self):
+            with lock:
+                StubHandler.received += 1
+                fail = StubHandler.received <= fail_first
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            path = self.path.split("?")[0]
+            delay = slow_latency if random.random() < slow_rate else latency
+            delay += per_kchar * length / 1000  # providers get slower with longer prompts
+            time.sleep(max(0.0, delay + random.uniform(-jitter, jitter)))
+
+            if fail or random.random() < fail_rate:
+                self._reply(503, {"error": {"message": "stub overloaded"}})
+            elif path.endswith(":streamGenerateContent"):
+                self._stream(lambda word: {"candidates": [{"content": {"parts": [{"text": word}]}}]})
+            elif path.endswith(":generateContent"):
+                self._reply(200, {"candidates": [{"content": {"parts": [{"text": STUB_TEXT}]}}]})
+            elif body.get("stream"):
+                self._stream(lambda word: {"choices": [{"delta": {"content": word}}]}, done="[DONE]")
+            else:
+                self._reply(200, {"choices": [{"message": {"content": STUB_TEXT}}]})
+
+        def _stream(self, event, done=None):
+            # One SSE event per word, TOKEN_DELAY apart; the connection closes at the end
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            try:
+                for i, word in enumerate(STUB_TEXT.split(" ")):
+                    chunk = word if i == 0 else " " + word
+                    self.wfile.write(f"data: {json.dumps(event(chunk))}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                    time.sleep(TOKEN_DELAY)
+                if done:
+                    self.wfile.write(f"data: {done}\n\n".encode("utf-8"))
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            self.close_connection = True
+
+        def _reply(self, status: int, body: dict):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            try:
+                self.wfile.write(data)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # the client gave up, e.g. a cancelled hedge
+
+        def log_message(self, *args):
+            pass
+
+    return StubHandler
+
+
+def serve_in_thread(
+    port: int = 0,
+    latency: float = 0.05,
+    jitter: float = 0.0,
+    fail_rate: float = 0.0,
+    slow_rate: float = 0.0,
+    slow_latency: float = 0.0,
+    per_kchar: float = 0.0,
+    fail_first: int = 0,
+) -> Tuple[ThreadingHTTPServer, str]:
+    """Start the stub on 127.0.0.1 in a daemon thread; (server, base URL)."""
+    handler = make_handler(latency, jitter, fail_rate, slow_rate, slow_latency, per_kchar, fail_first)
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="stub-llm", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub LLM provider")
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per call")
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction answered 503")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="fraction answered after --slow-latency")
+    parser.add_argument("--slow-latency", type=float, default=2.0)
+    parser.add_argument("--per-kchar", type=float, default=0.0, help="extra seconds per 1000 request bytes")
+    args = parser.parse_args()
+
+    handler = make_handler(
+        args.latency, args.jitter, args.fail_rate, args.slow_rate, args.slow_latency, args.per_kchar
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), handler)
+    print(f"Stub LLM listening on http://127.0.0.1:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,155 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import sessionmaker, declarative_base, Session
+from itertools import count
+import time
 import os
 
+from backend.utils.cache import Cache
+
 # Database URL
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./users.db")
 
+# Read-only replicas, comma separated. Locally a WAL reader on the same file
+# stands in for a replica: sqlite:///file:./users.db?mode=ro&uri=true
+SQLALCHEMY_READ_URLS = [
+    url.strip() for url in os.getenv("DATABASE_READ_URLS", "").split(",") if url.strip()
+]
+
+# How long a user's reads stay pinned to the primary after they write
+READ_AFTER_WRITE_PIN_SECONDS = int(os.getenv("READ_AFTER_WRITE_PIN_SECONDS", 5))
+
+
+def to_async_url(url: str) -> str:
+    """Map a sync driver URL onto its asyncio driver (aiosqlite / asyncpg)."""
+    if url.startswith("sqlite:///"):
+        return url.replace("sqlite:///", "sqlite+aiosqlite:///", 1)
+    if url.startswith("postgresql://") or url.startswith("postgres://"):
+        return "postgresql+asyncpg://" + url.split("://", 1)[1]
+    return url
+
+
+def make_engine(url: str, wal: bool = False):
+    if not url.startswith("sqlite"):
+        return create_engine(url, pool_pre_ping=True)
+
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False}  # SQLite only
+    )
+
+    if wal:
+        @event.listens_for(engine, "connect")
+        def _enable_wal(dbapi_conn, _record):
+            # WAL lets reader connections run alongside the single writer
+            dbapi_conn.execute("PRAGMA journal_mode=WAL")
+
+    return engine
+
+
+# ---------- Recently-wrote marker (read-after-write consistency) ----------
+_local_write_marks: dict[str, float] = {}
+
+
+def _write_mark_key(user_id: str) -> str:
+    # Deliberately outside "user:{id}:*" so Cache.clear_user_cache keeps it
+    return f"recent_write:{user_id}"
+
+
+def mark_recent_write(user_id: str) -> None:
+    """Pin this user's reads to the primary for READ_AFTER_WRITE_PIN_SECONDS."""
+    if not Cache.set(_write_mark_key(user_id), 1, ttl=READ_AFTER_WRITE_PIN_SECONDS):
+        _local_write_marks[user_id] = time.monotonic() + READ_AFTER_WRITE_PIN_SECONDS
+
+
+def _marked_locally(user_id: str) -> bool:
+    expires = _local_write_marks.get(user_id)
+    if expires is not None:
+        if expires > time.monotonic():
+            return True
+        _local_write_marks.pop(user_id, None)
+    return False
+
+
+def recently_wrote(user_id: str) -> bool:
+    return _marked_locally(user_id) or Cache.get(_write_mark_key(user_id)) is not None
+
+
+async def recently_wrote_async(user_id: str) -> bool:
+    """recently_wrote for the event loop: the Redis lookup runs in the threadpool."""
+    return _marked_locally(user_id) or await Cache.aget(_write_mark_key(user_id)) is not None
+
+
+# ---------- Session router ----------
+class SessionRouter:
+    """
+    Hands out sessions bound to the primary or to a read-only replica.
+    Without replicas every session goes to the primary.
+    """
+
+    def __init__(self, primary_url: str, read_urls: list[str] | None = None):
+        self.engine = make_engine(primary_url, wal=bool(read_urls))
+        self.async_engine = create_async_engine(to_async_url(primary_url))
+        self.read_engines = [make_engine(url) for url in read_urls or []]
+        self.async_read_engines = [
+            create_async_engine(to_async_url(url)) for url in read_urls or []
+        ]
+
+        self.Session = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        # expire_on_commit=False so ORM rows stay readable after the session
+        # closes (no implicit lazy IO on the event loop)
+        self.AsyncSession = async_sessionmaker(
+            bind=self.async_engine,
+            class_=AsyncSession,
+            autoflush=False,
+            expire_on_commit=False,
+        )
+        self._read_sessions = [
+            sessionmaker(autocommit=False, autoflush=False, bind=e) for e in self.read_engines
+        ]
+        self._async_read_sessions = [
+            async_sessionmaker(bind=e, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+            for e in self.async_read_engines
+        ]
+        self._next_replica = count()
+
+    @property
+    def has_replicas(self) -> bool:
+        return bool(self.read_engines)
+
+    def _use_replica(self, readonly: bool, user_id: str | None) -> bool:
+        if not readonly or not self.has_replicas:
+            return False
+        return user_id is None or not recently_wrote(user_id)
+
+    def session(self, readonly: bool = False, user_id: str | None = None) -> Session:
+        if self._use_replica(readonly, user_id):
+            idx = next(self._next_replica) % len(self._read_sessions)
+            return self._read_sessions[idx]()
+        return self.Session()
+
+    def async_session(self) -> AsyncSession:
+        return self.AsyncSession()
+
+    async def async_read_session(self, user_id: str | None = None) -> AsyncSession:
+        """Async counterpart of session(readonly=True); never blocks the loop."""
+        if self.has_replicas and (user_id is None or not await recently_wrote_async(user_id)):
+            idx = next(self._next_replica) % len(self._async_read_sessions)
+            return self._async_read_sessions[idx]()
+        return self.AsyncSession()
+
+
+session_router = SessionRouter(SQLALCHEMY_DATABASE_URL, SQLALCHEMY_READ_URLS)
+
 # Engine
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False}  # SQLite only
-)
+engine = session_router.engine
+
+# Async engine (used by the async read routes; sync routes keep `engine`)
+async_engine = session_router.async_engine
 
 # Session
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = session_router.Session
+AsyncSessionLocal = session_router.AsyncSession
 
 # Base for models
 Base = declarative_base()
@@ -24,3 +161,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,125 @@
+"""
+Online rebalancing: move a user's rows from one shard to another.
+
+    python -m backend.database.rebalance --user <user_id> --to 2
+    python -m backend.database.rebalance --rehash          # dry run
+    python -m backend.database.rebalance --rehash --apply
+
+Protocol per user:
+  1. mark the placement `moving`; once every worker's cached placement has
+     expired, writes for that user get 503 + Retry-After (reads continue
+     from the source shard)
+  2. copy every user_id-scoped row to the target in one transaction
+  3. flip the placement to the target and mark it `active`
+  4. after cached placements expire again, delete the rows on the source
+"""
+
+from sqlalchemy import select, delete
+import argparse
+import time
+
+import backend.auth.models  # noqa: F401  (register tables on Base.metadata)
+import backend.finance.models  # noqa: F401
+from backend.database.db import session_router
+from backend.database.sharding import (
+    UserShard,
+    shard_map,
+    user_scoped_tables,
+    SHARD_ACTIVE,
+    SHARD_MOVING,
+    SHARD_CACHE_SECONDS,
+)
+from backend.utils.cache import Cache
+from backend.utils.logger import logger
+
+
+def _set_placement(user_id: str, shard: int, state: str) -> None:
+    with session_router.Session() as directory:
+        row = directory.get(UserShard, user_id)
+        row.shard = shard
+        row.state = state
+        directory.commit()
+    shard_map.forget(user_id)
+
+
+def move_user(user_id: str, target: int, pause: float = SHARD_CACHE_SECONDS) -> int:
+    """Move one user to `target`. Returns the number of rows copied."""
+    if not 0 <= target < len(shard_map):
+        raise ValueError(f"Shard {target} does not exist (have {len(shard_map)})")
+
+    with session_router.Session() as directory:
+        source, _ = shard_map.placement(user_id, directory)
+    if source == target:
+        return 0
+
+    src = shard_map.routers[source].engine
+    dst = shard_map.routers[target].engine
+    tables = user_scoped_tables()
+
+    _set_placement(user_id, source, SHARD_MOVING)
+    time.sleep(pause)
+
+    try:
+        with session_router.Session() as directory:
+            shard_map.mirror_user(user_id, target, directory)
+        copied = 0
+        with src.connect() as src_conn, dst.begin() as dst_conn:
+            # Clean slate on the target makes a retried move idempotent
+            for table in reversed(tables):
+                dst_conn.execute(delete(table).where(table.c.user_id == user_id))
+            for table in tables:
+                rows = src_conn.execute(
+                    select(table).where(table.c.user_id == user_id)
+                ).mappings().all()
+                if rows:
+                    dst_conn.execute(table.insert(), [dict(r) for r in rows])
+                    copied += len(rows)
+    except Exception:
+        _set_placement(user_id, source, SHARD_ACTIVE)
+        raise
+
+    _set_placement(user_id, target, SHARD_ACTIVE)
+    time.sleep(pause)
+
+    with src.begin() as src_conn:
+        for table in reversed(tables):
+            src_conn.execute(delete(table).where(table.c.user_id == user_id))
+
+    Cache.clear_user_cache(user_id)
+    logger.info(f"Moved user {user_id} from shard {source} to {target} ({copied} rows)")
+    return copied
+
+
+def misplaced_users() -> list[tuple[str, int, int]]:
+    """(user_id, current shard, hash shard) for users not on their hash shard."""
+    with session_router.Session() as directory:
+        rows = directory.scalars(select(UserShard)).all()
+    return [
+        (r.user_id, r.shard, shard_map.hash_shard(r.user_id))
+        for r in rows
+        if r.shard != shard_map.hash_shard(r.user_id)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move users between database shards")
+    parser.add_argument("--user", help="user id to move")
+    parser.add_argument("--to", type=int, help="target shard index")
+    parser.add_argument("--rehash", action="store_true",
+                        help="move every user onto hash(user_id) %% N, e.g. after adding shards")
+    parser.add_argument("--apply", action="store_true", help="perform the --rehash moves")
+    args = parser.parse_args()
+
+    if args.user is not None and args.to is not None:
+        print(f"Copied {move_user(args.user, args.to)} rows")
+    elif args.rehash:
+        for user_id, current, wanted in misplaced_users():
+            print(f"{user_id}: shard {current} -> {wanted}")
+            if args.apply:
+                move_user(user_id, wanted)
+    else:
+        parser.error("use --user/--to or --rehash")
+
+
+if __name__ == "__main__":
+    main()
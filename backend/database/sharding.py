@@ -0,0 +1,186 @@
+"""
+Horizontal sharding of user-scoped data.
+
+The directory database (DATABASE_URL) keeps `users` and `user_shards`.
+Everything keyed by `user_id` (profiles, transactions, budgets, custom
+categories, ...) lives on the user's shard. A new user is placed on
+hash(user_id) % N and the placement is recorded in `user_shards`, so adding
+shards later never moves existing users implicitly; `rebalance.py` moves
+them explicitly and online.
+
+    DATABASE_SHARD_URLS="sqlite:///./shard0.db,sqlite:///./shard1.db|sqlite:///file:./shard1.db?mode=ro&uri=true"
+
+Each entry is `primary|replica|replica...`. Unset means a single shard
+that is the directory database itself.
+"""
+
+from sqlalchemy import Column, String, Integer, inspect, text
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+import hashlib
+import time
+import os
+
+from backend.database.db import (
+    Base,
+    SQLALCHEMY_DATABASE_URL,
+    SessionRouter,
+    session_router,
+)
+from backend.utils.logger import logger
+
+SHARD_ACTIVE = "active"
+SHARD_MOVING = "moving"
+
+# How long a process trusts its cached placement; rebalance.py waits this
+# long between steps so no worker writes to a stale shard
+SHARD_CACHE_SECONDS = int(os.getenv("SHARD_CACHE_SECONDS", 5))
+
+
+class UserShard(Base):
+    __tablename__ = "user_shards"
+
+    user_id = Column(String, primary_key=True)
+    shard = Column(Integer, nullable=False)
+    state = Column(String, default=SHARD_ACTIVE, nullable=False)
+
+
+def _parse_shard_urls(raw: str) -> list[tuple[str, list[str]]]:
+    shards = []
+    for spec in raw.split(","):
+        urls = [u.strip() for u in spec.split("|") if u.strip()]
+        if urls:
+            shards.append((urls[0], urls[1:]))
+    return shards
+
+
+class ShardMap:
+    """Resolves a user to the SessionRouter of their shard."""
+
+    def __init__(self, routers: list[SessionRouter]):
+        self.routers = routers
+        self._placements: dict[str, tuple[int, str, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self.routers)
+
+    def hash_shard(self, user_id: str) -> int:
+        # Stable across processes, unlike hash()
+        digest = hashlib.sha1(user_id.encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "big") % len(self.routers)
+
+    def placement(self, user_id: str, directory: Session | None = None) -> tuple[int, str]:
+        """Return (shard, state) for a user, recording a new placement if needed."""
+        if len(self.routers) == 1:
+            return 0, SHARD_ACTIVE
+
+        cached = self._placements.get(user_id)
+        if cached and cached[2] > time.monotonic():
+            return cached[0], cached[1]
+
+        own_session = directory is None
+        db = directory or session_router.Session()
+        try:
+            row = db.get(UserShard, user_id)
+            if row is None:
+                row = UserShard(user_id=user_id, shard=self.hash_shard(user_id), state=SHARD_ACTIVE)
+                db.add(row)
+                try:
+                    db.commit()
+                    self.mirror_user(user_id, row.shard, db)
+                    logger.info(f"Placed user {user_id} on shard {row.shard}")
+                except IntegrityError:
+                    # A concurrent request placed the user first
+                    db.rollback()
+                    row = db.get(UserShard, user_id)
+            shard, state = row.shard, row.state
+        finally:
+            if own_session:
+                db.close()
+
+        self._placements[user_id] = (shard, state, time.monotonic() + SHARD_CACHE_SECONDS)
+        return shard, state
+
+    def forget(self, user_id: str) -> None:
+        self._placements.pop(user_id, None)
+
+    def router_for(self, user_id: str) -> SessionRouter:
+        return self.routers[self.placement(user_id)[0]]
+
+    def mirror_user(self, user_id: str, shard: int, directory: Session) -> None:
+        """Shards carry a copy of the users row so user_id foreign keys hold."""
+        router = self.routers[shard]
+        if router is session_router:
+            return
+
+        from backend.auth.models import User
+
+        user = directory.get(User, user_id)
+        if user is None:
+            return
+        with router.Session() as db:
+            db.merge(User(
+                id=user.id,
+                username=user.username,
+                email=user.email,
+                hashed_password=user.hashed_password,
+                disabled=user.disabled,
+            ))
+            db.commit()
+
+
+def _build_shard_map() -> ShardMap:
+    specs = _parse_shard_urls(os.getenv("DATABASE_SHARD_URLS", ""))
+    if not specs:
+        return ShardMap([session_router])
+
+    routers = []
+    for primary, replicas in specs:
+        if primary == SQLALCHEMY_DATABASE_URL:
+            routers.append(session_router)
+        else:
+            routers.append(SessionRouter(primary, replicas))
+    return ShardMap(routers)
+
+
+shard_map = _build_shard_map()
+
+
+def user_scoped_tables():
+    """Every table partitioned by user_id (the directory tables excluded)."""
+    return [
+        table for table in Base.metadata.sorted_tables
+        if "user_id" in table.c and table.name != UserShard.__tablename__
+    ]
+
+
+def _add_missing_columns(engine) -> None:
+    # create_all skips columns added to tables that already exist. New
+    # columns must be nullable or carry a server_default for this to work.
+    existing = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            present = {c["name"] for c in existing.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in present:
+                    ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+                    logger.info(f"Added column {table.name}.{column.name}")
+
+
+def _create_schema(engine) -> None:
+    Base.metadata.create_all(bind=engine)
+    _add_missing_columns(engine)
+    # create_all skips indexes added to tables that already exist
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
+def create_shard_tables() -> None:
+    """create_all on the directory and on every shard."""
+    _create_schema(session_router.engine)
+    for router in shard_map.routers:
+        if router is not session_router:
+            _create_schema(router.engine)
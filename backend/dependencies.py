@@ -34,26 +34,32 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
-from backend.database.db import get_db
+from backend.database.db import SessionLocal, SessionRouter
+from backend.database.sharding import shard_map, SHARD_MOVING, SHARD_CACHE_SECONDS
 from backend.auth.models import User
-from backend.utils.logger import logger
+from backend.auth.principal import Principal, principal_cache
+from backend.utils.logger import get_logger
 import os
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+logger = get_logger(__name__)
+
 SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkey")
 ALGORITHM = "HS256"
+ADMIN_EMAILS = {e.strip().lower() for e in os.getenv("ADMIN_EMAILS", "").split(",") if e.strip()}
 
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
-) -> User:
+def get_current_user(token: str = Depends(oauth2_scheme)) -> Principal:
     """
-    Validates JWT token and returns the authenticated user object.
-    Uses `sub` = user.id (NOT email).
+    Validates JWT token and returns the authenticated principal.
+    Uses `sub` = user.id (NOT email). A token seen recently is served from
+    principal_cache without decoding it or touching the database.
     """
+    principal = principal_cache.get(token)
+    if principal:
+        return principal
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -66,12 +72,72 @@ def get_current_user(
         if user_id is None:
             raise credentials_exception
     except JWTError as e:
-        logger.warning(f"JWT decode error: {e}")
+        logger.warning("JWT decode error: %s", e)
         raise credentials_exception
 
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
-        raise credentials_exception
+    with SessionLocal() as db:
+        user = db.get(User, user_id)
+        if user is None or user.disabled:
+            raise credentials_exception
+        principal = Principal.from_user(user)
+
+    principal_cache.put(token, principal, payload.get("exp"))
+    logger.debug("Authenticated user: %s", principal.email)
+    return principal
+
+
+def get_admin_user(user: Principal = Depends(get_current_user)) -> Principal:
+    """The current user, if their email is listed in ADMIN_EMAILS."""
+    if user.email.lower() not in ADMIN_EMAILS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return user
+
+
+def get_shard_router(current_user: Principal = Depends(get_current_user)) -> SessionRouter:
+    """SessionRouter of the shard that holds the current user's data."""
+    return shard_map.router_for(current_user.id)
+
+
+def get_shard_db(current_user: Principal = Depends(get_current_user)):
+    """
+    Primary session on the current user's shard; use it for writes.
+    Rejected with 503 while rebalance.py is moving the user.
+    """
+    shard, state = shard_map.placement(current_user.id)
+    if state == SHARD_MOVING:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Account data is being migrated, retry shortly",
+            headers={"Retry-After": str(SHARD_CACHE_SECONDS)},
+        )
+
+    db = shard_map.routers[shard].session()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_read_db(
+    current_user: Principal = Depends(get_current_user),
+    router: SessionRouter = Depends(get_shard_router),
+):
+    """
+    Session for GET handlers: a read replica of the user's shard, unless the
+    user wrote within the last few seconds (then the primary, so they read
+    their own writes).
+    """
+    db = router.session(readonly=True, user_id=current_user.id)
+    try:
+        yield db
+    finally:
+        db.close()
+
 
-    logger.info(f"Authenticated user: {user.email}")
-    return user
\ No newline at end of file
+async def get_async_read_db(
+    current_user: Principal = Depends(get_current_user),
+    router: SessionRouter = Depends(get_shard_router),
+):
+    """Async counterpart of `get_read_db`."""
+    async with await router.async_read_session(current_user.id) as db:
+        yield db
\ No newline at end of file
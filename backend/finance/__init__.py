@@ -1,3 +1,4 @@
+import backend.auth  # noqa: F401  (auth.routes must load before finance imports dependencies)
 from fastapi import APIRouter
 from backend.finance.routes_transactions import router as transactions_router
 from backend.finance.routes_dashboard import router as dashboard_router
@@ -0,0 +1,186 @@
+"""
+Cold-storage archival of old transactions.
+
+Whole months older than ARCHIVE_HORIZON_MONTHS are moved from `transactions`
+to `transactions_archive`, and their per-month/type/category totals are
+folded into `transaction_rollups`. Aggregates (dashboard balance, reports,
+forecast) read the rollups; transaction listings read through to the
+archive rows when the requested range reaches back past the horizon.
+
+    ARCHIVE_HORIZON_MONTHS=36 python -m backend.finance.archive_service
+
+The horizon is read from the environment only, so the job and the API
+workers always agree on where the archive starts. The same job prunes
+delta-sync tombstones older than TOMBSTONE_RETENTION_DAYS.
+"""
+
+from sqlalchemy import select, delete, func
+from sqlalchemy.orm import Session
+from dateutil.relativedelta import relativedelta
+from datetime import datetime, timedelta
+import os
+
+import backend.auth.models  # noqa: F401  (register tables on Base.metadata)
+from backend.database.sharding import shard_map
+from backend.finance.models import (
+    Transaction,
+    ArchivedTransaction,
+    TransactionRollup,
+    TransactionTombstone,
+)
+from backend.finance.sync_versions import record_pruned
+from backend.utils.cache import Cache
+from backend.utils.logger import logger
+
+# Dashboard compares this month with the last one; keep both hot
+MIN_HORIZON_MONTHS = 2
+ARCHIVE_HORIZON_MONTHS = max(MIN_HORIZON_MONTHS, int(os.getenv("ARCHIVE_HORIZON_MONTHS", 24)))
+
+# Delta-sync clients older than this get a full resync instead of tombstones
+TOMBSTONE_RETENTION_DAYS = int(os.getenv("TOMBSTONE_RETENTION_DAYS", 90))
+
+# Columns shared by the hot and archive tables, in TransactionOut order
+TRANSACTION_COLUMNS = (
+    "id", "user_id", "type", "description", "category", "amount",
+    "date", "created_at", "updated_at",
+)
+
+
+def archive_cutoff(horizon_months: int = ARCHIVE_HORIZON_MONTHS, now: datetime | None = None) -> datetime:
+    """First instant that stays hot. Month-aligned, so a month is never split."""
+    now = now or datetime.utcnow()
+    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    return month_start - relativedelta(months=horizon_months)
+
+
+def reaches_archive(start_date: datetime | None) -> bool:
+    """Whether a listing starting at `start_date` can include archived rows."""
+    return start_date is None or start_date < archive_cutoff()
+
+
+def rollup_totals_query(user_id: str, since_month: str | None = None):
+    """(month, type, total) of archived transactions, optionally from `since_month` on."""
+    query = (
+        select(
+            TransactionRollup.month,
+            TransactionRollup.type,
+            func.sum(TransactionRollup.total).label("total"),
+        )
+        .where(TransactionRollup.user_id == user_id)
+        .group_by(TransactionRollup.month, TransactionRollup.type)
+    )
+    if since_month:
+        query = query.where(TransactionRollup.month >= since_month)
+    return query
+
+
+def rollup_category_query(user_id: str, ttype):
+    """(category, month, total) of archived transactions of one type."""
+    return (
+        select(
+            TransactionRollup.category,
+            TransactionRollup.month,
+            func.sum(TransactionRollup.total).label("total"),
+        )
+        .where(TransactionRollup.user_id == user_id, TransactionRollup.type == ttype)
+        .group_by(TransactionRollup.category, TransactionRollup.month)
+    )
+
+
+def rollup_lifetime_query(user_id: str):
+    """(type, total) of everything archived for a user."""
+    return (
+        select(TransactionRollup.type, func.sum(TransactionRollup.total).label("total"))
+        .where(TransactionRollup.user_id == user_id)
+        .group_by(TransactionRollup.type)
+    )
+
+
+def archive_user(db: Session, user_id: str, cutoff: datetime) -> int:
+    """Move one user's transactions dated before `cutoff`. Returns rows moved."""
+    old = db.scalars(
+        select(Transaction).where(Transaction.user_id == user_id, Transaction.date < cutoff)
+    ).all()
+    if not old:
+        return 0
+
+    totals: dict[tuple, list] = {}
+    for t in old:
+        key = (t.date.strftime("%Y-%m"), t.type, t.category)
+        bucket = totals.setdefault(key, [0.0, 0])
+        bucket[0] += t.amount
+        bucket[1] += 1
+
+    db.add_all([
+        ArchivedTransaction(**{c: getattr(t, c) for c in TRANSACTION_COLUMNS})
+        for t in old
+    ])
+
+    for (month, ttype, category), (total, count) in totals.items():
+        rollup = db.get(TransactionRollup, (user_id, month, ttype, category))
+        if rollup is None:
+            db.add(TransactionRollup(
+                user_id=user_id, month=month, type=ttype, category=category,
+                total=total, count=count,
+            ))
+        else:
+            rollup.total += total
+            rollup.count += count
+
+    db.execute(
+        delete(Transaction).where(Transaction.user_id == user_id, Transaction.date < cutoff)
+    )
+    db.commit()
+    return len(old)
+
+
+def run_archival() -> int:
+    """Archive every user on every shard. Each user is its own transaction."""
+    cutoff = archive_cutoff()
+    moved = 0
+
+    for router in shard_map.routers:
+        with router.Session() as db:
+            user_ids = db.scalars(
+                select(Transaction.user_id).where(Transaction.date < cutoff).distinct()
+            ).all()
+            for user_id in user_ids:
+                try:
+                    count = archive_user(db, user_id, cutoff)
+                except Exception as e:
+                    db.rollback()
+                    logger.error(f"Archival failed for user {user_id}: {e}")
+                    continue
+                moved += count
+                Cache.clear_user_cache(user_id)
+
+    logger.info(f"Archived {moved} transactions older than {cutoff:%Y-%m}")
+
+    prune_tombstones()
+    return moved
+
+
+def prune_tombstones() -> int:
+    """Drop delete markers older than TOMBSTONE_RETENTION_DAYS on every shard."""
+    horizon = datetime.utcnow() - timedelta(days=TOMBSTONE_RETENTION_DAYS)
+    pruned = 0
+    for router in shard_map.routers:
+        with router.Session() as db:
+            expired = TransactionTombstone.deleted_at < horizon
+            # Clients synced to before these versions can no longer catch up
+            record_pruned(db, dict(db.execute(
+                select(TransactionTombstone.user_id, func.max(TransactionTombstone.sync_version))
+                .where(expired, TransactionTombstone.sync_version.is_not(None))
+                .group_by(TransactionTombstone.user_id)
+            ).all()))
+            pruned += db.execute(delete(TransactionTombstone).where(expired)).rowcount
+            db.commit()
+    return pruned
+
+
+def main():
+    print(f"Archived {run_archival()} transactions")
+
+
+if __name__ == "__main__":
+    main()
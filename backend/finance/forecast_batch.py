@@ -0,0 +1,201 @@
+"""
+Batch forecast precomputation.
+
+Evaluates the stored model of every active user (forecast state written in
+the last FORECAST_ACTIVE_DAYS) chunk by chunk; evaluate_many does the math
+for a whole chunk in one pass. The response and its rule-based insights
+land in `forecasts` under the user's data version, and get_forecast serves
+that row until the user writes again.
+
+    python -m backend.finance.forecast_batch --workers 4
+
+With FORECAST_BATCH_HOUR set (UTC hour), the API also runs the batch
+nightly in a background thread, one process per night (Redis claim), with
+the chunks going through forecast_pool.
+"""
+
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import select, delete
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Optional, Tuple
+import argparse
+import threading
+import os
+
+import backend.auth.models  # noqa: F401  (register tables on Base.metadata)
+from backend.database.sharding import shard_map
+from backend.finance.models import ForecastState, ForecastSettings, Forecast
+from backend.finance.forecast_state import (
+    StateSnapshot,
+    snapshot,
+    data_version,
+    evaluate_many,
+)
+from backend.finance.forecast_service import (
+    forecast_payload,
+    forecast_pool,
+    DEFAULT_FORECAST_MODEL,
+)
+from backend.utils.cache import Cache
+from backend.utils.logger import logger
+
+FORECAST_BATCH_CHUNK = int(os.getenv("FORECAST_BATCH_CHUNK", 500))
+FORECAST_ACTIVE_DAYS = int(os.getenv("FORECAST_ACTIVE_DAYS", 90))
+FORECAST_BATCH_HOUR = os.getenv("FORECAST_BATCH_HOUR")
+
+ChunkUsers = Dict[str, Tuple[List[StateSnapshot], str]]
+
+
+def compute_chunk(users: ChunkUsers) -> Dict[str, Dict[str, Any]]:
+    """Worker job: {user_id: payload} for the users with enough history."""
+    return {
+        user_id: forecast_payload(result)
+        for user_id, result in evaluate_many(users).items()
+        if result["months"] >= 2
+    }
+
+
+def store_forecast(db: Session, user_id: str, version: str, payload: Dict[str, Any]) -> None:
+    """Keep one row per user: the forecast of their current data version."""
+    db.execute(delete(Forecast).where(Forecast.user_id == user_id, Forecast.version != version))
+    db.merge(Forecast(user_id=user_id, version=version, payload=payload, computed_at=datetime.utcnow()))
+
+
+def _active_user_ids(db: Session) -> List[str]:
+    since = datetime.utcnow() - timedelta(days=FORECAST_ACTIVE_DAYS)
+    return db.scalars(
+        select(ForecastState.user_id).where(ForecastState.updated_at >= since).distinct()
+    ).all()
+
+
+def _load_chunk(db: Session, user_ids: List[str]) -> Tuple[ChunkUsers, Dict[str, str]]:
+    """States and models of the users whose stored forecast is out of date."""
+    states: Dict[str, list] = {}
+    for state in db.scalars(
+        select(ForecastState)
+        .where(ForecastState.user_id.in_(user_ids))
+        .order_by(ForecastState.user_id, ForecastState.category)
+    ):
+        states.setdefault(state.user_id, []).append(state)
+
+    models = dict(db.execute(
+        select(ForecastSettings.user_id, ForecastSettings.model)
+        .where(ForecastSettings.user_id.in_(user_ids))
+    ).all())
+    stored = set(db.execute(
+        select(Forecast.user_id, Forecast.version).where(Forecast.user_id.in_(user_ids))
+    ).all())
+
+    users, versions = {}, {}
+    for user_id, rows in states.items():
+        model = models.get(user_id, DEFAULT_FORECAST_MODEL)
+        version = data_version(rows, model)
+        if (user_id, version) not in stored:
+            users[user_id] = (snapshot(rows), model)
+            versions[user_id] = version
+    return users, versions
+
+
+def _store_chunk(db: Session, payloads: Dict[str, Dict[str, Any]], versions: Dict[str, str]) -> int:
+    for user_id, payload in payloads.items():
+        store_forecast(db, user_id, versions[user_id], payload)
+    db.commit()
+    return len(payloads)
+
+
+def _collect(db: Session, future, versions: Dict[str, str]) -> int:
+    try:
+        return _store_chunk(db, future.result(), versions)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Forecast batch chunk failed: {e}")
+        return 0
+
+
+def run_batch(executor: Optional[Executor] = None, in_flight: int = 8) -> int:
+    """
+    Precompute every active user's forecast on every shard. Chunks run on
+    `executor` (up to `in_flight` at a time), else through forecast_pool.
+    Returns the number of forecasts written.
+    """
+    written = 0
+    for router in shard_map.routers:
+        with router.Session() as db:
+            user_ids = _active_user_ids(db)
+            pending = []
+            for i in range(0, len(user_ids), FORECAST_BATCH_CHUNK):
+                users, versions = _load_chunk(db, user_ids[i:i + FORECAST_BATCH_CHUNK])
+                if not users:
+                    continue
+
+                if executor is None:
+                    try:
+                        payloads = forecast_pool.run(compute_chunk, users)
+                    except Exception as e:
+                        # Shed or timed out: these users get computed on demand
+                        logger.error(f"Forecast batch chunk failed: {e}")
+                        continue
+                    written += _store_chunk(db, payloads, versions)
+                    continue
+
+                pending.append((executor.submit(compute_chunk, users), versions))
+                if len(pending) >= in_flight:
+                    written += _collect(db, *pending.pop(0))
+
+            for future, versions in pending:
+                written += _collect(db, future, versions)
+
+    logger.info(f"Forecast batch wrote {written} forecasts")
+    return written
+
+
+# ==== SCHEDULER ====
+
+def _seconds_until(hour: int, now: Optional[datetime] = None) -> float:
+    now = now or datetime.utcnow()
+    run_at = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+    if run_at <= now:
+        run_at += timedelta(days=1)
+    return (run_at - now).total_seconds()
+
+
+def start_scheduler() -> Optional[threading.Event]:
+    """Run the batch nightly at FORECAST_BATCH_HOUR. Returns the stop event."""
+    if FORECAST_BATCH_HOUR is None:
+        return None
+
+    hour = int(FORECAST_BATCH_HOUR)
+    stop = threading.Event()
+
+    def loop():
+        while not stop.wait(_seconds_until(hour)):
+            # Every API worker wakes up; the first one to claim the night runs it
+            if not Cache.acquire(f"forecast_batch:{datetime.utcnow():%Y-%m-%d}", ttl=23 * 3600):
+                continue
+            try:
+                run_batch()
+            except Exception as e:
+                logger.error(f"Nightly forecast batch failed: {e}")
+
+    threading.Thread(target=loop, name="forecast-batch", daemon=True).start()
+    logger.info(f"Forecast batch scheduled daily at {hour:02d}:00 UTC")
+    return stop
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute forecasts for active users")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="worker processes (0 computes in this process)")
+    args = parser.parse_args()
+
+    if args.workers:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            written = run_batch(executor, in_flight=2 * args.workers)
+    else:
+        written = run_batch()
+    print(f"Wrote {written} forecasts")
+
+
+if __name__ == "__main__":
+    main()
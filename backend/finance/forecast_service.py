@@ -4,20 +4,20 @@ Fully corrected for Google Generative Language API + OpenAI-style fallback.
 """
 
 from datetime import datetime
-from typing import List, Dict, Any, Tuple
+from functools import partial
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
 import os
 import json
 import numpy as np
-import statistics
 import logging
-import requests
-from sklearn.linear_model import LinearRegression
 from dotenv import load_dotenv
 
 load_dotenv()
 
-from backend.utils.cache import Cache
 from backend.utils.logger import logger
+from backend.utils.llm_cache import llm_cache
+from backend.finance.llm_providers import call_gemini_for_insights, stream_insight_text
+from backend.utils.process_pool import BoundedProcessPool
 
 if logger is None:
     logger = logging.getLogger(__name__)
@@ -25,14 +25,28 @@ if logger is None:
 # -----------------------------
 # Environment
 # -----------------------------
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-GEMINI_ENDPOINT = os.getenv(
-    "GEMINI_ENDPOINT",
-    "https://generativelanguage.googleapis.com/v1beta/models/gemini-3-pro-preview:generateContent"
-)
-
 CACHE_TTL = 300  # 5 minutes
 
+# Forecast math runs in this pool (see backend/utils/process_pool.py);
+# 0 workers runs it inline
+FORECAST_POOL_WORKERS = int(os.getenv("FORECAST_POOL_WORKERS", 2))
+FORECAST_POOL_MAX_PENDING = int(os.getenv("FORECAST_POOL_MAX_PENDING", 32))
+FORECAST_JOB_TIMEOUT = float(os.getenv("FORECAST_JOB_TIMEOUT", 10))
+
+SEASON_LENGTH = 12  # months
+
+# Insight prompt: character budget, categories listed, anomaly threshold (z-score)
+LLM_PROMPT_MAX_CHARS = int(os.getenv("LLM_PROMPT_MAX_CHARS", 600))
+PROMPT_TOP_CATEGORIES = 5
+ANOMALY_Z = 1.5
+
+forecast_pool = BoundedProcessPool(
+    "forecast_pool",
+    workers=FORECAST_POOL_WORKERS,
+    max_pending=FORECAST_POOL_MAX_PENDING,
+    timeout=FORECAST_JOB_TIMEOUT,
+)
+
 # -----------------------------
 # Basic ML Utilities
 # -----------------------------
@@ -50,138 +64,191 @@ def prepare_monthly_series(monthly_values: List[Tuple[datetime, float]]):
     return X, y, labels
 
 
-def linear_forecast(y: np.ndarray, horizon: int = 6) -> List[float]:
-    """Linear regression for y with h-step forecast."""
-    if y is None or y.size == 0:
-        return [0.0] * horizon
+def linear_fit_batch(Y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Ordinary least squares of every row of Y (series × points) against
+    x = 0..n-1, in closed form. Returns (slope, intercept), one per row.
+    Same result as fitting sklearn's LinearRegression per row.
+    """
+    Y = np.atleast_2d(np.asarray(Y, float))
+    n = Y.shape[1]
+    if n < 2:
+        # A single point is a flat line through it
+        intercept = Y[:, 0].copy() if n else np.zeros(Y.shape[0])
+        return np.zeros(Y.shape[0]), intercept
 
-    try:
-        X = np.arange(y.size).reshape(-1, 1)
-        model = LinearRegression()
-        model.fit(X, y)
+    x = np.arange(n, dtype=float)
+    x_centered = x - x.mean()
+    y_mean = Y.mean(axis=1)
 
-        future = np.arange(y.size, y.size + horizon).reshape(-1, 1)
-        preds = model.predict(future)
-    except Exception as e:
-        logger.error(f"linear_forecast failed: {e}")
-        preds = [float(y[-1])] * horizon
+    slope = (Y @ x_centered) / (x_centered @ x_centered)
+    intercept = y_mean - slope * x.mean()
+    return slope, intercept
 
-    return [max(0.0, float(p)) for p in preds]
 
+def linear_forecast_batch(Y: np.ndarray, horizon: int = 6) -> np.ndarray:
+    """h-step linear trend forecast of every row of Y, clipped at zero."""
+    Y = np.atleast_2d(np.asarray(Y, float))
+    slope, intercept = linear_fit_batch(Y)
+    future = np.arange(Y.shape[1], Y.shape[1] + horizon, dtype=float)
+    return np.maximum(intercept[:, None] + slope[:, None] * future, 0.0)
 
-def predict_category_next_month(history: List[float]) -> float:
-    """Local simple ensemble model."""
-    if not history:
-        return 0.0
 
-    try:
-        lr_pred = linear_forecast(np.array(history, float), horizon=1)[0]
-    except Exception:
-        lr_pred = history[-1]
-
-    overall = statistics.mean(history)
-    recent = statistics.mean(history[-3:]) if len(history) >= 3 else overall
-    season_adj = recent / overall if overall > 0 else 1.0
-
-    pred = 0.7 * lr_pred + 0.3 * (history[-1] * season_adj)
-    return float(max(0.0, pred))
-
-# -----------------------------
-# Gemini API Callers
-# -----------------------------
-def _call_google_generative(endpoint: str, api_key: str, prompt: str) -> str:
-    """Correct Google Gemini 3 request format."""
-    body = {
-        "contents": [{
-            "parts": [{"text": prompt}]
-        }]
-    }
-
-    url = f"{endpoint}?key={api_key}"
-    headers = {"Content-Type": "application/json"}
-
-    try:
-        resp = requests.post(url, headers=headers, json=body, timeout=12)
-        resp.raise_for_status()
-        data = resp.json()
-
-        # Handle promptFeedback
-        if data.get("promptFeedback", {}).get("blockReason"):
-            return "Gemini blocked the prompt. Try rewriting it."
-
-        # Extract text
-        if "candidates" in data:
-            cand = data["candidates"][0]
-            parts = cand.get("content", {}).get("parts", [])
-            if parts and "text" in parts[0]:
-                return parts[0]["text"].strip()
-
-        return ""
-    except Exception as e:
-        logger.error(f"Google Gemini call failed: {e}")
-        return ""
+def linear_forecast(y: np.ndarray, horizon: int = 6) -> List[float]:
+    """Linear regression for y with h-step forecast."""
+    if y is None or y.size == 0:
+        return [0.0] * horizon
 
+    return [float(p) for p in linear_forecast_batch(y, horizon)[0]]
+
+
+def linear_ensemble_batch(Y: np.ndarray, horizon: int = 6) -> np.ndarray:
+    """Trend forecast whose first step is the trend/season ensemble."""
+    Y = np.atleast_2d(np.asarray(Y, float))
+    preds = linear_forecast_batch(Y, horizon)
+    preds[:, 0] = predict_categories_next_month(Y)
+    return preds
+
+
+def seasonal_naive_batch(Y: np.ndarray, horizon: int = 6, season: int = SEASON_LENGTH) -> np.ndarray:
+    """Repeat the same month of the last season; plain naive below one season."""
+    Y = np.atleast_2d(np.asarray(Y, float))
+    n = Y.shape[1]
+    if n < season:
+        return np.repeat(Y[:, -1:], horizon, axis=1)
+
+    steps = n - season + np.arange(horizon) % season
+    return Y[:, steps].copy()
+
+
+def holt_winters_batch(
+    Y: np.ndarray,
+    horizon: int = 6,
+    season: int = SEASON_LENGTH,
+    alpha: float = 0.4,
+    beta: float = 0.1,
+    gamma: float = 0.3,
+) -> np.ndarray:
+    """
+    Additive Holt-Winters for every row of Y at once (loop over time,
+    vectorized over series). Needs two seasons to initialise; shorter
+    series get Holt's linear trend without the seasonal term.
+    """
+    Y = np.atleast_2d(np.asarray(Y, float))
+    n = Y.shape[1]
+    steps = np.arange(1, horizon + 1)
+
+    if n < 2:
+        return np.repeat(np.maximum(Y[:, -1:], 0.0), horizon, axis=1)
+
+    if n < 2 * season:
+        level, trend = Y[:, 0], Y[:, 1] - Y[:, 0]
+        for t in range(1, n):
+            new_level = alpha * Y[:, t] + (1 - alpha) * (level + trend)
+            trend = beta * (new_level - level) + (1 - beta) * trend
+            level = new_level
+        return np.maximum(level[:, None] + steps * trend[:, None], 0.0)
+
+    level = Y[:, :season].mean(axis=1)
+    trend = (Y[:, season:2 * season].mean(axis=1) - level) / season
+    seasonal = Y[:, :season] - level[:, None]
+
+    for t in range(season, n):
+        s = seasonal[:, t % season]
+        new_level = alpha * (Y[:, t] - s) + (1 - alpha) * (level + trend)
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        seasonal[:, t % season] = gamma * (Y[:, t] - new_level) + (1 - gamma) * s
+        level = new_level
+
+    future_season = seasonal[:, (n + steps - 1) % season]
+    return np.maximum(level[:, None] + steps * trend[:, None] + future_season, 0.0)
+
+
+# Per-user selectable models: (series × months, horizon) → series × horizon
+FORECAST_MODELS = {
+    "linear": linear_ensemble_batch,
+    "holt_winters": holt_winters_batch,
+    "seasonal_naive": seasonal_naive_batch,
+}
+DEFAULT_FORECAST_MODEL = "linear"
+
+
+def build_category_matrix(rows) -> Tuple[List[str], List[datetime], np.ndarray]:
+    """
+    [(category, year, month, amount)] → (categories, month starts, matrix).
+    The matrix is dense (categories × months) from the first to the last
+    month with data; months without spending are zero.
+    """
+    if not rows:
+        return [], [], np.zeros((0, 0))
+
+    categories = sorted({r[0] for r in rows})
+    cat_index = {c: i for i, c in enumerate(categories)}
+
+    ordinals = np.array([int(r[1]) * 12 + int(r[2]) - 1 for r in rows])
+    first = int(ordinals.min())
+    width = int(ordinals.max()) - first + 1
+
+    matrix = np.zeros((len(categories), width))
+    np.add.at(
+        matrix,
+        (np.array([cat_index[r[0]] for r in rows]), ordinals - first),
+        np.array([float(r[3] or 0) for r in rows]),
+    )
 
-def _call_openai_style(endpoint: str, api_key: str, prompt: str, model="gemini-3-pro-preview"):
-    """Compatible with OpenRouter, Fireworks, etc."""
-    body = {
-        "model": model,
-        "messages": [
-            {"role": "system", "content": "You are an AI assistant generating finance insights."},
-            {"role": "user", "content": prompt},
-        ]
-    }
+    months = [datetime((first + i) // 12, (first + i) % 12 + 1, 1) for i in range(width)]
+    return categories, months, matrix
 
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {api_key}"
-    }
 
-    try:
-        resp = requests.post(endpoint, headers=headers, json=body, timeout=12)
-        resp.raise_for_status()
-        data = resp.json()
+def predict_categories_next_month(matrix: np.ndarray) -> np.ndarray:
+    """
+    Local simple ensemble model, for every row (category) of a
+    (categories × months) matrix at once.
+    """
+    n_cats, n_months = matrix.shape
+    if n_cats == 0 or n_months == 0:
+        return np.zeros(n_cats)
 
-        choices = data.get("choices")
-        if choices:
-            msg = choices[0].get("message", {}).get("content")
-            return msg.strip() if msg else ""
+    last = matrix[:, -1]
 
-        return ""
-    except Exception as e:
-        logger.error(f"OpenAI-style Gemini call failed: {e}")
-        return ""
+    # Least-squares trend of every row, evaluated one step ahead
+    if n_months > 1:
+        lr_pred = linear_forecast_batch(matrix, horizon=1)[:, 0]
+    else:
+        lr_pred = last
 
+    overall = matrix.mean(axis=1)
+    recent = matrix[:, -3:].mean(axis=1) if n_months >= 3 else overall
+    return ensemble_next_month(lr_pred, last, overall, recent)
 
-def call_gemini_for_insights(prompt: str) -> str:
-    """Select correct API shape automatically."""
-    if not GEMINI_API_KEY:
-        logger.info("Gemini key missing; skipping insights.")
-        return ""
 
-    ep = GEMINI_ENDPOINT.lower()
+def ensemble_next_month(
+    lr_pred: np.ndarray,
+    last: np.ndarray,
+    overall: np.ndarray,
+    recent: np.ndarray,
+) -> np.ndarray:
+    """Blend trend and seasonally adjusted last month, per category."""
+    season_adj = np.divide(recent, overall, out=np.ones(len(overall)), where=overall > 0)
+    pred = 0.7 * lr_pred + 0.3 * (last * season_adj)
+    return np.maximum(pred, 0.0)
 
-    if "googleapis" in ep or "generativelanguage" in ep:
-        return _call_google_generative(GEMINI_ENDPOINT, GEMINI_API_KEY, prompt)
-    else:
-        return _call_openai_style(GEMINI_ENDPOINT, GEMINI_API_KEY, prompt)
 
+def predict_category_next_month(history: List[float]) -> float:
+    """Single-series form of predict_categories_next_month."""
+    if not history:
+        return 0.0
+    return float(predict_categories_next_month(np.array([history], float))[0])
 
 # -----------------------------
 # Insight Builder
 # -----------------------------
-def build_insights_payload(
-    user_id: str,
+def rule_insights(
     total_pred: float,
     monthly_trend: List[Dict[str, Any]],
-    category_preds: Dict[str, float]
-) -> Dict[str, Any]:
-
-    cache_key = f"forecast_insights:{user_id}:{int(total_pred)}"
-    cached = Cache.get(cache_key)
-    if cached:
-        return cached
-
+    category_preds: Dict[str, float],
+) -> List[Dict[str, Any]]:
+    """Insights derived from the forecast alone (no LLM call)."""
     insights = []
 
     # Basic trend insight
@@ -207,22 +274,123 @@ def build_insights_payload(
             "description": f"{cat} expected to reach ₹{amt:.0f} next month."
         })
 
-    # Gemini-enhanced insight
-    prompt = (
-        f"Monthly expenses: {monthly_trend}. "
-        f"Predicted next month total: {total_pred}. "
-        f"Category predictions: {category_preds}. "
-        "Generate 3 insights (title + explanation) plus one recommended action."
-    )
+    return insights
+
 
-    gemini_text = call_gemini_for_insights(prompt)
-    if gemini_text:
-        insights.insert(0, {"title": "AI Insight", "type": "AI", "description": gemini_text})
+def forecast_payload(result: Dict[str, Any]) -> Dict[str, Any]:
+    """API response for an evaluated model (see forecast_state.evaluate)."""
+    trend = [{"month": m.strftime("%b"), "expenses": v} for m, v in result["trend"]]
+    forecast_data = [{"month": m.strftime("%b"), "predicted": v} for m, v in result["forecast"]]
 
-    payload = {
-        "predicted_total_next_month": float(total_pred),
-        "insights": insights
+    category_preds = {
+        cat: round(val, 2) for cat, val in result["category_predictions"].items()
     }
 
-    Cache.set(cache_key, payload, ttl=3600)
-    return payload
\ No newline at end of file
+    total_pred = sum(v for v in category_preds.values())
+
+    return {
+        "predicted_total_next_month": total_pred,
+        "trend": trend,
+        "forecast": forecast_data,
+        "category_predictions": category_preds,
+        "insights": rule_insights(total_pred, trend, category_preds),
+    }
+
+
+def _pct(new: float, old: float) -> str:
+    return f"{(new - old) / old * 100:+.0f}%" if old > 0 else "n/a"
+
+
+def _category_line(names: np.ndarray, values: np.ndarray, k: int) -> str:
+    total = values.sum()
+    if not len(names) or total <= 0:
+        return ""
+    order = np.argsort(-values, kind="stable")
+    top = [f"{names[i]} {values[i]:.0f} ({values[i] / total:.0%})" for i in order[:k]]
+    if len(order) > k:
+        rest = values[order[k:]].sum()
+        top.append(f"{len(order) - k} others {rest:.0f} ({rest / total:.0%})")
+    return "Next month by category: " + ", ".join(top) + "."
+
+
+def insight_prompt(payload: Dict[str, Any], max_chars: int = LLM_PROMPT_MAX_CHARS) -> str:
+    """
+    Compact statistical summary of a forecast for the LLM: last month and
+    its growth, the forecast delta, recent vs earlier average, anomalous
+    months and the top categories, in at most `max_chars` characters.
+    Anomalies go first, then averages, then categories past the top one,
+    until the prompt fits.
+    """
+    months = [t["month"] for t in payload["trend"]]
+    y = np.array([t["expenses"] for t in payload["trend"]], dtype=float)
+    total_pred = float(payload["predicted_total_next_month"])
+    names = np.array(list(payload["category_predictions"]), dtype=object)
+    values = np.array(list(payload["category_predictions"].values()), dtype=float)
+
+    core, averages, anomalies = [], "", ""
+    if len(y):
+        last = f"Last month ({months[-1]}): {y[-1]:.0f}"
+        if len(y) > 1:
+            last += f", {_pct(y[-1], y[-2])} vs {months[-2]}"
+        core.append(last + ".")
+    core.append(f"Next month forecast: {total_pred:.0f}" + (f" ({_pct(total_pred, y[-1])})." if len(y) else "."))
+
+    if len(y) >= 4:
+        half = len(y) // 2
+        recent, earlier = y[half:].mean(), y[:half].mean()
+        averages = (f"Average {y.mean():.0f}/month over {len(y)} months; "
+                    f"last {len(y) - half} months {recent:.0f} vs {earlier:.0f} before ({_pct(recent, earlier)}).")
+    if len(y) >= 3 and y.std() > 0:
+        z = (y - y.mean()) / y.std()
+        unusual = np.flatnonzero(np.abs(z) >= ANOMALY_Z)
+        if unusual.size:
+            anomalies = "Unusual months: " + ", ".join(
+                f"{months[i]} {y[i]:.0f} ({'high' if z[i] > 0 else 'low'})" for i in unusual
+            ) + "."
+
+    head = "Expense summary (INR)."
+    ask = "Generate 3 insights (title + explanation) plus one recommended action."
+    k = min(PROMPT_TOP_CATEGORIES, len(names))
+    attempts = [(averages, anomalies, k), (averages, "", k)] + [("", "", j) for j in range(k, 0, -1)]
+
+    for avg, anom, top_k in attempts:
+        parts = [head, *core, avg, anom, _category_line(names, values, top_k), ask]
+        prompt = " ".join(p for p in parts if p)
+        if len(prompt) <= max_chars:
+            return prompt
+
+    # Still too long (huge category names): keep the ask, cut the summary
+    return prompt[:max(0, max_chars - len(ask) - 1)].rstrip() + " " + ask
+
+
+def _as_insight(gemini_text: str) -> Optional[Dict[str, Any]]:
+    return {"title": "AI Insight", "type": "AI", "description": gemini_text} if gemini_text else None
+
+
+async def ai_insight(payload: Dict[str, Any], user_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Gemini-enhanced insight for a forecast payload, or None.
+    Cached by prompt content, so any forecast with the same numbers
+    shares one provider call (charged to the user who made it).
+    """
+    call = partial(call_gemini_for_insights, user_id=user_id)
+    gemini_text = await llm_cache.get_or_call("insights", insight_prompt(payload), call)
+    return _as_insight(gemini_text)
+
+
+async def stream_ai_insight(payload: Dict[str, Any], user_id: str) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    ("token", text) events while the provider streams the insight, then
+    ("done", insight or None). A cached insight is just the "done" event.
+    """
+    prompt = insight_prompt(payload)
+    gemini_text = await llm_cache.lookup("insights", prompt)
+    if gemini_text is None:
+        parts = []
+        stream = partial(stream_insight_text, user_id=user_id)
+        async for chunk in llm_cache.stream("insights", prompt, stream):
+            parts.append(chunk)
+            yield "token", chunk
+        gemini_text = "".join(parts).strip()
+
+    yield "done", _as_insight(gemini_text)
@@ -0,0 +1,373 @@
+"""
+Online forecast model state.
+
+`forecast_states` keeps, per user and expense category, everything the
+next-month model needs: Σy and Σxy of the monthly totals (x = month index),
+the dense month range they cover and the totals of the last RECENT_MONTHS
+months. The linear model evaluates from the sums; the seasonal models in
+forecast_service.FORECAST_MODELS run over the stored window.
+
+Every expense write updates one row in O(1), in the same DB transaction as
+the write, so get_forecast evaluates the stored model instead of refitting
+from full history. n, Σx and Σx² are not stored: months are dense, so they
+follow in closed form from the month range.
+
+Late (backdated) writes update the regression sums exactly, and the stored
+window too when they fall inside it, so state does not depend on the order
+of writes. Month ranges only grow: a month emptied by deletes stays in as a
+zero month. Users without state (e.g. from before this table existed) are
+rebuilt from history; the same command drops the unused level and trend
+columns left by earlier versions of the table:
+
+    python -m backend.finance.forecast_state
+"""
+
+from sqlalchemy import select, delete, func, extract, inspect, text
+from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+import backend.auth.models  # noqa: F401  (register tables on Base.metadata)
+from backend.database.sharding import shard_map
+from backend.finance.models import (
+    Transaction,
+    TransactionType,
+    TransactionRollup,
+    ForecastState,
+)
+from backend.finance.archive_service import rollup_category_query
+from backend.finance.forecast_service import (
+    ensemble_next_month,
+    FORECAST_MODELS,
+    DEFAULT_FORECAST_MODEL,
+)
+from backend.utils.logger import logger
+
+# Two seasons, enough to initialise Holt-Winters from the stored window
+RECENT_MONTHS = 24
+TREND_MONTHS = 6
+EPOCH_YEAR = 2000
+
+# (category, date, amount) of one expense, or None
+Expense = Optional[Tuple[str, datetime, float]]
+
+
+def month_index(dt: datetime) -> int:
+    return (dt.year - EPOCH_YEAR) * 12 + dt.month - 1
+
+
+def month_start(index: int) -> datetime:
+    return datetime(EPOCH_YEAR + index // 12, index % 12 + 1, 1)
+
+
+def _squares(k: int) -> float:
+    """0² + 1² + ... + k² (and its polynomial extension below zero)."""
+    return k * (k + 1) * (2 * k + 1) / 6
+
+
+def range_sums(first: int, last: int) -> Tuple[int, float, float]:
+    """n, Σx and Σx² over the dense month range first..last."""
+    n = last - first + 1
+    return n, (first + last) * n / 2, _squares(last) - _squares(first - 1)
+
+
+def as_expense(transaction: Transaction) -> Expense:
+    if transaction.type != TransactionType.EXPENSE:
+        return None
+    return transaction.category, transaction.date, transaction.amount
+
+
+# ==== UPDATES ====
+
+def _apply(db: Session, user_id: str, category: str, date: datetime, amount: float) -> None:
+    m = month_index(date)
+    state = db.get(ForecastState, (user_id, category), with_for_update=True)
+    if state is None:
+        state = ForecastState(
+            user_id=user_id, category=category, first_month=m, last_month=m,
+            sum_y=0.0, sum_xy=0.0, recent=[0.0] * RECENT_MONTHS, version=0,
+        )
+        db.add(state)
+
+    # Rows written with a shorter window are padded with zero months
+    recent = ([0.0] * RECENT_MONTHS + list(state.recent))[-RECENT_MONTHS:]
+    if m > state.last_month:
+        gap = m - state.last_month
+        recent = (recent + [0.0] * gap)[-RECENT_MONTHS:]
+        state.last_month = m
+    elif m < state.first_month:
+        state.first_month = m
+
+    state.sum_y += amount
+    state.sum_xy += m * amount
+
+    offset = state.last_month - m
+    if offset < RECENT_MONTHS:
+        recent[-1 - offset] += amount
+    state.recent = recent
+    state.version += 1
+    # Sessions don't autoflush; the next locking get must see this row
+    db.flush()
+
+
+def record_expense_change(db: Session, user_id: str, old: Expense, new: Expense) -> None:
+    """
+    Fold a transaction write into the user's state: `old` is what it
+    counted as before (None for creates), `new` after (None for deletes).
+    Call after the write is staged and before the commit.
+    """
+    if old is None and new is None:
+        return
+
+    db.flush()
+    has_state = db.scalar(
+        select(ForecastState.user_id).where(ForecastState.user_id == user_id).limit(1)
+    )
+    if has_state is None:
+        # Rebuilding reads the staged write, so there is nothing left to apply
+        rebuild_state(db, user_id)
+        return
+
+    if old is not None:
+        category, date, amount = old
+        _apply(db, user_id, category, date, -amount)
+    if new is not None:
+        category, date, amount = new
+        _apply(db, user_id, category, date, amount)
+
+
+def expense_history(db: Session, user_id: str) -> List[Tuple[str, int, int, float]]:
+    """(category, year, month, total) of every expense month, hot and archived."""
+    year = extract("year", Transaction.date)
+    month = extract("month", Transaction.date)
+
+    rows = [tuple(r) for r in db.execute(
+        select(Transaction.category, year, month, func.sum(Transaction.amount))
+        .where(Transaction.user_id == user_id, Transaction.type == TransactionType.EXPENSE)
+        .group_by(Transaction.category, year, month)
+    ).all()]
+
+    # Months past the archive horizon only survive as rollups
+    for category, month_key, total in db.execute(
+        rollup_category_query(user_id, TransactionType.EXPENSE)
+    ).all():
+        y, m = month_key.split("-")
+        rows.append((category, y, m, total))
+
+    return rows
+
+
+def rebuild_state(db: Session, user_id: str) -> List[ForecastState]:
+    """Replay a user's expense history into fresh state rows."""
+    previous = model_version(load_states(db, user_id))
+    db.execute(delete(ForecastState).where(ForecastState.user_id == user_id))
+
+    rows = sorted(expense_history(db, user_id), key=lambda r: (int(r[1]), int(r[2])))
+    for category, year, month, total in rows:
+        _apply(db, user_id, category, datetime(int(year), int(month), 1), float(total or 0))
+
+    states = load_states(db, user_id)
+    if states:
+        # Keep the version growing so version-keyed caches stay valid
+        states[0].version += previous
+        db.flush()
+    return states
+
+
+# ==== EVALUATION ====
+
+def load_states(db: Session, user_id: str) -> List[ForecastState]:
+    return db.scalars(
+        select(ForecastState)
+        .where(ForecastState.user_id == user_id)
+        .order_by(ForecastState.category)
+    ).all()
+
+
+def model_version(states: List[ForecastState]) -> int:
+    """Grows with every expense write of the user."""
+    return sum(s.version for s in states)
+
+
+def data_version(states: List[ForecastState], model: str) -> str:
+    """Identifies a forecast: the model and the data it was computed from."""
+    return f"{model}:{model_version(states)}"
+
+
+class StateSnapshot(NamedTuple):
+    """Plain copy of a state row, cheap to ship to a worker process."""
+    category: str
+    first_month: int
+    last_month: int
+    sum_y: float
+    sum_xy: float
+    recent: List[float]
+
+
+def snapshot(states: List[ForecastState]) -> List[StateSnapshot]:
+    return [
+        StateSnapshot(s.category, s.first_month, s.last_month, s.sum_y, s.sum_xy, list(s.recent))
+        for s in states
+    ]
+
+
+def _trend_line(sum_y, sum_xy, n, sum_x, sum_xx):
+    """Least-squares (slope, intercept) from sums; flat through the mean when n < 2."""
+    denom = n * sum_xx - sum_x * sum_x
+    slope = np.divide(
+        n * sum_xy - sum_x * sum_y, denom,
+        out=np.zeros(np.shape(sum_y)), where=(n > 1) & (denom != 0),
+    )
+    return slope, (sum_y - slope * sum_x) / n
+
+
+def evaluate_many(
+    users: Dict[str, Tuple[List[StateSnapshot], str]],
+    horizon: int = 6,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Evaluate the stored models of many users at once: {user_id: (state
+    rows, model name)} → {user_id: result as in `evaluate`}. Every user's
+    categories go through the same array operations; seasonal models run
+    once per (model, history length) group.
+    """
+    user_ids = [u for u, (rows, _) in users.items() if rows]
+    if not user_ids:
+        return {}
+
+    rows = [r for u in user_ids for r in users[u][0]]
+    owner = np.repeat(np.arange(len(user_ids)), [len(users[u][0]) for u in user_ids])
+
+    row_first = np.array([r.first_month for r in rows])
+    row_last = np.array([r.last_month for r in rows])
+    first = np.full(len(user_ids), row_first.max())
+    last = np.full(len(user_ids), row_last.min())
+    np.minimum.at(first, owner, row_first)
+    np.maximum.at(last, owner, row_last)
+
+    # Months are dense, so n, Σx and Σx² follow from each user's range
+    n = last - first + 1
+    sum_x = (first + last) * n / 2
+    sum_xx = _squares(last) - _squares(first - 1)
+
+    sum_y = np.array([r.sum_y for r in rows])
+    sum_xy = np.array([r.sum_xy for r in rows])
+
+    # Recent windows, aligned to each user's last month
+    window = np.zeros((len(rows), RECENT_MONTHS))
+    for i, (r, shift) in enumerate(zip(rows, last[owner] - row_last)):
+        stored = ([0.0] * RECENT_MONTHS + list(r.recent))[-RECENT_MONTHS:]
+        if shift < RECENT_MONTHS:
+            window[i, :RECENT_MONTHS - shift] = stored[shift:]
+
+    # Default model: trend/season ensemble from the sums, per category
+    n_r = n[owner]
+    slope, intercept = _trend_line(sum_y, sum_xy, n_r, sum_x[owner], sum_xx[owner])
+    lr_pred = np.where(n_r > 1, np.maximum(intercept + slope * (last[owner] + 1), 0.0), window[:, -1])
+
+    overall = sum_y / n_r
+    recent = np.where(n_r >= 3, window[:, -3:].mean(axis=1), overall)
+    category_preds = ensemble_next_month(lr_pred, window[:, -1], overall, recent)
+
+    # ... and a linear trend of the user's total for the horizon
+    total_slope, total_intercept = _trend_line(
+        np.bincount(owner, sum_y), np.bincount(owner, sum_xy), n, sum_x, sum_xx,
+    )
+    future = last[:, None] + 1 + np.arange(horizon)
+    forecast = np.maximum(total_intercept[:, None] + total_slope[:, None] * future, 0.0)
+
+    user_window = np.zeros((len(user_ids), RECENT_MONTHS))
+    np.add.at(user_window, owner, window)
+
+    # Other models run over the stored window
+    models = np.array([users[u][1] for u in user_ids])
+    lengths = np.minimum(n, RECENT_MONTHS)
+    for name in set(models) - {DEFAULT_FORECAST_MODEL}:
+        forecaster = FORECAST_MODELS[name]
+        for length in set(lengths[models == name]):
+            group = np.flatnonzero((models == name) & (lengths == length))
+            in_group = np.isin(owner, group)
+            category_preds[in_group] = forecaster(window[in_group, -length:], 1)[:, 0]
+            forecast[group] = forecaster(user_window[group, -length:], horizon)
+
+    results = {}
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(owner))])
+    for u, user_id in enumerate(user_ids):
+        shown = min(int(n[u]), TREND_MONTHS)
+        own = slice(offsets[u], offsets[u + 1])
+        results[user_id] = {
+            "months": int(n[u]),
+            "last_month": month_start(int(last[u])),
+            "trend": [
+                (month_start(int(last[u]) - shown + 1 + i), float(v))
+                for i, v in enumerate(user_window[u, -shown:])
+            ],
+            "forecast": [
+                (month_start(int(m)), float(v)) for m, v in zip(future[u], forecast[u])
+            ],
+            "category_predictions": {
+                r.category: float(v) for r, v in zip(rows[own], category_preds[own])
+            },
+        }
+    return results
+
+
+def evaluate(
+    states: List[StateSnapshot],
+    horizon: int = 6,
+    model: str = DEFAULT_FORECAST_MODEL,
+) -> Dict[str, Any]:
+    """
+    Evaluate one user's stored model: next-month prediction per category,
+    h-month total forecast and the recent monthly totals.
+    """
+    return evaluate_many({"": (states, model)}, horizon)[""]
+
+
+def _drop_obsolete_columns(engine) -> None:
+    # Earlier versions kept an unused Holt level/trend; its NOT NULL trend
+    # column would reject rows written without it
+    columns = inspect(engine)
+    if not columns.has_table(ForecastState.__tablename__):
+        return
+    present = {c["name"] for c in columns.get_columns(ForecastState.__tablename__)}
+    with engine.begin() as conn:
+        for name in ("level", "trend"):
+            if name in present:
+                conn.execute(text(f"ALTER TABLE {ForecastState.__tablename__} DROP COLUMN {name}"))
+                logger.info(f"Dropped {ForecastState.__tablename__}.{name}")
+
+
+def rebuild_all() -> int:
+    """Rebuild every user's state on every shard. Returns users rebuilt."""
+    rebuilt = 0
+    for router in shard_map.routers:
+        _drop_obsolete_columns(router.engine)
+        with router.Session() as db:
+            user_ids = set(db.scalars(
+                select(Transaction.user_id).where(Transaction.type == TransactionType.EXPENSE)
+            )) | set(db.scalars(
+                select(TransactionRollup.user_id).where(TransactionRollup.type == TransactionType.EXPENSE)
+            ))
+            for user_id in user_ids:
+                try:
+                    rebuild_state(db, user_id)
+                    db.commit()
+                except Exception as e:
+                    db.rollback()
+                    logger.error(f"Forecast state rebuild failed for user {user_id}: {e}")
+                    continue
+                rebuilt += 1
+
+    logger.info(f"Rebuilt forecast state for {rebuilt} users")
+    return rebuilt
+
+
+def main():
+    print(f"Rebuilt forecast state for {rebuild_all()} users")
+
+
+if __name__ == "__main__":
+    main()
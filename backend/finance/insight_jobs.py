@@ -0,0 +1,100 @@
+"""
+Deferred LLM insights.
+
+get_forecast answers with the model numbers and rule insights at once and
+hands out an insights_job_id; the LLM call runs as a task on the event
+loop, and GET /api/forecast/insights/{job_id} returns its text when ready.
+
+The job id is derived from the user and the data version, so repeated
+forecast requests for unchanged data share one job. Records live in this
+process and, with Redis up, in Redis as well so any worker can answer the
+poll. A pending record expires after INSIGHT_JOB_TIMEOUT, so a job lost
+with its worker is started again by the next forecast request.
+"""
+
+from typing import Any, Dict, Optional, Set, Tuple
+import asyncio
+import hashlib
+import time
+import os
+
+from backend.finance.forecast_service import ai_insight
+from backend.finance.llm_providers import providers
+from backend.utils.cache import Cache
+from backend.utils.logger import logger
+
+INSIGHT_JOB_TIMEOUT = int(os.getenv("INSIGHT_JOB_TIMEOUT", 60))
+INSIGHT_JOB_TTL = 3600
+LOCAL_JOB_LIMIT = 4096
+
+_jobs: Dict[str, Tuple[float, Dict[str, Any]]] = {}  # job_id -> (expires, record)
+_tasks: Set[asyncio.Task] = set()
+
+
+def job_id_for(user_id: str, version: str) -> str:
+    return hashlib.sha1(f"{user_id}:{version}".encode("utf-8")).hexdigest()[:20]
+
+
+def _remember(record: Dict[str, Any], ttl: int) -> None:
+    now = time.monotonic()
+    if len(_jobs) >= LOCAL_JOB_LIMIT:
+        for job_id in [j for j, (expires, _) in _jobs.items() if expires <= now]:
+            del _jobs[job_id]
+    _jobs[record["job_id"]] = (now + ttl, record)
+
+
+async def _save(record: Dict[str, Any], ttl: int) -> None:
+    _remember(record, ttl)
+    await Cache.aset(f"insight_job:{record['job_id']}", record, ttl=ttl)
+
+
+def _local_job(job_id: str) -> Optional[Dict[str, Any]]:
+    entry = _jobs.get(job_id)
+    if entry and entry[0] > time.monotonic():
+        return entry[1]
+    _jobs.pop(job_id, None)
+    return None
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """The job record; blocks on Redis, so not for the event loop (see aget_job)."""
+    return _local_job(job_id) or Cache.get(f"insight_job:{job_id}")
+
+
+async def aget_job(job_id: str) -> Optional[Dict[str, Any]]:
+    return _local_job(job_id) or await Cache.aget(f"insight_job:{job_id}")
+
+
+async def _run(job: Dict[str, Any], payload: Dict[str, Any]) -> None:
+    try:
+        insight = await ai_insight(payload, job["user_id"])
+        status = "done"
+    except Exception as e:
+        logger.error(f"Insight job {job['job_id']} failed: {e}")
+        insight, status = None, "failed"
+    await _save({**job, "status": status, "insight": insight}, INSIGHT_JOB_TTL)
+
+
+async def start_insight_job(user_id: str, payload: Dict[str, Any], version: str) -> Optional[Dict[str, Any]]:
+    """
+    The insight job of this forecast, started if needed.
+    None when no LLM is configured.
+    """
+    if not providers:
+        return None
+
+    job_id = job_id_for(user_id, version)
+    job = await aget_job(job_id)
+    if job:
+        return job
+
+    job = {"job_id": job_id, "user_id": user_id, "status": "pending", "insight": None}
+    if not await Cache.aacquire(f"insight_job_lock:{job_id}", ttl=INSIGHT_JOB_TIMEOUT):
+        # Another worker claimed it and will publish the record
+        return job
+
+    await _save(job, INSIGHT_JOB_TIMEOUT)
+    task = asyncio.create_task(_run(job, payload))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return job
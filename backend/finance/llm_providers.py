@@ -0,0 +1,361 @@
+"""
+LLM provider chain with hedged requests.
+
+Providers are tried in order: the primary from GEMINI_ENDPOINT and
+GEMINI_API_KEY, then LLM_FALLBACK_ENDPOINT, LLM_FALLBACK_API_KEY and
+LLM_FALLBACK_MODEL when set. Each provider can be Google-style
+(":generateContent") or OpenAI-style (chat completions).
+
+If a provider has not answered within its hedge delay, the next provider
+is fired as well and the first non-empty answer wins; the losers are
+cancelled. A provider that fails hands over at once. The hedge delay is
+the provider's p90 over its last LLM_LATENCY_WINDOW calls (before
+LLM_HEDGE_MIN_SAMPLES calls, LLM_HEDGE_DEFAULT_DELAY), shortened by its
+recent error rate so a failing provider gets hedged sooner.
+
+Streaming (stream_insight_text) walks the same chain without hedging:
+the first provider that produces a chunk serves the whole stream.
+
+Given a user id, every provider attempt is charged to it in the usage
+ledger (llm_usage.record_usage) with its outcome: ok, error, or cancelled
+for hedge losers and streams the client hung up on.
+
+Metrics, per provider: llm_provider_requests_total{outcome},
+llm_provider_seconds, llm_provider_p90_seconds, llm_provider_error_rate,
+llm_hedges_total for the hedges fired to it, llm_provider_streams_total
+and llm_provider_first_token_seconds.
+"""
+
+from collections import deque
+from typing import AsyncIterator, List, Optional, Tuple
+import asyncio
+import json
+import time
+import os
+from dotenv import load_dotenv
+from fastapi.concurrency import run_in_threadpool
+
+load_dotenv()
+
+from backend.finance.llm_usage import degrade_reason, record_usage
+from backend.utils.http_client import http_client
+from backend.utils.metrics import metrics
+from backend.utils.logger import logger
+
+# -----------------------------
+# Environment
+# -----------------------------
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_ENDPOINT = os.getenv(
+    "GEMINI_ENDPOINT",
+    "https://generativelanguage.googleapis.com/v1beta/models/gemini-3-pro-preview:generateContent"
+)
+LLM_FALLBACK_ENDPOINT = os.getenv("LLM_FALLBACK_ENDPOINT")
+LLM_FALLBACK_API_KEY = os.getenv("LLM_FALLBACK_API_KEY")
+LLM_FALLBACK_MODEL = os.getenv("LLM_FALLBACK_MODEL", "gemini-3-pro-preview")
+
+LLM_HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", 2.0))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", 20))
+LLM_LATENCY_WINDOW = int(os.getenv("LLM_LATENCY_WINDOW", 200))
+
+
+# -----------------------------
+# Provider API Callers
+# -----------------------------
+async def _call_google_generative(endpoint: str, api_key: str, prompt: str) -> str:
+    """Correct Google Gemini 3 request format."""
+    body = {
+        "contents": [{
+            "parts": [{"text": prompt}]
+        }]
+    }
+
+    url = f"{endpoint}?key={api_key}"
+    headers = {"Content-Type": "application/json"}
+
+    data = await http_client.post_json(url, body, headers=headers)
+    if not data:
+        return ""
+
+    try:
+        # Handle promptFeedback
+        if data.get("promptFeedback", {}).get("blockReason"):
+            return "Gemini blocked the prompt. Try rewriting it."
+
+        # Extract text
+        if "candidates" in data:
+            cand = data["candidates"][0]
+            parts = cand.get("content", {}).get("parts", [])
+            if parts and "text" in parts[0]:
+                return parts[0]["text"].strip()
+
+        return ""
+    except Exception as e:
+        logger.error(f"Google Gemini call failed: {e}")
+        return ""
+
+
+async def _call_openai_style(endpoint: str, api_key: str, prompt: str, model="gemini-3-pro-preview"):
+    """Compatible with OpenRouter, Fireworks, etc."""
+    body = {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": "You are an AI assistant generating finance insights."},
+            {"role": "user", "content": prompt},
+        ]
+    }
+
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {api_key}"
+    }
+
+    data = await http_client.post_json(endpoint, body, headers=headers)
+    if not data:
+        return ""
+
+    try:
+        choices = data.get("choices")
+        if choices:
+            msg = choices[0].get("message", {}).get("content")
+            return msg.strip() if msg else ""
+
+        return ""
+    except Exception as e:
+        logger.error(f"OpenAI-style Gemini call failed: {e}")
+        return ""
+
+
+async def _stream_google_generative(endpoint: str, api_key: str, prompt: str) -> AsyncIterator[str]:
+    """Text chunks from Gemini's streamGenerateContent (SSE) endpoint."""
+    body = {
+        "contents": [{
+            "parts": [{"text": prompt}]
+        }]
+    }
+
+    url = f"{endpoint.replace(':generateContent', ':streamGenerateContent')}?alt=sse&key={api_key}"
+    headers = {"Content-Type": "application/json"}
+
+    async for event in http_client.stream_sse(url, body, headers=headers):
+        try:
+            data = json.loads(event)
+            if data.get("promptFeedback", {}).get("blockReason"):
+                yield "Gemini blocked the prompt. Try rewriting it."
+                return
+
+            for cand in data.get("candidates", [])[:1]:
+                for part in cand.get("content", {}).get("parts", []):
+                    if part.get("text"):
+                        yield part["text"]
+        except ValueError as e:
+            logger.error(f"Google Gemini stream sent invalid JSON: {e}")
+
+
+async def _stream_openai_style(endpoint: str, api_key: str, prompt: str, model="gemini-3-pro-preview") -> AsyncIterator[str]:
+    """Text chunks from an OpenAI-style chat completion with stream=true."""
+    body = {
+        "model": model,
+        "stream": True,
+        "messages": [
+            {"role": "system", "content": "You are an AI assistant generating finance insights."},
+            {"role": "user", "content": prompt},
+        ]
+    }
+
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {api_key}"
+    }
+
+    async for event in http_client.stream_sse(endpoint, body, headers=headers):
+        if event == "[DONE]":
+            return
+        try:
+            for choice in json.loads(event).get("choices", [])[:1]:
+                content = choice.get("delta", {}).get("content")
+                if content:
+                    yield content
+        except ValueError as e:
+            logger.error(f"OpenAI-style stream sent invalid JSON: {e}")
+
+
+def endpoint_shape(endpoint: str) -> str:
+    ep = endpoint.lower()
+    if "googleapis" in ep or "generativelanguage" in ep or ":generatecontent" in ep:
+        return "google"
+    return "openai"
+
+
+# -----------------------------
+# Provider Chain
+# -----------------------------
+class Provider:
+    def __init__(self, name: str, endpoint: str, api_key: str, model: str = "gemini-3-pro-preview"):
+        self.name = name
+        self.endpoint = endpoint
+        self.api_key = api_key
+        self.model = model
+        self.shape = endpoint_shape(endpoint)
+
+        self._latencies = deque(maxlen=LLM_LATENCY_WINDOW)  # successful calls only
+        self._errors = deque(maxlen=LLM_LATENCY_WINDOW)     # 1 per failed call
+
+    @property
+    def p90(self) -> float:
+        if len(self._latencies) < LLM_HEDGE_MIN_SAMPLES:
+            return LLM_HEDGE_DEFAULT_DELAY
+        ordered = sorted(self._latencies)
+        return ordered[int(0.9 * (len(ordered) - 1))]
+
+    @property
+    def error_rate(self) -> float:
+        return sum(self._errors) / len(self._errors) if self._errors else 0.0
+
+    def hedge_delay(self) -> float:
+        return self.p90 * (1.0 - self.error_rate)
+
+    def _record(self, ok: bool, seconds: float) -> None:
+        self._errors.append(0 if ok else 1)
+        if ok:
+            self._latencies.append(seconds)
+        metrics.inc("llm_provider_requests_total", provider=self.name, outcome="ok" if ok else "error")
+        metrics.observe("llm_provider_seconds", seconds, provider=self.name)
+        metrics.set("llm_provider_p90_seconds", self.p90, provider=self.name)
+        metrics.set("llm_provider_error_rate", self.error_rate, provider=self.name)
+
+    async def call(self, prompt: str, user_id: Optional[str] = None, hedged: bool = False) -> str:
+        """One attempt; charged to `user_id` in the usage ledger when given."""
+        start = time.perf_counter()
+        text, outcome = "", "error"
+        try:
+            if self.shape == "google":
+                text = await _call_google_generative(self.endpoint, self.api_key, prompt)
+            else:
+                text = await _call_openai_style(self.endpoint, self.api_key, prompt, model=self.model)
+            outcome = "ok" if text else "error"
+        except asyncio.CancelledError:
+            # Lost a hedge race: no latency sample, it says nothing about the provider
+            outcome = "cancelled"
+            metrics.inc("llm_provider_requests_total", provider=self.name, outcome="cancelled")
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            if outcome != "cancelled":
+                self._record(outcome == "ok", seconds)
+            if user_id:
+                record_usage(user_id, self.name, prompt, text, seconds, outcome, hedged)
+        return text
+
+    async def stream(self, prompt: str, user_id: Optional[str] = None) -> AsyncIterator[str]:
+        """One streamed attempt; charged to `user_id` like call()."""
+        if self.shape == "google":
+            chunks = _stream_google_generative(self.endpoint, self.api_key, prompt)
+        else:
+            chunks = _stream_openai_style(self.endpoint, self.api_key, prompt, model=self.model)
+
+        start = time.perf_counter()
+        parts = []
+        outcome = "error"
+        try:
+            async for chunk in chunks:
+                if not parts:
+                    metrics.observe("llm_provider_first_token_seconds", time.perf_counter() - start, provider=self.name)
+                parts.append(chunk)
+                yield chunk
+            outcome = "ok" if parts else "error"
+        except (asyncio.CancelledError, GeneratorExit):
+            # The client hung up midway: those tokens were spent all the same
+            outcome = "cancelled"
+            raise
+        finally:
+            if outcome != "cancelled":
+                metrics.inc("llm_provider_streams_total", provider=self.name, outcome=outcome)
+            if user_id:
+                record_usage(user_id, self.name, prompt, "".join(parts), time.perf_counter() - start, outcome)
+
+
+async def first_answer(
+    providers: List[Provider],
+    prompt: str,
+    user_id: Optional[str] = None,
+) -> Tuple[str, Optional[str]]:
+    """
+    First non-empty answer along the chain, hedging slow providers:
+    (text, name of the provider that gave it, or of the last one tried).
+    Every attempt, the cancelled losers included, is charged to `user_id`.
+    """
+    remaining = list(providers)
+    pending = {}
+    last: Optional[Provider] = None
+
+    def launch(hedged: bool = False):
+        nonlocal last
+        last = remaining.pop(0)
+        pending[asyncio.create_task(last.call(prompt, user_id, hedged))] = last.name
+
+    try:
+        if remaining:
+            launch()
+        while pending:
+            delay = last.hedge_delay() if remaining else None
+            done, _ = await asyncio.wait(pending, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+
+            for task in done:
+                name = pending.pop(task)
+                text = "" if task.exception() else task.result()
+                if text:
+                    return text, name
+
+            if remaining:
+                if not done:
+                    metrics.inc("llm_hedges_total", provider=remaining[0].name)
+                launch(hedged=not done)
+        return "", last.name if last else None
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+providers: List[Provider] = []
+if GEMINI_API_KEY:
+    providers.append(Provider("primary", GEMINI_ENDPOINT, GEMINI_API_KEY))
+if LLM_FALLBACK_ENDPOINT and LLM_FALLBACK_API_KEY:
+    providers.append(Provider("fallback", LLM_FALLBACK_ENDPOINT, LLM_FALLBACK_API_KEY, LLM_FALLBACK_MODEL))
+
+
+async def call_gemini_for_insights(prompt: str, user_id: str) -> str:
+    """
+    Insight text from the provider chain, or "" when none answers or the
+    call is degraded (budget or latency, see llm_usage). Charged to user_id.
+    """
+    if not providers:
+        logger.info("No LLM provider configured; skipping insights.")
+        return ""
+    if await run_in_threadpool(degrade_reason, user_id, providers):
+        return ""
+
+    text, _ = await first_answer(providers, prompt, user_id)
+    return text
+
+
+async def stream_insight_text(prompt: str, user_id: str) -> AsyncIterator[str]:
+    """
+    Insight text chunks from the first provider that starts streaming.
+    No hedging here: once chunks flow, the client is already reading them.
+    """
+    if not providers or await run_in_threadpool(degrade_reason, user_id, providers):
+        return
+
+    for provider in providers:
+        chunks = provider.stream(prompt, user_id)
+        answered = False
+        try:
+            async for chunk in chunks:
+                answered = True
+                yield chunk
+        finally:
+            # Close it now when the client hangs up, so the attempt is charged
+            await chunks.aclose()
+        if answered:
+            return
@@ -0,0 +1,205 @@
+"""
+LLM usage ledger, daily budgets and degradation.
+
+Every upstream insight call is recorded in `llm_usage`, one row per day,
+user and provider on the user's shard: calls, errors, prompt and
+completion characters, estimated tokens (characters / LLM_CHARS_PER_TOKEN)
+and summed latency. A call is one provider attempt, so hedged requests
+count every provider they fired (`hedged` counts the attempts fired as a
+hedge) and attempts cut short (hedge losers, clients that hang up) count
+under `cancelled` with the prompt tokens they spent.
+GET /api/admin/llm-usage reads it.
+
+Before a provider is called, degrade_reason() decides whether to skip the
+LLM and leave the user with the rule-based insights the forecast already
+carries:
+    user_budget    the user spent LLM_USER_DAILY_TOKENS today
+    system_budget  all users together spent LLM_SYSTEM_DAILY_TOKENS today
+    latency        every provider's p90 is above LLM_DEGRADE_LATENCY seconds;
+                   LLM_DEGRADE_PROBE_RATE of the calls still go through so
+                   the p90 can recover
+Today's totals are Redis counters (per process without Redis), so the
+check costs no database query, only one MGET; it blocks on Redis, so
+async callers run it in the threadpool.
+"""
+
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import random
+import threading
+import os
+
+from backend.database.sharding import shard_map
+from backend.finance.models import LLMUsage
+from backend.utils.cache import Cache
+from backend.utils.metrics import metrics
+from backend.utils.logger import logger
+
+LLM_USER_DAILY_TOKENS = int(os.getenv("LLM_USER_DAILY_TOKENS", 20000))
+LLM_SYSTEM_DAILY_TOKENS = int(os.getenv("LLM_SYSTEM_DAILY_TOKENS", 2000000))
+LLM_DEGRADE_LATENCY = float(os.getenv("LLM_DEGRADE_LATENCY", 8.0))
+LLM_DEGRADE_PROBE_RATE = float(os.getenv("LLM_DEGRADE_PROBE_RATE", 0.05))
+LLM_CHARS_PER_TOKEN = 4
+
+COUNTER_TTL = 2 * 24 * 3600
+
+_local: Dict[str, int] = {}  # counters when Redis is down, today's only
+_local_day: Optional[str] = None
+_local_lock = threading.Lock()
+
+
+def today() -> str:
+    return datetime.utcnow().strftime("%Y-%m-%d")
+
+
+def estimate_tokens(chars: int) -> int:
+    return -(-chars // LLM_CHARS_PER_TOKEN)
+
+
+def _add(day: str, scope: str, amount: int) -> int:
+    """Add to today's token counter of `scope` (a user id or "system"); the new total."""
+    global _local_day
+    total = Cache.incr(f"llm_tokens:{day}:{scope}", amount, ttl=COUNTER_TTL)
+    if total is not None:
+        return total
+
+    with _local_lock:
+        if _local_day != day:
+            _local.clear()
+            _local_day = day
+        _local[scope] = _local.get(scope, 0) + amount
+        return _local[scope]
+
+
+def tokens_today(user_id: str) -> Tuple[int, int]:
+    """(user, system) tokens spent today."""
+    day = today()
+    totals = Cache.counters([f"llm_tokens:{day}:{user_id}", f"llm_tokens:{day}:system"])
+    if totals is not None:
+        return totals[0], totals[1]
+
+    with _local_lock:
+        if _local_day != day:
+            return 0, 0
+        return _local.get(user_id, 0), _local.get("system", 0)
+
+
+def degrade_reason(user_id: str, providers) -> Optional[str]:
+    """Why this call should skip the LLM, or None to go ahead."""
+    user_tokens, system_tokens = tokens_today(user_id)
+    if user_tokens >= LLM_USER_DAILY_TOKENS:
+        reason = "user_budget"
+    elif system_tokens >= LLM_SYSTEM_DAILY_TOKENS:
+        reason = "system_budget"
+    elif (
+        providers
+        and min(p.p90 for p in providers) > LLM_DEGRADE_LATENCY
+        and random.random() >= LLM_DEGRADE_PROBE_RATE
+    ):
+        reason = "latency"
+    else:
+        return None
+
+    metrics.inc("llm_degraded_total", reason=reason)
+    logger.info(f"LLM insight degraded to rules for {user_id}: {reason}")
+    return reason
+
+
+def _write_ledger(
+    user_id: str,
+    day: str,
+    provider: str,
+    prompt_chars: int,
+    completion_chars: int,
+    tokens: int,
+    seconds: float,
+    outcome: str,
+    hedged: bool,
+) -> None:
+    for _ in range(2):
+        with shard_map.router_for(user_id).Session() as db:
+            row = db.get(LLMUsage, (day, user_id, provider), with_for_update=True)
+            if row is None:
+                row = LLMUsage(
+                    day=day, user_id=user_id, provider=provider,
+                    calls=0, errors=0, cancelled=0, hedged=0, prompt_chars=0,
+                    completion_chars=0, tokens=0, latency_seconds=0.0,
+                )
+                db.add(row)
+
+            row.calls += 1
+            row.errors += outcome == "error"
+            row.cancelled += outcome == "cancelled"
+            row.hedged += hedged
+            row.prompt_chars += prompt_chars
+            row.completion_chars += completion_chars
+            row.tokens += tokens
+            row.latency_seconds += seconds
+            try:
+                db.commit()
+                return
+            except IntegrityError:
+                # Another call created today's row first; update that one
+                db.rollback()
+
+
+def _log_write_error(future) -> None:
+    if future.exception():
+        logger.error(f"LLM usage ledger write failed: {future.exception()}")
+
+
+def _charge(
+    user_id: str,
+    day: str,
+    provider: str,
+    prompt_chars: int,
+    completion_chars: int,
+    seconds: float,
+    outcome: str,
+    hedged: bool,
+) -> None:
+    tokens = estimate_tokens(prompt_chars) + estimate_tokens(completion_chars)
+    _add(day, user_id, tokens)
+    _add(day, "system", tokens)
+    metrics.inc("llm_tokens_total", tokens, provider=provider)
+    _write_ledger(user_id, day, provider, prompt_chars, completion_chars, tokens, seconds, outcome, hedged)
+
+
+def record_usage(
+    user_id: str,
+    provider: str,
+    prompt: str,
+    completion: str,
+    seconds: float,
+    outcome: str,
+    hedged: bool = False,
+) -> None:
+    """
+    Count one provider attempt (outcome "ok", "error" or "cancelled")
+    against today's budgets and the ledger. Called on the loop, the
+    counters and the ledger row are written in the background.
+    """
+    args = (user_id, today(), provider, len(prompt), len(completion), seconds, outcome, hedged)
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        _charge(*args)
+        return
+    loop.run_in_executor(None, _charge, *args).add_done_callback(_log_write_error)
+
+
+def usage_rows(days: int, user_id: Optional[str] = None) -> List[LLMUsage]:
+    """Ledger rows of the last `days` days from every shard, newest first."""
+    since = (datetime.utcnow() - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+    rows = []
+    for router in shard_map.routers:
+        with router.Session() as db:
+            query = select(LLMUsage).where(LLMUsage.day >= since)
+            if user_id:
+                query = query.where(LLMUsage.user_id == user_id)
+            rows.extend(db.scalars(query).all())
+    rows.sort(key=lambda r: (r.day, r.tokens), reverse=True)
+    return rows
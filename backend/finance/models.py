@@ -1,6 +1,6 @@
 # backend/finance/models.py
 
-from sqlalchemy import Column, String, Float, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, String, Float, Integer, BigInteger, DateTime, ForeignKey, Index, JSON, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from backend.database.db import Base
 from datetime import datetime
@@ -56,8 +56,14 @@ class Transaction(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Per-user change sequence of the last write (backend/finance/sync_versions.py)
+    sync_version = Column(BigInteger, nullable=True)
+
     user = relationship("User", backref="transactions")
 
+    # Drives GET /api/transactions/changes
+    __table_args__ = (Index("ix_transactions_user_sync_version", "user_id", "sync_version"),)
+
 
 class Category(Base):
     __tablename__ = "categories"
@@ -93,4 +99,122 @@ class Budget(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    user = relationship("User", backref="budgets")
\ No newline at end of file
+    user = relationship("User", backref="budgets")
+
+
+class TransactionTombstone(Base):
+    """Marks a deleted transaction so delta-sync clients can drop it."""
+    __tablename__ = "transaction_tombstones"
+
+    id = Column(String, primary_key=True)  # id of the deleted transaction
+    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    deleted_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    sync_version = Column(BigInteger, nullable=True)
+
+    __table_args__ = (
+        Index("ix_transaction_tombstones_user_sync_version", "user_id", "sync_version"),
+    )
+
+
+class SyncCounter(Base):
+    """Delta-sync change sequence of one user (backend/finance/sync_versions.py)."""
+    __tablename__ = "sync_counters"
+
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    version = Column(BigInteger, default=0, nullable=False)  # last version taken
+    pruned_version = Column(BigInteger, default=0, nullable=False)  # highest pruned tombstone
+
+
+class ArchivedTransaction(Base):
+    """Transactions older than the archive horizon, moved out of the hot table."""
+    __tablename__ = "transactions_archive"
+
+    id = Column(String, primary_key=True)
+    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    type = Column(SQLEnum(TransactionType), nullable=False)
+
+    description = Column(String, nullable=False)
+    category = Column(String, nullable=False)
+    amount = Column(Float, nullable=False)
+
+    date = Column(DateTime, nullable=False)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (Index("ix_transactions_archive_user_date", "user_id", "date"),)
+
+
+class TransactionRollup(Base):
+    """Monthly totals of archived transactions, per type and category."""
+    __tablename__ = "transaction_rollups"
+
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    month = Column(String, primary_key=True)  # "YYYY-MM"
+    type = Column(SQLEnum(TransactionType), primary_key=True)
+    category = Column(String, primary_key=True)
+
+    total = Column(Float, default=0.0, nullable=False)
+    count = Column(Integer, default=0, nullable=False)
+
+
+class ForecastState(Base):
+    """Online next-month model state, per user and expense category."""
+    __tablename__ = "forecast_states"
+
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    category = Column(String, primary_key=True)
+
+    # Month indexes (months since 2000-01) of the dense range covered
+    first_month = Column(Integer, nullable=False)
+    last_month = Column(Integer, nullable=False)
+
+    # Regression sums over monthly totals y at month index x
+    sum_y = Column(Float, default=0.0, nullable=False)
+    sum_xy = Column(Float, default=0.0, nullable=False)
+
+    # Totals of the months ending at last_month, oldest first
+    recent = Column(JSON, nullable=False)
+
+    version = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ForecastSettings(Base):
+    """Per-user choice of forecasting model."""
+    __tablename__ = "forecast_settings"
+
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    model = Column(String, default="linear", nullable=False)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class Forecast(Base):
+    """Precomputed forecast response for one data version of a user."""
+    __tablename__ = "forecasts"
+
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    version = Column(String, primary_key=True)  # "<model>:<state version>"
+
+    payload = Column(JSON, nullable=False)
+    computed_at = Column(DateTime, default=datetime.utcnow)
+
+
+class LLMUsage(Base):
+    """Daily LLM usage of one user on one provider (insight generation)."""
+    __tablename__ = "llm_usage"
+
+    day = Column(String(10), primary_key=True)  # "YYYY-MM-DD", UTC
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    provider = Column(String, primary_key=True)
+
+    calls = Column(Integer, nullable=False, default=0)
+    errors = Column(Integer, nullable=False, default=0)
+    cancelled = Column(Integer, nullable=False, default=0, server_default="0")  # hedge losers, hangups
+    hedged = Column(Integer, nullable=False, default=0, server_default="0")  # calls fired as a hedge
+    prompt_chars = Column(Integer, nullable=False, default=0)
+    completion_chars = Column(Integer, nullable=False, default=0)
+    tokens = Column(Integer, nullable=False, default=0)  # estimated, prompt + completion
+    latency_seconds = Column(Float, nullable=False, default=0.0)  # summed over calls
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
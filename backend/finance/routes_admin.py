@@ -0,0 +1,66 @@
+# backend/finance/routes_admin.py
+
+from fastapi import APIRouter, Depends, Query
+from typing import Optional
+
+from backend.dependencies import get_admin_user
+from backend.auth.principal import Principal
+from backend.finance.schemas import LLMUsageReport
+from backend.finance.llm_usage import (
+    usage_rows,
+    LLM_USER_DAILY_TOKENS,
+    LLM_SYSTEM_DAILY_TOKENS,
+    LLM_DEGRADE_LATENCY,
+)
+
+router = APIRouter(prefix="/api/admin", tags=["Admin"])
+
+
+# ======================================================
+# LLM USAGE LEDGER
+# ======================================================
+@router.get("/llm-usage", response_model=LLMUsageReport)
+def get_llm_usage(
+    days: int = Query(7, ge=1, le=90),
+    user_id: Optional[str] = None,
+    admin: Principal = Depends(get_admin_user),
+):
+    """
+    Insight LLM usage per day, user and provider over the last `days`
+    days, with system totals per day and the configured budgets.
+    """
+    rows = usage_rows(days, user_id)
+
+    totals = {}
+    for row in rows:
+        day = totals.setdefault(row.day, {
+            "day": row.day, "calls": 0, "errors": 0, "cancelled": 0, "hedged": 0,
+            "tokens": 0, "latency": 0.0,
+        })
+        day["calls"] += row.calls
+        day["errors"] += row.errors
+        day["cancelled"] += row.cancelled
+        day["hedged"] += row.hedged
+        day["tokens"] += row.tokens
+        day["latency"] += row.latency_seconds
+
+    return {
+        "budgets": {
+            "user_daily_tokens": LLM_USER_DAILY_TOKENS,
+            "system_daily_tokens": LLM_SYSTEM_DAILY_TOKENS,
+            "degrade_latency_seconds": LLM_DEGRADE_LATENCY,
+        },
+        "days": [
+            {
+                "day": d["day"],
+                "calls": d["calls"],
+                "errors": d["errors"],
+                "cancelled": d["cancelled"],
+                "hedged": d["hedged"],
+                "tokens": d["tokens"],
+                "avg_latency_seconds": d["latency"] / d["calls"] if d["calls"] else 0.0,
+            }
+            for d in totals.values()
+        ],
+        "rows": rows,
+    }
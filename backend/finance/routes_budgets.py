@@ -5,23 +5,27 @@ Includes Redis caching and structured logging.
 """
 
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from redis import Redis
 from uuid import uuid4
 import json
 
-from backend.database.db import get_db
-from backend.auth.models import User
-from backend.dependencies import get_current_user
+from backend.database.db import mark_recent_write
+from backend.auth.principal import Principal
+from backend.dependencies import get_current_user, get_shard_db, get_async_read_db
 from backend.finance.models import Budget
 from backend.finance.schemas import (
     BudgetCreate,
     BudgetOut,
     BudgetUpdate
 )
-from backend.utils.logger import logger
+from backend.utils.logger import get_logger
 
 router = APIRouter(prefix="/api/budgets", tags=["Budgets"])
+logger = get_logger(__name__)
 
 redis_client = Redis(host="localhost", port=6379, db=0, decode_responses=True)
 CACHE_TTL = 60  # seconds
@@ -41,8 +45,8 @@ def serialize_budget(budget: Budget):
 @router.post("/", response_model=BudgetOut)
 def create_budget(
     payload: BudgetCreate,
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    db: Session = Depends(get_shard_db),
+    user: Principal = Depends(get_current_user)
 ):
     logger.info(f"Creating budget for {user.email}: {payload.category} → ₹{payload.limit_amount}")
 
@@ -62,6 +66,7 @@ def create_budget(
         db.refresh(new_budget)
 
         redis_client.delete(f"budgets:{user.id}")
+        mark_recent_write(user.id)
 
         logger.info(f"Budget created for {user.email}")
         return new_budget
@@ -75,24 +80,25 @@ def create_budget(
 # GET ALL BUDGETS
 # =========================
 @router.get("/", response_model=list[BudgetOut])
-def get_budgets(
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+async def get_budgets(
+    db: AsyncSession = Depends(get_async_read_db),
+    user: Principal = Depends(get_current_user)
 ):
     cache_key = f"budgets:{user.id}"
-    cached = redis_client.get(cache_key)
+    # Blocking client: keep it off the event loop
+    cached = await run_in_threadpool(redis_client.get, cache_key)
 
     if cached:
-        logger.info(f"Cache hit for budgets of {user.email}")
+        logger.debug("Cache hit for budgets of %s", user.email)
         return json.loads(cached)
 
-    logger.info(f"Cache miss: loading budgets for {user.email}")
+    logger.debug("Cache miss: loading budgets for %s", user.email)
 
-    budgets = db.query(Budget).filter(Budget.user_id == user.id).all()
+    budgets = (await db.scalars(select(Budget).where(Budget.user_id == user.id))).all()
 
     serialized = [serialize_budget(b) for b in budgets]
 
-    redis_client.setex(cache_key, CACHE_TTL, json.dumps(serialized))
+    await run_in_threadpool(redis_client.setex, cache_key, CACHE_TTL, json.dumps(serialized))
 
     return serialized
 
@@ -104,8 +110,8 @@ def get_budgets(
 def update_budget(
     budget_id: str,
     payload: BudgetUpdate,
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    db: Session = Depends(get_shard_db),
+    user: Principal = Depends(get_current_user)
 ):
     budget = db.query(Budget).filter(
         Budget.id == budget_id,
@@ -125,6 +131,7 @@ def update_budget(
         db.refresh(budget)
 
         redis_client.delete(f"budgets:{user.id}")
+        mark_recent_write(user.id)
 
         logger.info(f"Budget updated for {user.email}")
         return budget
@@ -140,8 +147,8 @@ def update_budget(
 @router.delete("/{budget_id}")
 def delete_budget(
     budget_id: str,
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    db: Session = Depends(get_shard_db),
+    user: Principal = Depends(get_current_user)
 ):
     budget = db.query(Budget).filter(
         Budget.id == budget_id,
@@ -156,6 +163,7 @@ def delete_budget(
         db.commit()
 
         redis_client.delete(f"budgets:{user.id}")
+        mark_recent_write(user.id)
 
         logger.info(f"Budget deleted for {user.email}")
         return {"message": "Budget deleted successfully"}
@@ -1,14 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, extract, select
 from typing import List
 from datetime import datetime, timedelta
 from calendar import month_abbr
 
-from backend.database.db import get_db
-from backend.dependencies import get_current_user
-from backend.auth.models import User
-from backend.finance.models import Transaction, UserProfile, TransactionType
+from backend.database.db import mark_recent_write
+from backend.dependencies import get_current_user, get_shard_db, get_read_db, get_async_read_db
+from backend.auth.principal import Principal
+from backend.finance.models import Transaction, UserProfile, TransactionType, ArchivedTransaction
+from backend.finance.archive_service import rollup_totals_query
 from backend.finance.schemas import (
     DashboardSummary,
     DashboardStats,
@@ -23,18 +25,19 @@ from backend.finance.schemas import (
     InsightType,
 )
 from backend.utils.cache import Cache, get_cache_key
-from backend.utils.logger import logger
+from backend.utils.logger import get_logger
 import uuid
 
 router = APIRouter(tags=["Dashboard"])
+logger = get_logger(__name__)
 
 
 # ==================== USER PROFILE MANAGEMENT ====================
 @router.post("/profile", response_model=UserProfileOut, status_code=201)
 def create_user_profile(
     profile: UserProfileCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_shard_db),
 ):
     """Create user financial profile"""
     logger.info(f"Creating profile for user {current_user.id}")
@@ -58,6 +61,7 @@ def create_user_profile(
         db.refresh(new_profile)
 
         Cache.clear_user_cache(current_user.id)
+        mark_recent_write(current_user.id)
         logger.info(f"✅ Profile created for user {current_user.id}")
         return new_profile
 
@@ -69,8 +73,8 @@ def create_user_profile(
 
 @router.get("/profile", response_model=UserProfileOut)
 def get_user_profile(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
 ):
     """Get user financial profile"""
     profile = db.query(UserProfile).filter(UserProfile.user_id == current_user.id).first()
@@ -87,8 +91,8 @@ def get_user_profile(
 @router.put("/profile", response_model=UserProfileOut)
 def update_user_profile(
     profile_update: UserProfileUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_shard_db),
 ):
     """Update user financial profile"""
     logger.info(f"Updating profile for user {current_user.id}")
@@ -108,6 +112,7 @@ def update_user_profile(
         db.refresh(profile)
 
         Cache.clear_user_cache(current_user.id)
+        mark_recent_write(current_user.id)
         logger.info(f"✅ Profile updated for user {current_user.id}")
         return profile
 
@@ -119,21 +124,21 @@ def update_user_profile(
 
 # ==================== DASHBOARD SUMMARY ====================
 @router.get("/summary", response_model=DashboardSummary)
-def get_dashboard_summary(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+async def get_dashboard_summary(
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_read_db),
 ):
     """Get complete dashboard summary with stats, charts, and recent transactions"""
-    logger.info(f"Fetching dashboard summary for user {current_user.id}")
+    logger.info("Fetching dashboard summary for user %s", current_user.id, extra={"sample": 100})
 
     # Check cache
     cache_key = get_cache_key(current_user.id, "dashboard_summary")
-    cached = Cache.get(cache_key)
+    cached = await Cache.aget(cache_key)
     if cached:
         return cached
 
     # Get user profile
-    profile = db.query(UserProfile).filter(UserProfile.user_id == current_user.id).first()
+    profile = await db.scalar(select(UserProfile).where(UserProfile.user_id == current_user.id))
     if not profile:
         raise HTTPException(
             status_code=404,
@@ -147,43 +152,54 @@ def get_dashboard_summary(
     last_month_end = current_month_start - timedelta(seconds=1)
 
     # ========== CURRENT MONTH STATS ==========
-    current_income = db.query(func.sum(Transaction.amount)).filter(
+    current_income = await db.scalar(select(func.sum(Transaction.amount)).where(
         Transaction.user_id == current_user.id,
         Transaction.type == TransactionType.INCOME,
         Transaction.date >= current_month_start,
-    ).scalar() or 0.0
+    )) or 0.0
 
-    current_expenses = db.query(func.sum(Transaction.amount)).filter(
+    current_expenses = await db.scalar(select(func.sum(Transaction.amount)).where(
         Transaction.user_id == current_user.id,
         Transaction.type == TransactionType.EXPENSE,
         Transaction.date >= current_month_start,
-    ).scalar() or 0.0
+    )) or 0.0
 
     # ========== LAST MONTH STATS (for comparison) ==========
-    last_income = db.query(func.sum(Transaction.amount)).filter(
+    last_income = await db.scalar(select(func.sum(Transaction.amount)).where(
         Transaction.user_id == current_user.id,
         Transaction.type == TransactionType.INCOME,
         Transaction.date >= last_month_start,
         Transaction.date <= last_month_end,
-    ).scalar() or 0.0
+    )) or 0.0
 
-    last_expenses = db.query(func.sum(Transaction.amount)).filter(
+    last_expenses = await db.scalar(select(func.sum(Transaction.amount)).where(
         Transaction.user_id == current_user.id,
         Transaction.type == TransactionType.EXPENSE,
         Transaction.date >= last_month_start,
         Transaction.date <= last_month_end,
-    ).scalar() or 0.0
+    )) or 0.0
 
     # Calculate total balance
-    all_income = db.query(func.sum(Transaction.amount)).filter(
+    all_income = await db.scalar(select(func.sum(Transaction.amount)).where(
         Transaction.user_id == current_user.id,
         Transaction.type == TransactionType.INCOME,
-    ).scalar() or 0.0
+    )) or 0.0
 
-    all_expenses = db.query(func.sum(Transaction.amount)).filter(
+    all_expenses = await db.scalar(select(func.sum(Transaction.amount)).where(
         Transaction.user_id == current_user.id,
         Transaction.type == TransactionType.EXPENSE,
-    ).scalar() or 0.0
+    )) or 0.0
+
+    # Archived history only survives as monthly rollups
+    archived_totals = {
+        (month, ttype): total
+        for month, ttype, total in (await db.execute(rollup_totals_query(current_user.id))).all()
+    }
+    for (_, ttype), total in archived_totals.items():
+        if ttype == TransactionType.INCOME:
+            all_income += total
+        else:
+            all_expenses += total
 
     total_balance = profile.initial_balance + all_income - all_expenses
     budget_left = profile.monthly_budget - current_expenses
@@ -204,14 +220,16 @@ def get_dashboard_summary(
     )
 
     # ========== CATEGORY BREAKDOWN ==========
-    category_data = db.query(
-        Transaction.category,
-        func.sum(Transaction.amount).label("total")
-    ).filter(
-        Transaction.user_id == current_user.id,
-        Transaction.type == TransactionType.EXPENSE,
-        Transaction.date >= current_month_start,
-    ).group_by(Transaction.category).all()
+    category_data = (await db.execute(
+        select(
+            Transaction.category,
+            func.sum(Transaction.amount).label("total")
+        ).where(
+            Transaction.user_id == current_user.id,
+            Transaction.type == TransactionType.EXPENSE,
+            Transaction.date >= current_month_start,
+        ).group_by(Transaction.category)
+    )).all()
 
     category_colors = {
         "Food & Dining": "#10b981",
@@ -242,19 +260,23 @@ def get_dashboard_summary(
         month_start = (current_month_start - timedelta(days=30 * i)).replace(day=1)
         next_month = (month_start + timedelta(days=32)).replace(day=1)
 
-        month_income = db.query(func.sum(Transaction.amount)).filter(
+        month_income = await db.scalar(select(func.sum(Transaction.amount)).where(
             Transaction.user_id == current_user.id,
             Transaction.type == TransactionType.INCOME,
             Transaction.date >= month_start,
             Transaction.date < next_month,
-        ).scalar() or 0.0
+        )) or 0.0
 
-        month_expenses = db.query(func.sum(Transaction.amount)).filter(
+        month_expenses = await db.scalar(select(func.sum(Transaction.amount)).where(
             Transaction.user_id == current_user.id,
             Transaction.type == TransactionType.EXPENSE,
             Transaction.date >= month_start,
             Transaction.date < next_month,
-        ).scalar() or 0.0
+        )) or 0.0
+
+        month_key = month_start.strftime("%Y-%m")
+        month_income += archived_totals.get((month_key, TransactionType.INCOME), 0.0)
+        month_expenses += archived_totals.get((month_key, TransactionType.EXPENSE), 0.0)
 
         monthly_trend.append(
             MonthlyData(
@@ -266,12 +288,22 @@ def get_dashboard_summary(
 
     # ========== RECENT TRANSACTIONS ==========
     recent_transactions = (
-        db.query(Transaction)
-        .filter(Transaction.user_id == current_user.id)
-        .order_by(Transaction.date.desc())
-        .limit(10)
-        .all()
-    )
+        await db.scalars(
+            select(Transaction)
+            .where(Transaction.user_id == current_user.id)
+            .order_by(Transaction.date.desc())
+            .limit(10)
+        )
+    ).all()
+    if len(recent_transactions) < 10:
+        recent_transactions += (
+            await db.scalars(
+                select(ArchivedTransaction)
+                .where(ArchivedTransaction.user_id == current_user.id)
+                .order_by(ArchivedTransaction.date.desc())
+                .limit(10 - len(recent_transactions))
+            )
+        ).all()
 
     # Build response
     summary = DashboardSummary(
@@ -282,17 +314,17 @@ def get_dashboard_summary(
     )
 
     # Cache for 2 minutes
-    Cache.set(cache_key, summary.dict(), ttl=120)
+    await Cache.aset(cache_key, summary.dict(), ttl=120)
 
-    logger.info(f"✅ Dashboard summary fetched for user {current_user.id}")
+    logger.debug("Dashboard summary fetched for user %s", current_user.id)
     return summary
 
 
 # ==================== AI INSIGHTS ====================
 @router.get("/insights", response_model=AIInsightsResponse)
 def get_ai_insights(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
 ):
     """Generate AI-powered financial insights"""
     logger.info(f"Generating AI insights for user {current_user.id}")
@@ -1,16 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List
 import uuid
 
-from backend.database.db import get_db
-from backend.dependencies import get_current_user
-from backend.auth.models import User
+from backend.database.db import mark_recent_write
+from backend.dependencies import get_current_user, get_shard_db, get_async_read_db
+from backend.auth.principal import Principal
 from backend.finance.models import Category, TransactionType
 from backend.finance.schemas import CategoryCreate, CategoryOut
-from backend.utils.logger import logger
+from backend.utils.logger import get_logger
 
 router = APIRouter(prefix="/categories", tags=["Categories"])
+logger = get_logger(__name__)
 
 
 # ==================== INITIALIZE DEFAULT CATEGORIES ====================
@@ -62,28 +65,27 @@ def initialize_default_categories(db: Session):
 
 # ==================== GET ALL CATEGORIES ====================
 @router.get("/", response_model=List[CategoryOut])
-def get_categories(
+async def get_categories(
     type: str = None,  # "income" or "expense"
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_read_db),
 ):
     """Get all categories (system + user custom categories)"""
-    logger.info(f"Fetching categories for user {current_user.id}")
-
-    # Initialize default categories if needed
-    initialize_default_categories(db)
+    logger.info("Fetching categories for user %s", current_user.id, extra={"sample": 100})
 
     # Get system categories and user's custom categories
-    query = db.query(Category).filter(
+    query = select(Category).where(
         (Category.user_id == None) | (Category.user_id == current_user.id)
     )
 
     if type:
-        query = query.filter(Category.type == type)
+        query = query.where(Category.type == type)
 
-    categories = query.order_by(Category.is_system.desc(), Category.name).all()
+    categories = (
+        await db.scalars(query.order_by(Category.is_system.desc(), Category.name))
+    ).all()
 
-    logger.info(f"✅ Fetched {len(categories)} categories")
+    logger.debug("Fetched %d categories", len(categories))
     return categories
 
 
@@ -91,8 +93,8 @@ def get_categories(
 @router.post("/", response_model=CategoryOut, status_code=201)
 def create_category(
     category: CategoryCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_shard_db),
 ):
     """Create a custom category"""
     logger.info(f"Creating custom category for user {current_user.id}")
@@ -120,6 +122,7 @@ def create_category(
         db.add(new_category)
         db.commit()
         db.refresh(new_category)
+        mark_recent_write(current_user.id)
 
         logger.info(f"✅ Custom category created: {new_category.id}")
         return new_category
@@ -134,8 +137,8 @@ def create_category(
 @router.delete("/{category_id}", status_code=204)
 def delete_category(
     category_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_shard_db),
 ):
     """Delete a custom category (cannot delete system categories)"""
     logger.info(f"Deleting category {category_id}")
@@ -154,6 +157,7 @@ def delete_category(
     try:
         db.delete(category)
         db.commit()
+        mark_recent_write(current_user.id)
 
         logger.info(f"✅ Category deleted: {category_id}")
 
@@ -1,127 +1,273 @@
 # backend/finance/routes_forecast.py
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from typing import Any, Dict, Optional, Tuple
 from datetime import datetime
-from typing import List, Dict, Any
+import json
+from dateutil.relativedelta import relativedelta
 
-from backend.database.db import get_db
-from backend.dependencies import get_current_user
-from backend.auth.models import User
-from backend.finance.models import Transaction
+from backend.dependencies import get_current_user, get_read_db, get_shard_db
+from backend.auth.principal import Principal
+from backend.database.db import mark_recent_write
+from backend.database.sharding import shard_map
+from backend.finance.models import ForecastSettings, Forecast, UserProfile
+from backend.finance.schemas import (
+    ForecastModel,
+    ForecastSettingsUpdate,
+    ForecastSettingsOut,
+    InsightJobOut,
+    SimulationRequest,
+    SimulationResult,
+)
+from backend.finance.forecast_state import (
+    load_states,
+    rebuild_state,
+    data_version,
+    snapshot,
+    evaluate,
+)
 from backend.finance.forecast_service import (
-    prepare_monthly_series,
-    linear_forecast,
-    predict_category_next_month,
-    build_insights_payload,
+    forecast_payload,
+    stream_ai_insight,
+    forecast_pool,
+    DEFAULT_FORECAST_MODEL,
+)
+from backend.finance.forecast_batch import store_forecast
+from backend.finance.insight_jobs import start_insight_job, get_job
+from backend.finance.llm_providers import providers
+from backend.finance.simulation_service import (
+    cash_flow_history,
+    prepare_simulation,
+    scenario_hash,
+    scenario_weights,
+    simulate_balance,
+    PERCENTILES,
 )
-from backend.utils.cache import Cache
+from backend.utils.cache import Cache, get_cache_key
 from backend.utils.logger import logger
 
 router = APIRouter(prefix="/api/forecast", tags=["Forecast"])
 
 
+def selected_model(db: Session, user_id: str) -> str:
+    settings = db.get(ForecastSettings, user_id)
+    return settings.model if settings else DEFAULT_FORECAST_MODEL
+
+
+def forecast_base(db: Session, user_id: str) -> Tuple[Dict[str, Any], Optional[str]]:
+    """
+    (payload, data version) of the user's forecast, without the LLM insight.
+    A None version means there is not enough data to forecast.
+    """
+    states = load_states(db, user_id)
+    if not states:
+        # No state yet (new user, or history from before the state table)
+        with shard_map.router_for(user_id).Session() as primary:
+            primary.expire_on_commit = False
+            states = rebuild_state(primary, user_id)
+            primary.commit()
+
+    model_name = selected_model(db, user_id)
+    version = data_version(states, model_name)
+
+    # Served from the batch precompute while the data version matches
+    stored = db.get(Forecast, (user_id, version))
+    if stored:
+        return stored.payload, version
+
+    model = forecast_pool.run(evaluate, snapshot(states), model=model_name) if states else None
+    if model is None or model["months"] < 2:
+        logger.warning(f"Not enough data to forecast for user {user_id}")
+
+        return {
+            "predicted_total_next_month": 0,
+            "trend": [],
+            "forecast": [],
+            "category_predictions": {},
+            "insights": [
+                {
+                    "title": "Not Enough Data",
+                    "description": "Add at least two months of expense history to enable forecasting.",
+                    "type": "Info"
+                }
+            ],
+        }, None
+
+    payload = forecast_payload(model)
+    try:
+        with shard_map.router_for(user_id).Session() as primary:
+            store_forecast(primary, user_id, version, payload)
+            primary.commit()
+    except Exception as e:
+        logger.error(f"Could not store forecast for {user_id}: {e}")
+    return payload, version
+
+
 @router.get("/")
-def get_forecast(
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+async def get_forecast(
+    stream: bool = Query(False, description="The client streams the AI insight from /insights/stream"),
+    db: Session = Depends(get_read_db),
+    user: Principal = Depends(get_current_user),
 ):
     """
     Generate 6-month forecast based on user's past spending.
-    Includes ML predictions + Gemini insights.
+    Returns the ML numbers and rule insights right away; the Gemini insight
+    is fetched from /insights/{insights_job_id} once ready (null when no
+    LLM is configured). With `stream` no job is started: a job in flight
+    would make /insights/stream wait for it and send the insight whole.
+    """
+    # DB and model work stay off the event loop
+    payload, version = await run_in_threadpool(forecast_base, db, user.id)
+    response = dict(payload, insights_job_id=None)
+    if version is None or stream:
+        return response
+
+    job = await start_insight_job(user.id, payload, version)
+    if job:
+        response["insights_job_id"] = job["job_id"]
+        if job["insight"]:
+            response["insights"] = [job["insight"]] + payload["insights"]
+    return response
+
+
+# Declared before /insights/{job_id}, which would otherwise match "stream"
+@router.get("/insights/stream")
+async def stream_insight(
+    db: Session = Depends(get_read_db),
+    user: Principal = Depends(get_current_user),
+):
+    """
+    Server-Sent Events for the forecast's AI insight: `token` events with
+    text as the provider generates it, then `done` with the full insight
+    (null when no LLM answers). A cached insight arrives as one `done`.
     """
+    payload, version = await run_in_threadpool(forecast_base, db, user.id)
 
-    cache_key = f"forecast:{user.id}"
+    async def events():
+        if version is None or not providers:
+            yield _sse("done", {"insight": None})
+            return
+        try:
+            async for event, data in stream_ai_insight(payload, user.id):
+                yield _sse(event, {"text": data} if event == "token" else {"insight": data})
+        except Exception as e:
+            logger.error(f"Insight stream for {user.id} failed: {e}")
+            yield _sse("done", {"insight": None})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.get("/insights/{job_id}", response_model=InsightJobOut)
+def get_insight_job(job_id: str, user: Principal = Depends(get_current_user)):
+    """Poll a forecast's deferred AI insight."""
+    job = get_job(job_id)
+    if not job or job["user_id"] != user.id:
+        raise HTTPException(status_code=404, detail="Insight job not found")
+    return job
+
+
+# ======================================================
+# WHAT-IF SIMULATION
+# ======================================================
+@router.post("/simulate", response_model=SimulationResult)
+def simulate_cash_flow(
+    scenario: SimulationRequest,
+    db: Session = Depends(get_read_db),
+    user: Principal = Depends(get_current_user),
+):
+    """
+    Monte Carlo of the balance over the next months under scenario
+    adjustments, e.g. {"category": "Food & Dining", "change_pct": -20}.
+    """
+    spec = scenario.model_dump(mode="json")
+    digest = scenario_hash(spec)
+
+    # Under the user:<id>: namespace, so every write invalidates it
+    cache_key = get_cache_key(user.id, "simulate", digest)
     cached = Cache.get(cache_key)
     if cached:
         return cached
 
-    # Fetch transactions
-    txns: List[Transaction] = (
-        db.query(Transaction)
-        .filter(Transaction.user_id == user.id)
-        .order_by(Transaction.date.asc())
-        .all()
+    profile = db.query(UserProfile).filter(UserProfile.user_id == user.id).first()
+    keys, history, balance, month_starts = prepare_simulation(
+        cash_flow_history(db, user.id),
+        profile.initial_balance if profile else 0.0,
     )
+    if len(month_starts) < 2:
+        raise HTTPException(status_code=400, detail="Add at least two months of history to simulate")
 
-    if not txns or len(txns) < 2:
-        logger.warning(f"Not enough data to forecast for user {user.id}")
+    seed = scenario.seed if scenario.seed is not None else int(digest, 16) % 2**32
+    sim = forecast_pool.run(
+        simulate_balance,
+        history,
+        scenario_weights(keys, spec["adjustments"]),
+        balance,
+        scenario.months,
+        scenario.paths,
+        seed,
+    )
 
-    return {
-        "predicted_total_next_month": 0,
-        "trend": [],
-        "forecast": [],
-        "category_predictions": {},
-        "insights": [
+    start = datetime.utcnow().replace(day=1)
+    result = {
+        "scenario_hash": digest,
+        "starting_balance": round(balance, 2),
+        "paths": scenario.paths,
+        "probability_below_zero": sim["probability_below_zero"],
+        "bands": [
             {
-                "title": "Not Enough Data",
-                "description": "Add at least two months of expense history to enable forecasting.",
-                "type": "Info"
+                "month": (start + relativedelta(months=i + 1)).strftime("%b %Y"),
+                **{f"p{p}": round(sim["bands"][j][i], 2) for j, p in enumerate(PERCENTILES)},
+                "probability_below_zero": sim["below_zero_by_month"][i],
             }
+            for i in range(scenario.months)
         ],
     }
 
+    Cache.set(cache_key, result, ttl=300)
+    return result
 
-    # Group by month
-    monthly_totals: Dict[str, float] = {}
-    for t in txns:
-        month_key = t.date.strftime("%Y-%m")
-        monthly_totals.setdefault(month_key, 0.0)
-        if t.type == "expense":
-            monthly_totals[month_key] += t.amount
-
-    # Prepare series
-    monthly_items = [
-        (datetime.strptime(m, "%Y-%m"), v) for m, v in sorted(monthly_totals.items())
-    ]
-
-    X, y, month_labels = prepare_monthly_series(monthly_items)
-
-    # Predict next 6 months
-    preds = linear_forecast(y, horizon=6)
-
-    forecast_data = [
-        {
-            "month": (monthly_items[-1][0] + 
-                      (datetime.now() - datetime.now().replace(day=1)) * 0 + 
-                      (i + 1)
-                     ).strftime("%b"),
-            "predicted": preds[i],
-        }
-        for i in range(6)
-    ]
-
-    # Category-wise predictions
-    category_history: Dict[str, List[float]] = {}
-    for m, expense in monthly_items:
-        pass  # we skip detailed category mapping for now
-
-    category_preds = {}
-    for txn in txns:
-        if txn.type == "expense":
-            category_preds.setdefault(txn.category, 0.0)
-            category_preds[txn.category] += txn.amount
-
-    # Simple "next month" prediction per category
-    for cat, val in category_preds.items():
-        category_preds[cat] = round(predict_category_next_month([val]), 2)
-
-    total_pred = sum(v for v in category_preds.values())
-
-    insights = build_insights_payload(
-        user.id,
-        total_pred,
-        [{"month": m, "expenses": float(v)} for m, v in zip(month_labels, y)],
-        category_preds,
-    )
 
-    response = {
-        "predicted_total_next_month": total_pred,
-        "trend": [{"month": m, "expenses": float(v)} for m, v in zip(month_labels, y)],
-        "forecast": forecast_data,
-        "category_predictions": category_preds,
-        "insights": insights["insights"],
-    }
+# ======================================================
+# MODEL SETTINGS
+# ======================================================
+@router.get("/settings", response_model=ForecastSettingsOut)
+def get_forecast_settings(
+    db: Session = Depends(get_read_db),
+    user: Principal = Depends(get_current_user),
+):
+    return ForecastSettingsOut(model=selected_model(db, user.id), available=list(ForecastModel))
+
+
+@router.put("/settings", response_model=ForecastSettingsOut)
+def update_forecast_settings(
+    payload: ForecastSettingsUpdate,
+    db: Session = Depends(get_shard_db),
+    user: Principal = Depends(get_current_user),
+):
+    settings = db.get(ForecastSettings, user.id)
+    if settings is None:
+        settings = ForecastSettings(user_id=user.id)
+        db.add(settings)
+    settings.model = payload.model.value
+
+    try:
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error saving forecast settings: {e}")
+        raise HTTPException(status_code=500, detail="Failed to save forecast settings")
 
-    Cache.set(cache_key, response, ttl=300)
-    return response
\ No newline at end of file
+    mark_recent_write(user.id)
+    logger.info(f"Forecast model for {user.id} set to {settings.model}")
+    return ForecastSettingsOut(model=settings.model, available=list(ForecastModel))
@@ -1,20 +1,21 @@
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 
-from backend.database.db import get_db
-from backend.dependencies import get_current_user
-from backend.auth.models import User
+from backend.dependencies import get_current_user, get_async_read_db
+from backend.auth.principal import Principal
 from backend.finance.models import Transaction
+from backend.finance.archive_service import rollup_totals_query
 from backend.utils.cache import Cache
 
 router = APIRouter(prefix="/api/reports", tags=["Reports"])
 
 @router.get("/")
-def get_reports(
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+async def get_reports(
+    db: AsyncSession = Depends(get_async_read_db),
+    user: Principal = Depends(get_current_user),
     months: int = Query(6, ge=1, le=12)
 ):
     """
@@ -23,7 +24,7 @@ def get_reports(
     """
 
     cache_key = f"reports:{user.id}:{months}"
-    cached = Cache.get(cache_key)
+    cached = await Cache.aget(cache_key)
     if cached:
         return cached
 
@@ -31,13 +32,25 @@ def get_reports(
     # Load all transactions
     # -------------------------------------------
     txns = (
-        db.query(Transaction)
-        .filter(Transaction.user_id == user.id)
-        .order_by(Transaction.date.asc())
-        .all()
-    )
+        await db.scalars(
+            select(Transaction)
+            .where(Transaction.user_id == user.id)
+            .order_by(Transaction.date.asc())
+        )
+    ).all()
 
-    if not txns:
+    # -------------------------------------------
+    # Determine window
+    # -------------------------------------------
+    end_date = datetime.now().replace(day=1)
+    start_date = end_date - relativedelta(months=months - 1)
+
+    # Archived months inside the window only survive as rollups
+    archived = (
+        await db.execute(rollup_totals_query(user.id, since_month=start_date.strftime("%Y-%m")))
+    ).all()
+
+    if not txns and not archived:
         return {
             "summary": {
                 "total_income": 0,
@@ -52,13 +65,6 @@ def get_reports(
             "next_milestone": {"target": 0, "remaining": 0},
         }
 
-
-    # -------------------------------------------
-    # Determine window
-    # -------------------------------------------
-    end_date = datetime.now().replace(day=1)
-    start_date = end_date - relativedelta(months=months - 1)
-
     # -------------------------------------------
     # Prepare monthly buckets
     # -------------------------------------------
@@ -80,6 +86,13 @@ def get_reports(
             elif t.type == "expense":
                 month_map[key]["expenses"] += t.amount
 
+    for month, ttype, total in archived:
+        if month in month_map:
+            if ttype == "income":
+                month_map[month]["income"] += total
+            elif ttype == "expense":
+                month_map[month]["expenses"] += total
+
     # -------------------------------------------
     # Compute savings + summary
     # -------------------------------------------
@@ -157,5 +170,5 @@ def get_reports(
         "next_milestone": next_milestone,
     }
 
-    Cache.set(cache_key, result, ttl=300)
+    await Cache.aset(cache_key, result, ttl=300)
     return result
\ No newline at end of file
@@ -1,24 +1,38 @@
 # backend/finance/routes_transactions.py
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
 import uuid
 
-from backend.database.db import get_db
-from backend.dependencies import get_current_user
-from backend.auth.models import User
-from backend.finance.models import Transaction, TransactionType, Budget
+from backend.database.db import mark_recent_write
+from backend.dependencies import get_current_user, get_shard_db, get_read_db, get_async_read_db
+from backend.auth.principal import Principal
+from backend.finance.models import (
+    Transaction,
+    TransactionType,
+    Budget,
+    ArchivedTransaction,
+    TransactionTombstone,
+    SyncCounter,
+)
+from backend.finance.forecast_state import as_expense, record_expense_change
+from backend.finance.sync_versions import next_sync_version
+from backend.finance.archive_service import TRANSACTION_COLUMNS, archive_cutoff, reaches_archive
 from backend.finance.schemas import (
     TransactionCreate,
     TransactionUpdate,
     TransactionOut,
+    TransactionChanges,
 )
 from backend.utils.cache import Cache, get_cache_key
-from backend.utils.logger import logger
+from backend.utils.logger import get_logger
 
 router = APIRouter(prefix="/api/transactions", tags=["Transactions"])
+logger = get_logger(__name__)
 
 
 # ======================================================
@@ -86,8 +100,8 @@ def revert_budget_after_delete(db: Session, transaction: Transaction):
 @router.post("/", response_model=TransactionOut, status_code=201)
 def create_transaction(
     transaction: TransactionCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_shard_db),
 ):
     logger.info(f"Creating transaction for {current_user.id}")
 
@@ -102,7 +116,9 @@ def create_transaction(
     )
 
     try:
+        new_transaction.sync_version = next_sync_version(db, current_user.id)
         db.add(new_transaction)
+        record_expense_change(db, current_user.id, None, as_expense(new_transaction))
         db.commit()
         db.refresh(new_transaction)
 
@@ -110,6 +126,7 @@ def create_transaction(
         update_budget_after_expense(db, new_transaction)
 
         Cache.clear_user_cache(current_user.id)
+        mark_recent_write(current_user.id)
 
         return TransactionOut.from_orm(new_transaction)
 
@@ -123,17 +140,17 @@ def create_transaction(
 # GET ALL TRANSACTIONS
 # ======================================================
 @router.get("/", response_model=List[TransactionOut])
-def get_transactions(
+async def get_transactions(
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
     type: Optional[str] = None,
     category: Optional[str] = None,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_read_db),
 ):
-    logger.info(f"Fetching transactions for {current_user.id}")
+    logger.info("Fetching transactions for %s", current_user.id, extra={"sample": 100})
 
     cache_key = get_cache_key(
         current_user.id,
@@ -146,39 +163,111 @@ def get_transactions(
         str(end_date) if end_date else "none",
     )
 
-    cached = Cache.get(cache_key)
+    cached = await Cache.aget(cache_key)
     if cached:
-        logger.info("Transactions served from cache")
+        logger.debug("Transactions served from cache")
         return cached
 
-    query = db.query(Transaction).filter(Transaction.user_id == current_user.id)
-
-    if type:
-        query = query.filter(Transaction.type == type)
-    if category:
-        query = query.filter(Transaction.category == category)
-    if start_date:
-        query = query.filter(Transaction.date >= start_date)
-    if end_date:
-        query = query.filter(Transaction.date <= end_date)
-
-    transactions = query.order_by(Transaction.date.desc()).offset(skip).limit(limit).all()
+    def listing(model):
+        query = select(*[getattr(model, c) for c in TRANSACTION_COLUMNS]).where(
+            model.user_id == current_user.id
+        )
+        if type:
+            query = query.where(model.type == type)
+        if category:
+            query = query.where(model.category == category)
+        if start_date:
+            query = query.where(model.date >= start_date)
+        if end_date:
+            query = query.where(model.date <= end_date)
+        return query.order_by(model.date.desc())
+
+    # Archived rows all predate the cutoff, so a full hot page that ends at
+    # or after it is the whole answer; only deeper or older pages read
+    # through to the archive
+    transactions = (await db.execute(listing(Transaction).offset(skip).limit(limit))).all()
+    complete = len(transactions) == limit and transactions[-1].date >= archive_cutoff()
+
+    if not complete and reaches_archive(start_date):
+        # Each side only needs its first skip + limit rows before the merge
+        hot = listing(Transaction).limit(skip + limit).subquery()
+        cold = listing(ArchivedTransaction).limit(skip + limit).subquery()
+        merged = union_all(select(hot), select(cold)).subquery()
+        query = select(merged).order_by(merged.c.date.desc())
+        transactions = (await db.execute(query.offset(skip).limit(limit))).all()
 
     result = [TransactionOut.from_orm(t).model_dump() for t in transactions]
 
-    Cache.set(cache_key, result, ttl=300)
+    await Cache.aset(cache_key, result, ttl=300)
 
     return [TransactionOut.from_orm(t) for t in transactions]
 
 
+# ======================================================
+# DELTA SYNC
+# ======================================================
+@router.get("/changes", response_model=TransactionChanges)
+async def get_transaction_changes(
+    since: int = Query(0, ge=0, description="`version` returned by the previous sync"),
+    limit: int = Query(500, ge=1, le=1000),
+    resync: bool = Query(False, description="Set while paging through a full sync (since=0 or reset)"),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Transactions created, updated or deleted after version `since`, oldest first."""
+    # Read before the rows: every version up to counter.version has committed
+    counter = await db.get(SyncCounter, current_user.id)
+    reset = not resync and since > 0 and counter is not None and since < counter.pruned_version
+    if reset:
+        # Tombstones after `since` are pruned; the client must start over
+        since = 0
+
+    upserts = (
+        await db.scalars(
+            select(Transaction)
+            .where(Transaction.user_id == current_user.id, Transaction.sync_version > since)
+            .order_by(Transaction.sync_version.asc())
+            .limit(limit + 1)
+        )
+    ).all()
+    tombstones = [] if since == 0 else (
+        await db.scalars(
+            select(TransactionTombstone)
+            .where(
+                TransactionTombstone.user_id == current_user.id,
+                TransactionTombstone.sync_version > since,
+            )
+            .order_by(TransactionTombstone.sync_version.asc())
+            .limit(limit + 1)
+        )
+    ).all()
+
+    # Versions are unique per user, so a page can end anywhere
+    changes = sorted(upserts + tombstones, key=lambda c: c.sync_version)
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    version = changes[-1].sync_version if changes else since
+    if not has_more and counter is not None:
+        # Caught up: resume after everything, pruned tombstones included
+        version = max(version, counter.version)
+
+    return TransactionChanges(
+        version=version,
+        upserts=[TransactionOut.from_orm(t) for t in changes if isinstance(t, Transaction)],
+        deleted=[t.id for t in changes if isinstance(t, TransactionTombstone)],
+        has_more=has_more,
+        reset=reset,
+    )
+
+
 # ======================================================
 # GET SINGLE TRANSACTION
 # ======================================================
 @router.get("/{transaction_id}", response_model=TransactionOut)
 def get_transaction(
     transaction_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
 ):
     transaction = (
         db.query(Transaction)
@@ -199,8 +288,8 @@ def get_transaction(
 def update_transaction(
     transaction_id: str,
     transaction_update: TransactionUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_shard_db),
 ):
     transaction = (
         db.query(Transaction)
@@ -212,15 +301,19 @@ def update_transaction(
         raise HTTPException(status_code=404, detail="Transaction not found")
 
     update_data = transaction_update.dict(exclude_unset=True)
+    before = as_expense(transaction)
 
     for field, value in update_data.items():
         setattr(transaction, field, value)
 
     try:
+        transaction.sync_version = next_sync_version(db, current_user.id)
+        record_expense_change(db, current_user.id, before, as_expense(transaction))
         db.commit()
         db.refresh(transaction)
 
         Cache.clear_user_cache(current_user.id)
+        mark_recent_write(current_user.id)
 
         return TransactionOut.from_orm(transaction)
 
@@ -235,8 +328,8 @@ def update_transaction(
 @router.delete("/{transaction_id}", status_code=204)
 def delete_transaction(
     transaction_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_shard_db),
 ):
     transaction = (
         db.query(Transaction)
@@ -251,9 +344,16 @@ def delete_transaction(
         revert_budget_after_delete(db, transaction)
 
         db.delete(transaction)
+        db.merge(TransactionTombstone(
+            id=transaction.id,
+            user_id=current_user.id,
+            sync_version=next_sync_version(db, current_user.id),
+        ))
+        record_expense_change(db, current_user.id, as_expense(transaction), None)
         db.commit()
 
         Cache.clear_user_cache(current_user.id)
+        mark_recent_write(current_user.id)
 
         logger.info(f"Deleted transaction {transaction_id}")
 
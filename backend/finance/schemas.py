@@ -69,6 +69,19 @@ class TransactionOut(BaseModel):
         from_attributes = True
 
 
+class TransactionChanges(BaseModel):
+    """
+    Delta-sync page: apply `upserts`, drop `deleted`, then resume from
+    `version`. Pages after the first of a full sync (since=0 or `reset`)
+    are requested with resync=true.
+    """
+    version: int
+    upserts: List[TransactionOut]
+    deleted: List[str]
+    has_more: bool = False
+    reset: bool = False  # `since` predates tombstone retention; replace local state
+
+
 # ==================== CATEGORY SCHEMAS ====================
 class CategoryCreate(BaseModel):
     name: str = Field(..., min_length=1, max_length=50)
@@ -171,4 +184,109 @@ class BudgetOut(BaseModel):
     updated_at: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+# ==================== FORECAST SCHEMAS ====================
+class ForecastModel(str, Enum):
+    LINEAR = "linear"
+    HOLT_WINTERS = "holt_winters"
+    SEASONAL_NAIVE = "seasonal_naive"
+
+
+class ForecastSettingsUpdate(BaseModel):
+    model: ForecastModel
+
+
+class ForecastSettingsOut(BaseModel):
+    model: ForecastModel
+    available: List[ForecastModel]
+
+
+class InsightJobStatus(str, Enum):
+    PENDING = "pending"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class InsightOut(BaseModel):
+    title: str
+    type: str
+    description: str
+
+
+class InsightJobOut(BaseModel):
+    job_id: str
+    status: InsightJobStatus
+    insight: Optional[InsightOut] = None  # None when done means the LLM had nothing
+
+
+class ScenarioAdjustment(BaseModel):
+    category: str
+    type: Optional[TransactionType] = None  # both when omitted
+    change_pct: float = Field(..., ge=-100, le=1000)
+
+
+class SimulationRequest(BaseModel):
+    adjustments: List[ScenarioAdjustment] = []
+    months: int = Field(12, ge=1, le=36)
+    paths: int = Field(10000, ge=1000, le=100000)
+    seed: Optional[int] = None
+
+
+class SimulationBand(BaseModel):
+    month: str
+    p5: float
+    p25: float
+    p50: float
+    p75: float
+    p95: float
+    probability_below_zero: float
+
+
+class SimulationResult(BaseModel):
+    scenario_hash: str
+    starting_balance: float
+    paths: int
+    probability_below_zero: float  # at any point within the horizon
+    bands: List[SimulationBand]
+
+
+# ==================== ADMIN SCHEMAS ====================
+class LLMUsageRow(BaseModel):
+    day: str
+    user_id: str
+    provider: str
+    calls: int
+    errors: int
+    cancelled: int
+    hedged: int
+    prompt_chars: int
+    completion_chars: int
+    tokens: int
+    latency_seconds: float
+
+    class Config:
+        from_attributes = True
+
+
+class LLMUsageDay(BaseModel):
+    day: str
+    calls: int
+    errors: int
+    cancelled: int
+    hedged: int
+    tokens: int
+    avg_latency_seconds: float
+
+
+class LLMBudgets(BaseModel):
+    user_daily_tokens: int
+    system_daily_tokens: int
+    degrade_latency_seconds: float
+
+
+class LLMUsageReport(BaseModel):
+    budgets: LLMBudgets
+    days: List[LLMUsageDay]  # system totals per day
+    rows: List[LLMUsageRow]
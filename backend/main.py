@@ -1,10 +1,11 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse
 
-from backend.database.db import Base, engine
+from backend.database.sharding import create_shard_tables, shard_map
 from backend.utils.logger import logger
+from backend.utils.metrics import metrics
 
 from backend.auth.routes import router as auth_router
 from backend.finance.routes_dashboard import router as dashboard_router
@@ -13,6 +14,13 @@ from backend.finance.routes_categories import router as categories_router
 from backend.finance.routes_budgets import router as budgets_router
 from backend.finance.routes_forecast import router as forecast_router
 from backend.finance.routes_reports import router as reports_router
+from backend.finance.routes_admin import router as admin_router
+from backend.finance.routes_dashboard import initialize_default_categories
+from backend.finance.forecast_service import forecast_pool
+from backend.auth.auth_utils import password_pool
+from backend.finance.forecast_batch import start_scheduler
+from backend.utils.http_client import http_client
+from backend.utils.request_timing import REQUEST_TIMING, RequestTimingMiddleware
 
 from dotenv import load_dotenv
 
@@ -22,10 +30,22 @@ load_dotenv()
 # ---------- Lifespan Handler ----------
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    Base.metadata.create_all(bind=engine)
+    create_shard_tables()
     logger.info("Database tables created successfully.")
+    # Seed system categories once here, so the category GET stays read-only
+    for router in shard_map.routers:
+        with router.Session() as db:
+            initialize_default_categories(db)
+    forecast_pool.start()
+    password_pool.start()
+    batch_stop = start_scheduler()
     yield
     logger.info("Shutting down FinTrack AI backend...")
+    if batch_stop:
+        batch_stop.set()
+    forecast_pool.shutdown()
+    password_pool.shutdown()
+    await http_client.aclose()
 
 # ---------- Create FastAPI app ----------
 app = FastAPI(
@@ -49,6 +69,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ---------- Request Timing (Server-Timing header + request log) ----------
+if REQUEST_TIMING:
+    app.add_middleware(RequestTimingMiddleware)
+
 # ---------- Include Routers ----------
 app.include_router(auth_router)
 logger.info("✅ Auth router included")
@@ -73,12 +97,19 @@ logger.info("✅ Forecast router included")
 app.include_router(reports_router)
 logger.info("✅ Reports router included")
 
+app.include_router(admin_router)
+logger.info("✅ Admin router included")
+
 
 # ---------- Root & Favicon ----------
 @app.get("/", summary="Welcome endpoint")
 def root():
     return {"message": "Welcome to FinTrack AI!"}
 
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    return PlainTextResponse(metrics.render())
+
 @app.get("/favicon.ico", include_in_schema=False)
 async def favicon():
     return FileResponse("static/favicon.ico")
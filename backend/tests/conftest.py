@@ -0,0 +1,7 @@
+"""Point the app at a scratch database before any test module imports it."""
+
+import os
+import tempfile
+
+_scratch = tempfile.TemporaryDirectory(prefix="fintrack-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_scratch.name}/users.db")
@@ -0,0 +1,53 @@
+"""The forecast page's AI insight, streamed from a local stub provider."""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.benchmarks.stub_llm import serve_in_thread
+from backend.finance.llm_providers import Provider, providers
+
+MONTHS = ["2026-05-03", "2026-06-03", "2026-07-03", "2026-08-05"]
+
+
+@pytest.fixture
+def client():
+    """A signed-in TestClient (scratch database, see conftest) with the stub as the only provider."""
+    server, url = serve_in_thread(latency=0.0)
+    saved = providers[:]
+    providers[:] = [Provider("test-stub", f"{url}/v1beta/models/stub:generateContent", "stub")]
+
+    from backend.main import app
+
+    try:
+        with TestClient(app) as c:
+            c.post("/auth/signup", json={"username": "s", "email": "s@x.com", "password": "pw"})
+            token = c.post("/auth/login", data={"username": "s@x.com", "password": "pw"}).json()["access_token"]
+            c.headers["Authorization"] = f"Bearer {token}"
+            for i, month in enumerate(MONTHS):
+                c.post("/api/transactions/", json={
+                    "type": "expense",
+                    "description": "groceries",
+                    "category": "Food & Dining",
+                    "amount": 40 + 10 * i,
+                    "date": f"{month}T10:00:00",
+                })
+            yield c, server
+    finally:
+        providers[:] = saved
+        server.shutdown()
+
+
+def test_forecast_then_stream_yields_tokens(client):
+    c, server = client
+
+    forecast = c.get("/api/forecast/", params={"stream": 1})
+    assert forecast.status_code == 200
+    assert forecast.json()["insights_job_id"] is None
+
+    with c.stream("GET", "/api/forecast/insights/stream") as response:
+        body = "".join(response.iter_text())
+
+    assert body.count("event: token") > 1
+    assert body.count("event: done") == 1
+    # The stream was the only LLM call
+    assert server.RequestHandlerClass.received == 1
@@ -0,0 +1,126 @@
+"""PooledHTTPClient.post_json against the local stub provider."""
+
+import asyncio
+import time
+
+import pytest
+
+from backend.benchmarks.stub_llm import serve_in_thread
+from backend.utils.http_client import PooledHTTPClient
+from backend.utils.metrics import metrics
+
+PAYLOAD = {"contents": [{"parts": [{"text": "Monthly expenses: [120.0, 95.5]."}]}]}
+
+
+@pytest.fixture
+def stub():
+    """Starts stubs with the given options; (server, generateContent URL)."""
+    servers = []
+
+    def start(**options):
+        server, base = serve_in_thread(**options)
+        servers.append(server)
+        return server, f"{base}/v1beta/models/stub:generateContent"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+def make_client(**overrides) -> PooledHTTPClient:
+    options = dict(
+        connect_timeout=1.0, read_timeout=2.0, pool_size=4, max_retries=2,
+        retry_base=0.01, max_concurrency=4, queue_timeout=1.0,
+    )
+    options.update(overrides)
+    return PooledHTTPClient(**options)
+
+
+def post_many(client: PooledHTTPClient, url: str, calls: int = 1):
+    """Results of `calls` concurrent post_json calls, on a loop of their own."""
+    async def run():
+        try:
+            return await asyncio.gather(*(client.post_json(url, PAYLOAD) for _ in range(calls)))
+        finally:
+            await client.aclose()
+
+    return asyncio.run(run())
+
+
+def received(server) -> int:
+    return server.RequestHandlerClass.received
+
+
+def test_returns_decoded_json(stub):
+    server, url = stub(latency=0.0)
+    [data] = post_many(make_client(), url)
+    assert data["candidates"][0]["content"]["parts"][0]["text"]
+    assert received(server) == 1
+
+
+def test_retries_503_until_success(stub):
+    server, url = stub(latency=0.0, fail_first=2)
+    retries = metrics.get("http_client_retries_total")
+
+    [data] = post_many(make_client(max_retries=2), url)
+
+    assert data is not None
+    assert received(server) == 3
+    assert metrics.get("http_client_retries_total") - retries == 2
+
+
+def test_gives_up_after_max_retries(stub):
+    server, url = stub(latency=0.0, fail_first=10)
+    assert post_many(make_client(max_retries=2), url) == [None]
+    assert received(server) == 3
+
+
+def test_read_timeout_is_retried_then_gives_up(stub):
+    server, url = stub(latency=1.0)
+
+    start = time.perf_counter()
+    [data] = post_many(make_client(read_timeout=0.1, max_retries=1), url)
+
+    assert data is None
+    assert time.perf_counter() - start < 0.8  # two 0.1 s attempts, not the 1 s answer
+    assert received(server) == 2
+
+
+def test_concurrency_cap_queues_callers(stub):
+    server, url = stub(latency=0.2)
+
+    start = time.perf_counter()
+    results = post_many(make_client(max_concurrency=2, queue_timeout=5.0), url, calls=4)
+
+    assert all(r is not None for r in results)
+    assert time.perf_counter() - start >= 0.38  # two waves of two
+    assert metrics.get("http_client_inflight") == 0
+
+
+def test_callers_past_the_queue_timeout_give_up(stub):
+    server, url = stub(latency=0.5)
+    shed = metrics.get("http_client_requests_total", outcome="queue_timeout")
+
+    results = post_many(make_client(max_concurrency=2, queue_timeout=0.1), url, calls=4)
+
+    assert sum(r is not None for r in results) == 2
+    assert results.count(None) == 2
+    assert metrics.get("http_client_requests_total", outcome="queue_timeout") - shed == 2
+    assert received(server) == 2
+
+
+def test_open_client_refuses_another_loop(stub):
+    server, url = stub(latency=0.0)
+    client = make_client()
+
+    async def first_loop():
+        try:
+            assert await client.post_json(url, PAYLOAD) is not None
+            with pytest.raises(RuntimeError):
+                await asyncio.to_thread(asyncio.run, client.post_json(url, PAYLOAD))
+        finally:
+            await client.aclose()
+
+    asyncio.run(first_loop())
+    # Closed on its own loop, the client opens a new pool on the next one
+    assert post_many(client, url) != [None]
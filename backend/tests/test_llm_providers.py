@@ -0,0 +1,82 @@
+"""Hedged provider chain (first_answer) against two local stub providers."""
+
+import asyncio
+import time
+
+import pytest
+
+from backend.benchmarks.stub_llm import serve_in_thread
+from backend.finance.llm_providers import LLM_HEDGE_MIN_SAMPLES, Provider, first_answer
+from backend.utils.http_client import http_client
+from backend.utils.metrics import metrics
+
+PROMPT = "Monthly expenses: [120.0, 95.5, 130.2]. Generate 3 insights."
+
+
+@pytest.fixture
+def chain():
+    """A Google-shape primary with a p90 of `primary_p90` seconds, and an OpenAI-shape secondary."""
+    servers = []
+
+    def build(primary_latency: float, secondary_latency: float, primary_p90: float = 0.05):
+        primary_srv, primary_url = serve_in_thread(latency=primary_latency)
+        secondary_srv, secondary_url = serve_in_thread(latency=secondary_latency)
+        servers.extend([primary_srv, secondary_srv])
+
+        primary = Provider("test-primary", f"{primary_url}/v1beta/models/stub:generateContent", "stub")
+        secondary = Provider("test-secondary", f"{secondary_url}/v1/chat/completions", "stub")
+        primary._latencies.extend([primary_p90] * LLM_HEDGE_MIN_SAMPLES)
+        return [primary, secondary], primary_srv, secondary_srv
+
+    yield build
+    for server in servers:
+        server.shutdown()
+
+
+def answer(providers):
+    """(text, provider name, seconds) of first_answer, on a loop of its own."""
+    async def run():
+        try:
+            start = time.perf_counter()
+            text, name = await first_answer(providers, PROMPT)
+            seconds = time.perf_counter() - start
+            await asyncio.sleep(0.05)  # let the cancelled loser unwind
+            return text, name, seconds
+        finally:
+            await http_client.aclose()
+
+    return asyncio.run(run())
+
+
+def cancelled(provider: Provider) -> float:
+    return metrics.get("llm_provider_requests_total", provider=provider.name, outcome="cancelled")
+
+
+def test_slow_primary_is_hedged_and_cancelled(chain):
+    providers, primary_srv, secondary_srv = chain(primary_latency=1.0, secondary_latency=0.0)
+    primary, secondary = providers
+    hedges = metrics.get("llm_hedges_total", provider=secondary.name)
+    before = cancelled(primary)
+
+    text, name, seconds = answer(providers)
+
+    assert text and name == secondary.name
+    assert seconds < 0.5  # hedge delay plus the secondary, not the primary's full second
+    assert metrics.get("llm_hedges_total", provider=secondary.name) - hedges == 1
+    assert cancelled(primary) - before == 1
+    assert primary_srv.RequestHandlerClass.received == 1
+    assert secondary_srv.RequestHandlerClass.received == 1
+
+
+def test_fast_primary_fires_no_hedge(chain):
+    providers, primary_srv, secondary_srv = chain(
+        primary_latency=0.0, secondary_latency=0.0, primary_p90=1.0,
+    )
+    primary, secondary = providers
+    hedges = metrics.get("llm_hedges_total", provider=secondary.name)
+
+    text, name, _ = answer(providers)
+
+    assert text and name == primary.name
+    assert metrics.get("llm_hedges_total", provider=secondary.name) == hedges
+    assert secondary_srv.RequestHandlerClass.received == 0
@@ -1,8 +1,11 @@
 import redis
 import json
+import time
 import os
-from typing import Any, Optional
+from fastapi.concurrency import run_in_threadpool
+from typing import Any, List, Optional
 from backend.utils.logger import logger
+from backend.utils.request_timing import record_cache
 
 # Initialize Redis client
 REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
@@ -37,11 +40,13 @@ class Cache:
             return None
 
         try:
+            start = time.perf_counter()
             value = redis_client.get(key)
+            record_cache(bool(value), time.perf_counter() - start)
             if value:
-                logger.debug(f"Cache HIT: {key}")
+                logger.debug("Cache HIT: %s", key)
                 return json.loads(value)
-            logger.debug(f"Cache MISS: {key}")
+            logger.debug("Cache MISS: %s", key)
             return None
         except Exception as e:
             logger.error(f"Cache GET error for key {key}: {e}")
@@ -71,6 +76,22 @@ class Cache:
             logger.error(f"Cache SET error for key {key}: {e}")
             return False
 
+    # Async handlers must not call the blocking client on the event loop;
+    # these run the lookup in the threadpool (and skip the hop without Redis)
+    @staticmethod
+    async def aget(key: str) -> Optional[Any]:
+        """Cache.get for async handlers"""
+        if not redis_client:
+            return None
+        return await run_in_threadpool(Cache.get, key)
+
+    @staticmethod
+    async def aset(key: str, value: Any, ttl: int = 300) -> bool:
+        """Cache.set for async handlers"""
+        if not redis_client:
+            return False
+        return await run_in_threadpool(Cache.set, key, value, ttl)
+
     @staticmethod
     def delete(key: str) -> bool:
         """Delete key from cache"""
@@ -101,6 +122,62 @@ class Cache:
             logger.error(f"Cache DELETE PATTERN error for {pattern}: {e}")
             return False
 
+    @staticmethod
+    def acquire(key: str, ttl: int) -> bool:
+        """
+        Claim `key` for `ttl` seconds across processes (SET NX).
+        Without Redis every caller gets it.
+        """
+        if not redis_client:
+            return True
+
+        try:
+            return bool(redis_client.set(key, "1", nx=True, ex=ttl))
+        except Exception as e:
+            logger.error(f"Cache ACQUIRE error for key {key}: {e}")
+            return True
+
+    @staticmethod
+    async def aacquire(key: str, ttl: int) -> bool:
+        """Cache.acquire for async handlers"""
+        if not redis_client:
+            return True
+        return await run_in_threadpool(Cache.acquire, key, ttl)
+
+    @staticmethod
+    def incr(key: str, amount: int, ttl: int) -> Optional[int]:
+        """
+        Add `amount` to the counter at `key` (expiring after `ttl`) and
+        return the new total; None without Redis.
+        """
+        if not redis_client:
+            return None
+
+        try:
+            pipe = redis_client.pipeline()
+            pipe.incrby(key, amount)
+            pipe.expire(key, ttl)
+            total, _ = pipe.execute()
+            return total
+        except Exception as e:
+            logger.error(f"Cache INCR error for key {key}: {e}")
+            return None
+
+    @staticmethod
+    def counters(keys: List[str]) -> Optional[List[int]]:
+        """
+        Current values of the counters at `keys` (0 where unset) in one
+        MGET; None without Redis.
+        """
+        if not redis_client:
+            return None
+
+        try:
+            return [int(v or 0) for v in redis_client.mget(keys)]
+        except Exception as e:
+            logger.error(f"Cache MGET error for keys {keys}: {e}")
+            return None
+
     @staticmethod
     def clear_user_cache(user_id: str) -> bool:
         """Clear all cache for a specific user"""
@@ -0,0 +1,201 @@
+"""
+Shared async HTTP client for outbound calls (LLM providers).
+
+One httpx.AsyncClient per process keeps connections alive between calls.
+post_json adds separate connect and read deadlines, retries with full
+jitter on connection errors, timeouts, 429 and 5xx, and a cap on
+concurrent calls: past HTTP_MAX_CONCURRENCY callers queue for at most
+HTTP_QUEUE_TIMEOUT seconds and then give up instead of opening ever more
+sockets to a slow provider. stream_sse does the same for streamed
+(Server-Sent Events) responses, retrying only until the first event.
+
+The pool belongs to the event loop that opened it (the app's, closed in
+its lifespan). Code that runs several loops one after another, such as
+benchmarks and tests, must await aclose() before its loop ends: using the
+client from another loop while it is open raises RuntimeError rather than
+leaking the old pool's sockets.
+
+    HTTP_CONNECT_TIMEOUT=3   HTTP_READ_TIMEOUT=12   HTTP_POOL_SIZE=32
+    HTTP_MAX_RETRIES=2       HTTP_RETRY_BASE=0.25
+    HTTP_MAX_CONCURRENCY=16  HTTP_QUEUE_TIMEOUT=2
+
+Metrics: http_client_requests_total{outcome}, http_client_retries_total,
+http_client_inflight, http_client_request_seconds.
+"""
+
+from typing import Any, AsyncIterator, Dict, Optional
+import asyncio
+import random
+import time
+import os
+
+import httpx
+
+from backend.utils.metrics import metrics
+from backend.utils.logger import logger
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class PooledHTTPClient:
+    def __init__(
+        self,
+        connect_timeout: float,
+        read_timeout: float,
+        pool_size: int,
+        max_retries: int,
+        retry_base: float,
+        max_concurrency: int,
+        queue_timeout: float,
+    ):
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop = None
+        self._inflight = 0
+
+    def _ensure(self) -> httpx.AsyncClient:
+        # httpx pools are tied to the event loop that opened them
+        loop = asyncio.get_running_loop()
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        elif self._loop is not loop:
+            # Its connections can only be closed on their own loop
+            raise RuntimeError(
+                "HTTP client is open on another event loop; await aclose() there first"
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        client, self._client, self._loop = self._client, None, None
+        if client is not None:
+            await client.aclose()
+
+    async def _acquire(self, host: str) -> bool:
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+            return True
+        except asyncio.TimeoutError:
+            metrics.inc("http_client_requests_total", outcome="queue_timeout")
+            logger.warning(f"HTTP POST {host}: no free slot within {self.queue_timeout}s")
+            return False
+
+    def _track(self, delta: int) -> None:
+        self._inflight += delta
+        metrics.set("http_client_inflight", self._inflight)
+
+    async def post_json(
+        self,
+        url: str,
+        payload: Dict[str, Any],
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """POST `payload` as JSON; the decoded response, or None on failure."""
+        client = self._ensure()
+        slots = self._slots
+        host = httpx.URL(url).host  # never log the query, it may carry a key
+
+        if not await self._acquire(host):
+            return None
+
+        self._track(1)
+        start = time.perf_counter()
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    resp = await client.post(url, json=payload, headers=headers)
+                    resp.raise_for_status()
+                    metrics.inc("http_client_requests_total", outcome="ok")
+                    return resp.json()
+                except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                    retryable = (
+                        isinstance(e, httpx.TransportError)
+                        or e.response.status_code in RETRYABLE_STATUS
+                    )
+                    if not retryable or attempt == self.max_retries:
+                        metrics.inc("http_client_requests_total", outcome="error")
+                        logger.error(f"HTTP POST {host} failed after {attempt + 1} attempts: {e!r}")
+                        return None
+
+                    metrics.inc("http_client_retries_total")
+                    await asyncio.sleep(random.uniform(0, self.retry_base * 2 ** attempt))
+                except ValueError as e:
+                    metrics.inc("http_client_requests_total", outcome="error")
+                    logger.error(f"HTTP POST {host} returned invalid JSON: {e}")
+                    return None
+        finally:
+            slots.release()
+            self._track(-1)
+            metrics.observe("http_client_request_seconds", time.perf_counter() - start)
+
+    async def stream_sse(
+        self,
+        url: str,
+        payload: Dict[str, Any],
+        headers: Optional[Dict[str, str]] = None,
+    ) -> AsyncIterator[str]:
+        """
+        POST `payload` as JSON and yield the data of each Server-Sent Event.
+        Failures before the first event are retried, then end the stream
+        quietly; a failure after it raises, so callers never mistake a cut
+        stream for a complete one.
+        """
+        client = self._ensure()
+        slots = self._slots
+        host = httpx.URL(url).host
+
+        if not await self._acquire(host):
+            return
+
+        self._track(1)
+        started = False
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    async with client.stream("POST", url, json=payload, headers=headers) as resp:
+                        resp.raise_for_status()
+                        async for line in resp.aiter_lines():
+                            if line.startswith("data:"):
+                                started = True
+                                yield line[5:].strip()
+                    metrics.inc("http_client_requests_total", outcome="ok")
+                    return
+                except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                    if started:
+                        metrics.inc("http_client_requests_total", outcome="error")
+                        logger.error(f"HTTP stream from {host} cut off: {e!r}")
+                        raise
+
+                    retryable = (
+                        isinstance(e, httpx.TransportError)
+                        or e.response.status_code in RETRYABLE_STATUS
+                    )
+                    if not retryable or attempt == self.max_retries:
+                        metrics.inc("http_client_requests_total", outcome="error")
+                        logger.error(f"HTTP POST {host} failed after {attempt + 1} attempts: {e!r}")
+                        return
+
+                    metrics.inc("http_client_retries_total")
+                    await asyncio.sleep(random.uniform(0, self.retry_base * 2 ** attempt))
+        finally:
+            slots.release()
+            self._track(-1)
+
+
+http_client = PooledHTTPClient(
+    connect_timeout=float(os.getenv("HTTP_CONNECT_TIMEOUT", 3)),
+    read_timeout=float(os.getenv("HTTP_READ_TIMEOUT", 12)),
+    pool_size=int(os.getenv("HTTP_POOL_SIZE", 32)),
+    max_retries=int(os.getenv("HTTP_MAX_RETRIES", 2)),
+    retry_base=float(os.getenv("HTTP_RETRY_BASE", 0.25)),
+    max_concurrency=int(os.getenv("HTTP_MAX_CONCURRENCY", 16)),
+    queue_timeout=float(os.getenv("HTTP_QUEUE_TIMEOUT", 2)),
+)
@@ -0,0 +1,166 @@
+"""
+Content-addressed cache for LLM responses.
+
+Prompts are normalized (whitespace collapsed, decimals rounded to 2
+places) and hashed together with the caller's namespace (e.g. "insights"),
+so the same question asked by any user or request maps to one entry
+whichever provider answered it. Entries live in a bounded in-process LRU
+and, with Redis up, in Redis under a long TTL; the LRU is checked first,
+and Redis is only reached off the event loop.
+
+Concurrent misses on one key are coalesced: the first caller goes to the
+provider (or streams from it) and the others await its result. Empty
+results (provider off or failing) are handed to the waiters but never
+stored; if the first caller gives up midway, a waiter takes over.
+
+    LLM_CACHE_SIZE=1024  LLM_CACHE_TTL=604800
+
+Metrics: llm_cache_requests_total{result=hit|redis_hit|coalesced|miss},
+llm_cache_saved_seconds (provider time not spent thanks to the cache),
+llm_cache_entries.
+"""
+
+from collections import OrderedDict
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import hashlib
+import re
+import time
+import os
+
+from backend.utils.cache import Cache
+from backend.utils.metrics import metrics
+
+_DECIMAL = re.compile(r"-?\d+\.\d+")
+_SPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    prompt = _DECIMAL.sub(lambda m: f"{float(m.group()):.2f}", prompt)
+    return _SPACE.sub(" ", prompt).strip()
+
+
+def prompt_key(namespace: str, prompt: str) -> str:
+    digest = hashlib.sha256(f"{namespace}\n{normalize_prompt(prompt)}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class LLMCache:
+    def __init__(self, max_entries: int, ttl: int):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()  # key -> (text, upstream secs)
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def _remember(self, key: str, text: str, seconds: float) -> None:
+        self._entries[key] = (text, seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        metrics.set("llm_cache_entries", len(self._entries))
+
+    async def _store(self, key: str, text: str, seconds: float) -> None:
+        self._remember(key, text, seconds)
+        await Cache.aset(f"llm:{key}", {"text": text, "seconds": seconds}, ttl=self.ttl)
+
+    def _hit(self, result: str, text: str, seconds: float) -> str:
+        metrics.inc("llm_cache_requests_total", result=result)
+        metrics.inc("llm_cache_saved_seconds", seconds)
+        return text
+
+    async def _cached(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry:
+            self._entries.move_to_end(key)
+            return self._hit("hit", *entry)
+
+        stored = await Cache.aget(f"llm:{key}")
+        if stored:
+            self._remember(key, stored["text"], stored["seconds"])
+            return self._hit("redis_hit", stored["text"], stored["seconds"])
+        return None
+
+    async def _settled(self, key: str) -> Optional[str]:
+        """Cached text, or the result of a call already in flight; None means lead one."""
+        while True:
+            text = await self._cached(key)
+            if text is not None:
+                return text
+
+            pending = self._inflight.get(key)
+            if pending is None:
+                return None
+            result = await asyncio.shield(pending)
+            if result is not None:
+                return self._hit("coalesced", *result)
+            # The leader gave up (error, client gone): look again
+
+    def _lead(self, key: str) -> asyncio.Future:
+        metrics.inc("llm_cache_requests_total", result="miss")
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        return future
+
+    def _finish(self, key: str, future: asyncio.Future, result: Optional[Tuple[str, float]]) -> None:
+        del self._inflight[key]
+        future.set_result(result)
+
+    async def lookup(self, namespace: str, prompt: str) -> Optional[str]:
+        """Cached response to `prompt`, if any."""
+        return await self._cached(prompt_key(namespace, prompt))
+
+    async def get_or_call(self, namespace: str, prompt: str, call: Callable[[str], Awaitable[str]]) -> str:
+        """Cached response to `prompt`, else `await call(prompt)` once for all concurrent callers."""
+        key = prompt_key(namespace, prompt)
+        text = await self._settled(key)
+        if text is not None:
+            return text
+
+        future = self._lead(key)
+        result = None
+        try:
+            start = time.perf_counter()
+            text = await call(prompt)
+            seconds = time.perf_counter() - start
+            if text:
+                await self._store(key, text, seconds)
+            result = (text, seconds if text else 0.0)
+            return text
+        finally:
+            self._finish(key, future, result)
+
+    async def stream(self, namespace: str, prompt: str, stream: Callable[[str], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """
+        Chunks of the response to `prompt`. A cached or coalesced response
+        arrives as one chunk; otherwise `stream(prompt)` is relayed and the
+        whole text is stored once it completes.
+        """
+        key = prompt_key(namespace, prompt)
+        text = await self._settled(key)
+        if text is not None:
+            if text:
+                yield text
+            return
+
+        future = self._lead(key)
+        result = None
+        try:
+            start = time.perf_counter()
+            parts = []
+            async for chunk in stream(prompt):
+                parts.append(chunk)
+                yield chunk
+
+            text = "".join(parts).strip()
+            seconds = time.perf_counter() - start
+            if text:
+                await self._store(key, text, seconds)
+            result = (text, seconds if text else 0.0)
+        finally:
+            self._finish(key, future, result)
+
+
+llm_cache = LLMCache(
+    max_entries=int(os.getenv("LLM_CACHE_SIZE", 1024)),
+    ttl=int(os.getenv("LLM_CACHE_TTL", 7 * 24 * 3600)),
+)
@@ -1,10 +1,155 @@
+"""
+Application logging.
+
+Request threads never write the log file themselves: records go through a
+bounded in-memory queue (QueueHandler) to one QueueListener thread that
+formats and writes them. Formatting happens on that thread too, so log
+with %-style arguments, not f-strings, and disabled levels cost nothing:
+
+    logger.info("Fetching transactions for %s", user_id)
+
+When the queue is full (the disk cannot keep up) records are dropped and
+counted rather than blocking the request.
+
+High-volume messages can be sampled per call site; one record in N is
+kept and carries `sampled: N` so counts can be scaled back:
+
+    logger.info("Fetching transactions for %s", user_id, extra={"sample": 100})
+
+Modules that want their own level use get_logger(__name__) instead of the
+shared `logger`; both live under the "backend" logger.
+
+    LOG_FILE=backend.log  LOG_FORMAT=json|text  LOG_LEVEL=INFO
+    LOG_LEVELS=backend.dependencies=DEBUG,sqlalchemy.engine=WARNING
+    LOG_QUEUE_SIZE=10000
+
+Metrics: log_records_dropped_total.
+"""
+
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+import atexit
+import itertools
+import json
 import logging
+import queue
+import threading
+import os
+
+from backend.utils.metrics import metrics
+
+LOG_FILE = os.getenv("LOG_FILE", "backend.log")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+
+TEXT_FORMAT = "%(asctime)s [%(levelname)s] %(message)s"
+
+# Attributes every LogRecord has; anything else on a record came from `extra`
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "sample"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, extra fields, exc."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class SampleFilter(logging.Filter):
+    """Keeps one in `record.sample` records of each call site that sets it."""
+
+    def __init__(self):
+        super().__init__()
+        self._counters: Dict[Tuple[str, int], itertools.count] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        every = getattr(record, "sample", None)
+        if not every or every <= 1:
+            return True
+        site = (record.pathname, record.lineno)
+        counter = self._counters.get(site)
+        if counter is None:
+            counter = self._counters.setdefault(site, itertools.count())
+        if next(counter) % every:
+            return False
+        record.sampled = every
+        return True
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    QueueHandler that hands the record over unformatted (the listener
+    formats it, so log values rather than objects mutated afterwards) and
+    drops it when the queue is full.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.inc("log_records_dropped_total")
+
+
+def build_queue_handler(target: logging.Handler, size: int = LOG_QUEUE_SIZE) -> Tuple[QueueHandler, QueueListener]:
+    """A sampling, non-blocking handler feeding `target` from a listener thread."""
+    records: queue.Queue = queue.Queue(maxsize=size)
+    handler = DroppingQueueHandler(records)
+    handler.addFilter(SampleFilter())
+    listener = QueueListener(records, target, respect_handler_level=True)
+    return handler, listener
+
+
+def _file_handler() -> logging.Handler:
+    handler = logging.FileHandler(LOG_FILE, encoding="utf-8")
+    handler.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+    return handler
+
+
+def _apply_levels(spec: str) -> None:
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, level = item.partition("=")
+        logging.getLogger(name.strip()).setLevel(level.strip().upper())
+
+
+_listener: Optional[QueueListener] = None
+_setup_lock = threading.Lock()
+
+
+def setup_logging() -> None:
+    """Install the queue pipeline on the root logger (once per process)."""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return
+        handler, _listener = build_queue_handler(_file_handler())
+        root = logging.getLogger()
+        root.setLevel(LOG_LEVEL)
+        root.addHandler(handler)
+        _apply_levels(LOG_LEVELS)
+        _listener.start()
+        atexit.register(_listener.stop)  # flushes what is still queued
+
+
+def get_logger(name: str) -> logging.Logger:
+    """A logger under "backend", for modules that want their own level."""
+    return logging.getLogger(name if name.startswith("backend") else f"backend.{name}")
 
-# Basic logging config
-logging.basicConfig(
-    filename="backend.log",
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s"
-)
 
-logger = logging.getLogger(__name__)
+setup_logging()
+logger = logging.getLogger("backend")
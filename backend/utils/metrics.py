@@ -0,0 +1,80 @@
+"""
+In-process metrics, exposed in Prometheus text format at GET /metrics.
+
+Counters, gauges and timing summaries (count + sum), optionally labelled:
+
+    metrics.inc("forecast_pool_jobs_total", outcome="shed")
+    metrics.set("forecast_pool_pending", 3)
+    metrics.observe("forecast_pool_job_seconds", 0.012)
+
+Values are per process; with several workers, scrape each one.
+"""
+
+import threading
+from typing import Dict, Tuple
+
+LabelKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[LabelKey, float] = {}
+        self._gauges: Dict[LabelKey, float] = {}
+        self._summaries: Dict[LabelKey, list] = {}
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> LabelKey:
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def set(self, name: str, value: float, **labels) -> None:
+        with self._lock:
+            self._gauges[self._key(name, labels)] = float(value)
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = self._key(name, labels)
+        with self._lock:
+            summary = self._summaries.setdefault(key, [0, 0.0])
+            summary[0] += 1
+            summary[1] += value
+
+    def get(self, name: str, **labels) -> float:
+        """Current value of a counter or gauge (0 if never recorded)."""
+        key = self._key(name, labels)
+        with self._lock:
+            return self._counters.get(key, self._gauges.get(key, 0.0))
+
+    def render(self) -> str:
+        def fmt(name, labels, value):
+            if labels:
+                body = ",".join(f'{k}="{v}"' for k, v in labels)
+                return f"{name}{{{body}}} {value:g}"
+            return f"{name} {value:g}"
+
+        with self._lock:
+            lines = []
+            for kind, series in (("counter", self._counters), ("gauge", self._gauges)):
+                typed = set()
+                for (name, labels), value in sorted(series.items()):
+                    if name not in typed:
+                        lines.append(f"# TYPE {name} {kind}")
+                        typed.add(name)
+                    lines.append(fmt(name, labels, value))
+
+            typed = set()
+            for (name, labels), (count, total) in sorted(self._summaries.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} summary")
+                    typed.add(name)
+                lines.append(fmt(f"{name}_count", labels, count))
+                lines.append(fmt(f"{name}_sum", labels, total))
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
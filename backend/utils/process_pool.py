@@ -0,0 +1,139 @@
+"""
+Bounded worker pools for CPU-heavy request work.
+
+BoundedProcessPool runs jobs in worker processes. BoundedThreadPool runs
+them in threads, for work that releases the GIL (bcrypt) and so gains
+nothing from a process hop.
+
+The app lifespan calls start() and shutdown(). Until start() runs (scripts,
+tests that skip the lifespan, workers=0) jobs execute inline in the caller.
+
+Jobs beyond `max_pending` (queued + running) are shed with 503 and
+Retry-After instead of queueing without limit. A job that outlives
+`timeout` answers 503 as well; its worker still runs it to completion and
+it keeps counting as pending until then, so a stuck pool sheds instead of
+piling up more work.
+
+Metrics, with <name> the pool name:
+    <name>_pending                 gauge, queued + running jobs
+    <name>_jobs_total{outcome}     ok | inline | shed | timeout | error
+    <name>_job_seconds             summary, time the caller waited
+    <name>_queue_seconds           summary, time a job waited for a thread
+                                   (BoundedThreadPool only)
+"""
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import HTTPException
+import threading
+import time
+
+from backend.utils.metrics import metrics
+from backend.utils.logger import logger
+
+
+class BoundedProcessPool:
+    executor_class = ProcessPoolExecutor
+
+    def __init__(self, name: str, workers: int, max_pending: int, timeout: float, retry_after: int = 5):
+        self.name = name
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.retry_after = retry_after
+
+        self._executor: ProcessPoolExecutor | ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def start(self) -> None:
+        if self.workers > 0 and self._executor is None:
+            self._executor = self.executor_class(max_workers=self.workers)
+            logger.info(f"{self.name}: started {self.workers} workers (max {self.max_pending} pending)")
+
+    def shutdown(self) -> None:
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _release(self, _future=None) -> None:
+        with self._lock:
+            self._pending -= 1
+            metrics.set(f"{self.name}_pending", self._pending)
+
+    def _unavailable(self, detail: str) -> HTTPException:
+        return HTTPException(
+            status_code=503,
+            detail=detail,
+            headers={"Retry-After": str(self.retry_after)},
+        )
+
+    def _submit(self, executor, fn, *args, **kwargs):
+        return executor.submit(fn, *args, **kwargs)
+
+    def run(self, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) in a worker and wait for the result."""
+        executor = self._executor
+        if executor is None:
+            metrics.inc(f"{self.name}_jobs_total", outcome="inline")
+            return fn(*args, **kwargs)
+
+        with self._lock:
+            if self._pending >= self.max_pending:
+                metrics.inc(f"{self.name}_jobs_total", outcome="shed")
+                raise self._unavailable("Server busy, please retry")
+            self._pending += 1
+            metrics.set(f"{self.name}_pending", self._pending)
+
+        start = time.perf_counter()
+        try:
+            future = self._submit(executor, fn, *args, **kwargs)
+        except BrokenProcessPool:
+            self._release()
+            return self._recover(fn, *args, **kwargs)
+        future.add_done_callback(self._release)
+
+        try:
+            result = future.result(timeout=self.timeout)
+        except FuturesTimeout:
+            future.cancel()
+            metrics.inc(f"{self.name}_jobs_total", outcome="timeout")
+            logger.warning(f"{self.name}: {fn.__name__} timed out after {self.timeout}s")
+            raise self._unavailable("Computation timed out, please retry")
+        except BrokenProcessPool:
+            return self._recover(fn, *args, **kwargs)
+        except Exception:
+            metrics.inc(f"{self.name}_jobs_total", outcome="error")
+            raise
+        finally:
+            metrics.observe(f"{self.name}_job_seconds", time.perf_counter() - start)
+
+        metrics.inc(f"{self.name}_jobs_total", outcome="ok")
+        return result
+
+    def _recover(self, fn, *args, **kwargs):
+        # A worker died; replace the pool and answer this request inline
+        logger.error(f"{self.name}: worker pool broken, restarting")
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = self.executor_class(max_workers=self.workers)
+        metrics.inc(f"{self.name}_jobs_total", outcome="inline")
+        return fn(*args, **kwargs)
+
+
+class BoundedThreadPool(BoundedProcessPool):
+    executor_class = ThreadPoolExecutor
+
+    def _submit(self, executor, fn, *args, **kwargs):
+        queued = time.perf_counter()
+
+        def job():
+            metrics.observe(f"{self.name}_queue_seconds", time.perf_counter() - queued)
+            return fn(*args, **kwargs)
+
+        return executor.submit(job)
@@ -0,0 +1,142 @@
+"""
+Token-bucket rate limiting for expensive endpoints (login, signup).
+
+A limit "N/S" is a bucket of N tokens refilled at N per S seconds: bursts
+of up to N requests pass, sustained traffic is held to N per S. Each
+request takes a token from its client IP's bucket and, where the route
+checks one, from its account's bucket; an empty bucket answers 429 with
+Retry-After before any password hashing or database work.
+
+Buckets live in Redis (one atomic script call per check, shared by all
+workers) and fall back to a bounded in-process table when Redis is down.
+
+Each route declares its default limits (see backend/auth/routes.py); the
+environment overrides them per route and scope, e.g.
+
+    RATE_LIMIT_LOGIN_IP=20/60  RATE_LIMIT_LOGIN_ACCOUNT=5/60
+    RATE_LIMIT_SIGNUP_IP=5/300 RATE_LIMIT_GOOGLE_IP=30/60
+
+"off" (or 0) disables one. RATE_LIMIT_TRUST_FORWARDED=1 takes the client IP
+from X-Forwarded-For (only behind a proxy that sets it).
+
+Metrics: rate_limit_requests_total{route,scope,outcome=allowed|limited}.
+"""
+
+from collections import OrderedDict
+from fastapi import HTTPException, Request
+from typing import Optional, Tuple
+import math
+import threading
+import time
+import os
+
+from backend.utils.cache import redis_client
+from backend.utils.metrics import metrics
+from backend.utils.logger import logger
+
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "0") == "1"
+LOCAL_BUCKET_LIMIT = 100000
+
+# KEYS[1] bucket; ARGV capacity, refill per second. Returns {allowed, tokens left}
+_TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+
+def parse_limit(spec: Optional[str]) -> Optional[Tuple[int, float]]:
+    """(capacity, seconds) from "N/S"; None when off."""
+    if not spec or spec.strip().lower() in ("0", "off", "none"):
+        return None
+    count, _, seconds = spec.partition("/")
+    return int(count), float(seconds or 1)
+
+
+class TokenBuckets:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()  # key -> (tokens, ts)
+        self._script = redis_client.register_script(_TAKE_SCRIPT) if redis_client else None
+
+    def _take_local(self, key: str, capacity: int, rate: float) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, ts = self._local.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - ts) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._local[key] = (tokens, now)
+            while len(self._local) > LOCAL_BUCKET_LIMIT:
+                self._local.popitem(last=False)
+        return 0.0 if allowed else (1 - tokens) / rate
+
+    def take(self, key: str, capacity: int, seconds: float) -> float:
+        """Take a token from `key`'s bucket: 0 if there was one, else seconds until there is."""
+        rate = capacity / seconds
+        if self._script:
+            try:
+                allowed, tokens = self._script(keys=[f"ratelimit:{key}"], args=[capacity, rate])
+                return 0.0 if allowed else (1 - float(tokens)) / rate
+            except Exception as e:
+                logger.error(f"Rate limit Redis error for {key}: {e}")
+        return self._take_local(key, capacity, rate)
+
+
+buckets = TokenBuckets()
+
+
+def client_ip(request: Request) -> str:
+    if RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+class RateLimit:
+    """
+    Limits of one route. Use the instance as a dependency for the per-IP
+    check and call check_account() in the handler before any work.
+    """
+
+    def __init__(self, route: str, ip: Optional[str] = None, account: Optional[str] = None):
+        prefix = f"RATE_LIMIT_{route.upper()}"
+        self.route = route
+        self.ip = parse_limit(os.getenv(f"{prefix}_IP", ip))
+        self.account = parse_limit(os.getenv(f"{prefix}_ACCOUNT", account))
+
+    def _check(self, scope: str, subject: str, limit: Optional[Tuple[int, float]]) -> None:
+        if limit is None:
+            return
+        wait = buckets.take(f"{self.route}:{scope}:{subject}", *limit)
+        if not wait:
+            metrics.inc("rate_limit_requests_total", route=self.route, scope=scope, outcome="allowed")
+            return
+
+        metrics.inc("rate_limit_requests_total", route=self.route, scope=scope, outcome="limited")
+        raise HTTPException(
+            status_code=429,
+            detail="Too many attempts, please retry later",
+            headers={"Retry-After": str(max(1, math.ceil(wait)))},
+        )
+
+    def __call__(self, request: Request) -> None:
+        self._check("ip", client_ip(request), self.ip)
+
+    def check_account(self, account: str) -> None:
+        self._check("account", account.strip().lower(), self.account)
@@ -0,0 +1,157 @@
+"""
+Per-request timing: wall time, database time and query count, cache use.
+
+RequestTimingMiddleware opens a RequestTiming for each HTTP request in a
+context variable. SQLAlchemy cursor events (every engine, sync and async,
+any thread the request's context reaches) add query time and count, and
+Cache.get reports hits, misses and Redis time. The totals go out as a
+Server-Timing header, visible in the browser's network panel:
+
+    Server-Timing: app;dur=41.2, db;dur=30.5;desc="19 queries", cache;dur=1.1;desc="0 hit 1 miss"
+
+and as one structured log record per request (JSON fields method, path,
+status, wall_ms, db_ms, db_queries, cache_hits, cache_misses, cache_ms).
+Requests slower than REQUEST_SLOW_MS log at WARNING; the rest at INFO,
+one in REQUEST_LOG_SAMPLE (marked `sampled`). For streamed responses the header carries the
+time to the first byte and the log record the full duration.
+
+REQUEST_TIMING=0 installs neither the middleware nor the engine listeners,
+so the only cost left is one context-variable read per Cache.get.
+
+    REQUEST_TIMING=1  REQUEST_SLOW_MS=500  REQUEST_LOG_SAMPLE=1
+"""
+
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from typing import Optional
+import itertools
+import logging
+import time
+import os
+
+from backend.utils.logger import get_logger
+
+REQUEST_TIMING = os.getenv("REQUEST_TIMING", "1") == "1"
+REQUEST_SLOW_MS = float(os.getenv("REQUEST_SLOW_MS", 500))
+REQUEST_LOG_SAMPLE = int(os.getenv("REQUEST_LOG_SAMPLE", 1))
+
+logger = get_logger(__name__)
+
+
+class RequestTiming:
+    __slots__ = ("start", "db_seconds", "db_queries", "cache_hits", "cache_misses", "cache_seconds")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.db_seconds = 0.0
+        self.db_queries = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_seconds = 0.0
+
+    def server_timing(self) -> str:
+        wall = (time.perf_counter() - self.start) * 1000
+        return (
+            f"app;dur={wall:.1f}, "
+            f"db;dur={self.db_seconds * 1000:.1f};desc=\"{self.db_queries} queries\", "
+            f"cache;dur={self.cache_seconds * 1000:.1f};"
+            f"desc=\"{self.cache_hits} hit {self.cache_misses} miss\""
+        )
+
+
+_current: ContextVar[Optional[RequestTiming]] = ContextVar("request_timing", default=None)
+
+
+def record_cache(hit: bool, seconds: float) -> None:
+    """Count one cache lookup against the current request, if any."""
+    timing = _current.get()
+    if timing is None:
+        return
+    if hit:
+        timing.cache_hits += 1
+    else:
+        timing.cache_misses += 1
+    timing.cache_seconds += seconds
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timing = _current.get()
+    starts = conn.info.get("query_start")
+    if timing is None or not starts:
+        return
+    timing.db_seconds += time.perf_counter() - starts.pop()
+    timing.db_queries += 1
+
+
+def install_engine_listeners() -> None:
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class RequestTimingMiddleware:
+    """Pure ASGI middleware, so streamed responses pass through untouched."""
+
+    def __init__(self, app):
+        self.app = app
+        self._requests = itertools.count()
+        install_engine_listeners()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming()
+        token = _current.set(timing)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timing.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            self._log(scope, status, timing)
+
+    def _log(self, scope, status: int, timing: RequestTiming) -> None:
+        wall_ms = (time.perf_counter() - timing.start) * 1000
+        slow = wall_ms >= REQUEST_SLOW_MS
+        # Sampled here rather than with extra={"sample"}: a skipped request
+        # then costs no LogRecord at all
+        if not slow and (
+            next(self._requests) % REQUEST_LOG_SAMPLE or not logger.isEnabledFor(logging.INFO)
+        ):
+            return
+
+        route = scope.get("route")
+        fields = {
+            "method": scope["method"],
+            "path": getattr(route, "path", scope["path"]),
+            "status": status,
+            "wall_ms": round(wall_ms, 1),
+            "db_ms": round(timing.db_seconds * 1000, 1),
+            "db_queries": timing.db_queries,
+            "cache_hits": timing.cache_hits,
+            "cache_misses": timing.cache_misses,
+            "cache_ms": round(timing.cache_seconds * 1000, 1),
+        }
+        if slow:
+            logger.warning("Slow request %s %s", fields["method"], fields["path"], extra=fields)
+            return
+        if REQUEST_LOG_SAMPLE > 1:
+            fields["sampled"] = REQUEST_LOG_SAMPLE
+        logger.info("Request %s %s", fields["method"], fields["path"], extra=fields)
@@ -24,10 +24,60 @@ const ForecastView = () => {
   const [forecast, setForecast] = useState<any>(null);
 
   useEffect(() => {
+    let cancelled = false;
+
+    const setAiInsight = (insight: any) => {
+      if (cancelled) return;
+      setForecast((prev: any) => {
+        if (!prev) return prev;
+        const rest = prev.insights.filter((i: any) => i.type !== "AI");
+        return { ...prev, insights: insight ? [insight, ...rest] : rest };
+      });
+    };
+
+    // The AI insight streams in after the forecast (Server-Sent Events);
+    // render the text as it arrives
+    const streamInsight = async () => {
+      try {
+        const response = await fetch(`${api.defaults.baseURL}/forecast/insights/stream`, {
+          headers: { Authorization: `Bearer ${localStorage.getItem("access_token")}` },
+        });
+        if (!response.ok || !response.body) return;
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = "";
+        let text = "";
+        while (!cancelled) {
+          const { done, value } = await reader.read();
+          if (done) break;
+          buffer += decoder.decode(value, { stream: true });
+
+          const events = buffer.split("\n\n");
+          buffer = events.pop() ?? "";
+          for (const block of events) {
+            const event = block.match(/^event: (.*)$/m)?.[1];
+            const data = JSON.parse(block.match(/^data: (.*)$/m)?.[1] ?? "{}");
+            if (event === "token") {
+              text += data.text;
+              setAiInsight({ title: "AI Insight", type: "AI", description: text });
+            } else if (event === "done") {
+              setAiInsight(data.insight);
+            }
+          }
+        }
+        reader.cancel();
+      } catch (error: any) {
+        console.error("Insight error:", error);
+      }
+    };
+
     const loadForecast = async () => {
       try {
-        const response = await api.get("/forecast/");
+        // stream=1: no insight job, so the stream below is the only LLM call
+        const response = await api.get("/forecast/", { params: { stream: 1 } });
         setForecast(response.data);
+        streamInsight();
       } catch (error: any) {
         console.error("Forecast error:", error);
         toast({
@@ -41,6 +91,9 @@ const ForecastView = () => {
     };
 
     loadForecast();
+    return () => {
+      cancelled = true;
+    };
   }, []);
 
   if (loading) {